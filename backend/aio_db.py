@@ -0,0 +1,120 @@
+"""
+aio_db.py
+=========
+Async MySQL access for the DB_ASYNC request path, backed by an aiomysql
+pool. Uses the same DB_CONFIG dict as the sync pymysql pool so both modes
+hit the same server with the same credentials.
+
+Each query borrows its own connection, so independent lookups can run
+concurrently with asyncio.gather. If the pool could not be created at
+startup (DB down), the first query after the DB comes back creates it;
+until then queries raise PoolTimeout like an exhausted pool does.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiomysql
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+def _aiomysql_kwargs(config: dict) -> dict:
+    """Translate a pymysql.connect() config into aiomysql.create_pool() kwargs"""
+    kwargs = {k: v for k, v in config.items() if k not in ("database", "cursorclass")}
+    kwargs["db"] = config.get("database")
+    kwargs["cursorclass"] = aiomysql.DictCursor
+    return kwargs
+
+
+class AsyncDB:
+    def __init__(self, config: dict, min_size: int = 2, max_size: int = 20,
+                 acquire_timeout: float = 5.0, max_lifetime: float = 3600.0):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self._pool: Optional[aiomysql.Pool] = None
+        self._starting = asyncio.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.discarded = 0
+
+    async def start(self) -> None:
+        async with self._starting:
+            if self._pool is None:
+                self._pool = await aiomysql.create_pool(
+                    minsize=self.min_size,
+                    maxsize=self.max_size,
+                    pool_recycle=int(self.max_lifetime),
+                    **_aiomysql_kwargs(self.config),
+                )
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._pool is None:
+            try:
+                await self.start()
+            except (pymysql.MySQLError, OSError) as e:
+                raise PoolTimeout(f"DB connection pool unavailable: {e}") from e
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeout(
+                f"no DB connection available within {self.acquire_timeout:.1f}s "
+                f"({self._pool.size}/{self.max_size} in use)") from None
+        self.acquired += 1
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # Closed connections are dropped by the pool on release
+            self.discarded += 1
+            conn.close()
+            raise
+        finally:
+            self._pool.release(conn)
+
+    async def fetchone(self, sql: str, args=None) -> Optional[dict]:
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return await cur.fetchone()
+
+    async def fetchall(self, sql: str, args=None) -> list:
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return list(await cur.fetchall())
+
+    async def execute(self, sql: str, args=None) -> int:
+        """Run a write; returns lastrowid"""
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return cur.lastrowid
+
+    async def ping(self) -> None:
+        async with self.connection() as conn:
+            await conn.ping(reconnect=False)
+
+    def stats(self) -> dict:
+        pool = self._pool
+        return {
+            "size": pool.size if pool else 0,
+            "idle": pool.freesize if pool else 0,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "discarded": self.discarded,
+        }
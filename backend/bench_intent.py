@@ -0,0 +1,110 @@
+"""
+bench_intent.py — Memory / allocation benchmark for OrderIntent
+===============================================================
+Compares the compact OrderIntent (int enums, instruction bitmask, shared
+default) from order_parser against the original @dataclass kept in
+enhanced_order_intent_parser.
+
+Reports, per intent:
+  - retained bytes and live allocation blocks (tracemalloc)
+  - peak transient bytes during one parse
+  - construction and parse time
+
+Run:  python3 bench_intent.py [-n 20000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import enhanced_order_intent_parser as legacy
+import order_parser as compact
+
+
+NOTES = [
+    "",
+    "VWAP benchmark - standard execution",
+    "EOD compliance required - must attain position by close",
+    "Urgent buy - critical allocation for fund rebalancing",
+    "Patient accumulation - no rush, optimize price",
+    "minimize market impact, work the order, do not cross, limit only until 14:30",
+]
+
+
+def _retained(factory, n):
+    """Bytes and blocks still allocated per object after building n of them"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [factory(i) for i in range(n)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats) - (len(keep) * 8)  # minus list slots
+    blocks = sum(s.count_diff for s in stats) - 1               # minus the list
+    del keep
+    return size / n, blocks / n
+
+
+def _peak_per_parse(parse, notes, rounds=200):
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    for _ in range(rounds):
+        for text in notes:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            parse(text)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def _per_call_ns(fn, n):
+    start = time.perf_counter_ns()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter_ns() - start) / n
+
+
+def run(n):
+    legacy_samples = [legacy.OrderIntentParser.parse(t) for t in NOTES]
+    compact_samples = [compact.OrderIntentParser.parse(t) for t in NOTES]
+    k = len(NOTES)
+
+    def build_legacy(i):
+        s = legacy_samples[i % k]
+        return legacy.OrderIntent(
+            s.urgency_level, s.algo_strategy, s.execution_style, s.session_target,
+            s.deadline_time, s.must_complete, s.price_sensitivity,
+            list(s.explicit_instructions), s.confidence_score)
+
+    def build_compact(i):
+        return compact.OrderIntent(*compact_samples[i % k])
+
+    rows = []
+    for label, build, parse in (
+        ("dataclass (legacy)", build_legacy, legacy.OrderIntentParser.parse),
+        ("OrderIntent (compact)", build_compact, compact.OrderIntentParser.parse),
+    ):
+        size, blocks = _retained(build, n)
+        parsed_size, parsed_blocks = _retained(lambda i: parse(NOTES[i % k]), n)
+        rows.append((
+            label, size, blocks, parsed_size, parsed_blocks,
+            _peak_per_parse(parse, NOTES),
+            _per_call_ns(build, n),
+            _per_call_ns(lambda i: parse(NOTES[i % k]), n),
+        ))
+
+    header = ("type", "B/obj", "blk/obj", "B/parse", "blk/parse",
+              "peak B/parse", "build ns", "parse ns")
+    print(f"{header[0]:<24}" + "".join(f"{h:>13}" for h in header[1:]))
+    for label, *values in rows:
+        print(f"{label:<24}" + "".join(f"{v:>13.1f}" for v in values))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("-n", type=int, default=20000, help="objects per measurement")
+    run(ap.parse_args().n)
@@ -0,0 +1,276 @@
+"""
+bench_prefill.py — Micro-benchmarks for the parser and prefill engine
+=====================================================================
+Imports the real engine (OrderIntentParser, calculate_urgency,
+calc_limit_price, run_prefill from main.py) and runs it over a corpus of
+short, long, conflicting and empty notes crossed with every symbol and
+client in schema.sql. No database or server is needed.
+
+For each case it reports ops/sec, p50/p99 latency and allocations per call
+(peak traced bytes and allocated blocks, via tracemalloc).
+
+Regression gate: numbers are machine-specific, so record a baseline on the
+box that runs the gate, then compare later runs against it:
+
+    python3 bench_prefill.py --save-baseline      # writes bench_baseline.json
+    python3 bench_prefill.py --check              # exit 1 if any case is
+                                                  # >15% slower than baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+from order_parser import OrderIntentParser
+from main import PrefillRequest, calc_limit_price, calculate_urgency, detect_cas, run_prefill
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(HERE, "schema.sql")
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+
+
+# ============================================================
+# CORPUS
+# ============================================================
+
+NOTES_EMPTY = ["", "   "]
+
+NOTES_SHORT = [
+    "VWAP benchmark - standard execution",
+    "EOD compliance required - must attain position by close",
+    "Urgent buy - critical allocation for fund rebalancing",
+    "Patient accumulation - no rush, optimize price",
+    "Must liquidate by close - regulatory requirement",
+    "TWAP over next 2 hours",
+    "Immediate - market impact acceptable",
+]
+
+NOTES_CONFLICTING = [
+    "urgent but passive - no rush, work it into the closing auction",
+    "asap, minimize market impact, vwap by 2pm, sell",
+    "standard order - critical - dark pool - at open",
+    "immediate fill, patient, twap until 14:30, do not cross, limit only",
+]
+
+NOTES_LONG = [
+    (
+        "Client is rebalancing into month end and wants to buy the full clip today. "
+        "They are benchmarked to VWAP but the PM said urgent if we fall behind schedule; "
+        "minimize market impact in the morning, participate more aggressively after lunch, "
+        "do not cross the spread unless we are more than 20% behind, use discretion near "
+        "the close and make sure we get done by 3:15 pm. No market orders. "
+    ) * 4,
+    (
+        "Liquidate the position patiently. Work the order through the day, hide size in "
+        "the dark pool where possible, and avoid the opening auction. If the stock moves "
+        "against us by more than 1% switch to POV participation and guarantee fill by close. "
+    ) * 6,
+]
+
+NOTE_GROUPS = {
+    "empty": NOTES_EMPTY,
+    "short": NOTES_SHORT,
+    "conflicting": NOTES_CONFLICTING,
+    "long": NOTES_LONG,
+}
+
+
+def load_schema_rows(path=SCHEMA_PATH):
+    """Market snapshots and client profiles from the INSERTs in schema.sql"""
+    sql = open(path, encoding="utf-8").read()
+    markets = [
+        {"symbol": s, "time_to_close": int(ttc), "bid": float(bid), "ask": float(ask),
+         "ltp": float(ltp), "volatility_pct": float(vol), "avg_trade_size": int(ats)}
+        for s, ttc, bid, ask, ltp, vol, ats in re.findall(
+            r"\('([A-Z&\-]+\.NS)', '[^']+', (\d+), ([\d.]+), ([\d.]+), ([\d.]+), ([\d.]+), (\d+)\)", sql)
+    ]
+    clients = [
+        {"cpty_id": cid, "client_name": name, "urgency_factor": float(uf),
+         "price_sensitivity": ps, "execution_model": em}
+        for cid, name, uf, ps, em in re.findall(
+            r"\('([A-Z0-9_]+)', '([^']+)', ([\d.]+), '(High|Low)', '(Agency|Principal)'\)", sql)
+    ]
+    return markets, clients
+
+
+def build_requests(notes, markets, clients, count, seed=42):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        market, client = rng.choice(markets), rng.choice(clients)
+        req = PrefillRequest(
+            symbol=market["symbol"], cpty_id=client["cpty_id"],
+            size=rng.choice([500, 5000, 25000, 75000, 150000, 500000]),
+            order_notes=rng.choice(notes),
+            time_to_close=rng.choice([None, 10, 25, 45, 120, 330]),
+            side=rng.choice([None, "Buy", "Sell"]),
+        )
+        out.append((req, market, client))
+    return out
+
+
+# ============================================================
+# MEASUREMENT
+# ============================================================
+
+def measure(fn, inputs, seconds):
+    """Call fn(x) round-robin over inputs for ~seconds; return latency stats"""
+    timings = []
+    n = len(inputs)
+    i = 0
+    gc.collect()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        x = inputs[i % n]
+        t0 = time.perf_counter_ns()
+        fn(x)
+        timings.append(time.perf_counter_ns() - t0)
+        i += 1
+    total_s = sum(timings) / 1e9
+    q = statistics.quantiles(timings, n=100) if len(timings) >= 100 else None
+    return {
+        "calls": len(timings),
+        "ops_per_sec": round(len(timings) / total_s, 1),
+        "p50_us": round((q[49] if q else statistics.median(timings)) / 1e3, 2),
+        "p99_us": round((q[98] if q else max(timings)) / 1e3, 2),
+    }
+
+
+def allocations(fn, inputs, calls=500):
+    """Mean peak traced bytes and allocated blocks per call"""
+    n = len(inputs)
+    gc.collect()
+    tracemalloc.start()
+    peak_total = 0
+    blocks_total = 0
+    for i in range(calls):
+        x = inputs[i % n]
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        blocks_before = sys.getallocatedblocks()
+        result = fn(x)
+        blocks_total += sys.getallocatedblocks() - blocks_before
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+        del result
+    tracemalloc.stop()
+    return {
+        "alloc_peak_bytes": round(peak_total / calls),
+        "alloc_blocks": round(blocks_total / calls, 1),
+    }
+
+
+def build_cases(markets, clients):
+    cases = {}
+    for group, notes in NOTE_GROUPS.items():
+        cases[f"parse/{group}"] = (OrderIntentParser.parse, notes)
+
+    urgency_inputs = [
+        (notes, req.size, req.time_to_close or market["time_to_close"],
+         market["avg_trade_size"], client["urgency_factor"])
+        for req, market, client in build_requests(NOTES_SHORT + NOTES_CONFLICTING,
+                                                  markets, clients, 500)
+        for notes in [req.order_notes]
+    ]
+    cases["calculate_urgency"] = (lambda a: calculate_urgency(*a), urgency_inputs)
+
+    rng = random.Random(7)
+    limit_inputs = []
+    for market in markets:
+        for ttc in (10, 60, 300):
+            cas = detect_cas(ttc, market["ltp"])
+            limit_inputs.append((rng.choice(["Buy", "Sell", None]), rng.randint(0, 100), cas,
+                                 market["ltp"], market["bid"], market["ask"]))
+    cases["calc_limit_price"] = (lambda a: calc_limit_price(*a), limit_inputs)
+
+    for group, notes in NOTE_GROUPS.items():
+        reqs = build_requests(notes, markets, clients, 500)
+        cases[f"run_prefill/{group}"] = (lambda a: run_prefill(*a), reqs)
+    return cases
+
+
+def run(seconds, only=None):
+    markets, clients = load_schema_rows()
+    results = {}
+    for name, (fn, inputs) in build_cases(markets, clients).items():
+        if only and not re.search(only, name):
+            continue
+        results[name] = {**measure(fn, inputs, seconds), **allocations(fn, inputs)}
+    return results
+
+
+def print_table(results, baseline=None):
+    header = f"{'case':<26}{'ops/sec':>12}{'p50 us':>10}{'p99 us':>10}{'peak B':>9}{'blocks':>8}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (f"{name:<26}{r['ops_per_sec']:>12,.0f}{r['p50_us']:>10.2f}{r['p99_us']:>10.2f}"
+                f"{r['alloc_peak_bytes']:>9}{r['alloc_blocks']:>8.1f}")
+        if baseline and name in baseline:
+            change = r["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+            line += f"{change:>+10.1%}"
+        print(line)
+
+
+def check(results, baseline, tolerance):
+    """Names of cases whose throughput fell more than `tolerance` below baseline"""
+    failures = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base and r["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            failures.append(name)
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="AUO parser / prefill micro-benchmarks")
+    ap.add_argument("--seconds", type=float, default=1.0, help="timing budget per case")
+    ap.add_argument("--only", help="regex selecting case names")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    ap.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    ap.add_argument("--check", action="store_true", help="fail if throughput regresses vs baseline")
+    ap.add_argument("--tolerance", type=float, default=0.15,
+                    help="allowed throughput drop before --check fails (fraction)")
+    ap.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = ap.parse_args(argv)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    elif args.check:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 2
+
+    results = run(args.seconds, args.only)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, baseline)
+
+    if args.save_baseline:
+        merged = {**(baseline or {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        failures = check(results, baseline, args.tolerance)
+        if failures:
+            print(f"\n❌ Throughput regressed more than {args.tolerance:.0%}: {', '.join(failures)}")
+            return 1
+        print(f"\n✅ No case regressed more than {args.tolerance:.0%} vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+blob_codec.py
+=============
+Compact storage for the prefill JSON on order_data.
+
+Submits used to write the same multi-KB prefilled_params JSON into both
+prefill_result and submitted_params. New rows store it once in
+prefill_blob, deflated against a preset dictionary of the field names and
+rationale strings the prefill engine emits, and store the submitted
+parameters in params_diff as a compressed diff against it (NULL when
+nothing was edited). expand_row() turns either layout back into the
+original prefill_result / submitted_params shape.
+
+Every blob starts with a one-byte dictionary version. To retrain the
+dictionary add a new version; never edit an existing one, or old rows
+stop decoding.
+"""
+
+import json
+import zlib
+from typing import Optional, Tuple
+
+
+# Version 1: rationale strings the engine emits, then one full
+# prefilled_params object. Most likely matches sit at the end.
+_DICTIONARY_V1 = (
+    '"Agency execution model","Algo engine","Allow unfilled quantity to remain",'
+    '"Auto urgency adapts to market conditions",'
+    '"Client explicitly requested TWAP execution",'
+    '"Client explicitly requested VWAP benchmark execution",'
+    '"Client requested POV (Percentage of Volume) execution",'
+    '"Critical urgency: IOC ensures immediate execution attempt",'
+    '"High urgency + low price sensitivity → Market order for guaranteed fill",'
+    '"High urgency: Limit at ask price for immediate execution",'
+    '"High urgency: Limit at bid price for immediate execution",'
+    '"High volatility: Passive pricing avoids adverse selection",'
+    '"Increased closing participation per instruction",'
+    '"Large urgent order requires aggressive participation (POV)",'
+    '"Low urgency allows patient accumulation","Low urgency for passive execution",'
+    '"Low urgency: Patient limit near ask for better price",'
+    '"Low urgency: Patient limit near bid for better price","Market pricing",'
+    '"Medium urgency: Mid-price balances cost and fill probability","No offset",'
+    '"Opportunistic execution price","Order notes indicate sell instruction",'
+    '"Participate in opening auction for early liquidity",'
+    '"Passive execution: Limit near ask for better price",'
+    '"Passive execution: Limit near bid for better price",'
+    '"Passive pricing per trader instruction","Require manual selection",'
+    '"Standard adaptive pricing balances aggression and patience",'
+    '"Standard day order: Valid until market close","Standard execution",'
+    '"Standard immediate release","Standard limit order for price protection",'
+    '"Static limit price from order","Sufficient time remaining",'
+    '"Trader explicitly requires completion","Trader targeted closing session",'
+    '"User-specified side",{"instrument":{"value":"MARUTI SUZUKI T+1",'
+    '"confidence":"HIGH","rationale":"Auto-populated from symbol"},"side":{"value":"Buy",'
+    '"confidence":"HIGH","rationale":"Order notes indicate buy instruction"},'
+    '"quantity":{"value":500000,"confidence":"HIGH",'
+    '"rationale":"Quantity from client mandate"},"order_type":{"value":"Limit",'
+    '"confidence":"HIGH",'
+    '"rationale":"CAS window detected. Limit order required for auction participation within ±3% band."},'
+    '"price_type":{"value":"Limit","confidence":"HIGH","rationale":"Limit pricing"},'
+    '"limit_price":{"value":12556.5,"confidence":"HIGH",'
+    '"rationale":"CAS: Aggressive limit at +0.8% for high fill probability (Band: 12083.1 - 12830.5)"},'
+    '"tif":{"value":"CAS","confidence":"HIGH",'
+    '"rationale":"CAS window: Order valid only for closing auction"},'
+    '"release_date":{"value":"2026-10-16","confidence":"HIGH",'
+    '"rationale":"Immediate execution requested"},"hold":{"value":"No",'
+    '"confidence":"HIGH","rationale":"High urgency - release immediately"},'
+    '"category":{"value":"Client","confidence":"HIGH","rationale":"Client order flow"},'
+    '"capacity":{"value":"Principal","confidence":"MEDIUM",'
+    '"rationale":"Standard principal capacity"},"account":{"value":"UNALLOC",'
+    '"confidence":"MEDIUM","rationale":"Standard unallocated block order"},'
+    '"service":{"value":"Market","confidence":"HIGH",'
+    '"rationale":"Direct market execution"},"executor":{"value":null,"confidence":"HIGH",'
+    '"rationale":"CAS window: Direct limit order to closing auction"},'
+    '"use_algo":false,"pricing":{"value":"Adaptive","confidence":"HIGH",'
+    '"rationale":"High urgency: Adaptive pricing crosses spread when necessary"},'
+    '"layering":{"value":"Auto","confidence":"HIGH",'
+    '"rationale":"Auto-layering optimizes order book placement dynamically"},'
+    '"urgency_setting":{"value":"High","confidence":"HIGH",'
+    '"rationale":"Urgency score: 98/100 → High"},"get_done":{"value":"True",'
+    '"confidence":"HIGH","rationale":"Force completion by end time"},'
+    '"opening_print":{"value":"False","confidence":"HIGH",'
+    '"rationale":"Order entered after open"},'
+    '"opening_pct":{"value":0,"confidence":"MEDIUM",'
+    '"rationale":"Max % in opening auction"},"closing_print":{"value":"True",'
+    '"confidence":"HIGH",'
+    '"rationale":"Approaching close - participate in closing auction"},'
+    '"closing_pct":{"value":30,"confidence":"MEDIUM",'
+    '"rationale":"Max 30% in closing auction"},'
+    '"min_cross_qty":{"value":100000,"confidence":"MEDIUM",'
+    '"rationale":"Large order: Enable crossing for 20-50% blocks"},'
+    '"max_cross_qty":{"value":250000,"confidence":"MEDIUM",'
+    '"rationale":"Large order: Enable crossing for 20-50% blocks"},'
+    '"cross_qty_unit":{"value":"Shares","confidence":"HIGH","rationale":"Standard unit"},'
+    '"leave_active_slice":{"value":"False","confidence":"HIGH",'
+    '"rationale":"Avoid over-execution during cross"},'
+    '"iwould_price":{"value":null,"confidence":"MEDIUM",'
+    '"rationale":"Not applicable for urgent orders"},'
+    '"iwould_qty":{"value":null,"confidence":"MEDIUM","rationale":"Not applicable"},'
+    '"limit_option":{"value":"Primary Best Bid","confidence":"MEDIUM",'
+    '"rationale":"Peg to best price for aggressive fill"},'
+    '"limit_offset":{"value":1,"confidence":"HIGH","rationale":"1 tick offset"},'
+    '"offset_unit":{"value":"Tick","confidence":"HIGH",'
+    '"rationale":"Standard tick-based offset"}}'
+).encode("utf-8")
+
+DICTIONARIES = {1: _DICTIONARY_V1}
+CURRENT_VERSION = 1
+JSON_COLUMNS = ("prefill_result", "submitted_params", "trader_overrides")
+BLOB_COLUMNS = ("prefill_blob", "params_diff")
+
+
+def compress_json(obj) -> bytes:
+    # Raw deflate: the version byte replaces zlib's header and checksum
+    co = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=DICTIONARIES[CURRENT_VERSION])
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return bytes([CURRENT_VERSION]) + co.compress(data) + co.flush()
+
+
+def decompress_json(blob: bytes):
+    d = zlib.decompressobj(-15, zdict=DICTIONARIES[blob[0]])
+    return json.loads(d.decompress(blob[1:]) + d.flush())
+
+
+def _same(a, b) -> bool:
+    # 1 == True in Python but not in JSON
+    return type(a) is type(b) and a == b
+
+
+def json_diff(base: dict, new: dict) -> dict:
+    """
+    Patch turning `base` into `new`: {"set": {key: value}, "del": [key],
+    "sub": {key: patch}} for nested objects. Empty parts are omitted, so an
+    unchanged object diffs to {}.
+    """
+    patch, changed, nested = {}, {}, {}
+    for k, v in new.items():
+        if k not in base:
+            changed[k] = v
+        elif _same(base[k], v):
+            continue
+        elif isinstance(v, dict) and isinstance(base[k], dict):
+            nested[k] = json_diff(base[k], v)
+        else:
+            changed[k] = v
+    removed = [k for k in base if k not in new]
+    if changed:
+        patch["set"] = changed
+    if removed:
+        patch["del"] = removed
+    if nested:
+        patch["sub"] = nested
+    return patch
+
+
+def apply_diff(base: dict, patch: dict) -> dict:
+    out = dict(base)
+    for k in patch.get("del", ()):
+        out.pop(k, None)
+    for k, sub in patch.get("sub", {}).items():
+        out[k] = apply_diff(out[k], sub)
+    out.update(patch.get("set", {}))
+    return out
+
+
+def encode_params(prefill: dict, submitted: dict) -> Tuple[bytes, Optional[bytes]]:
+    """(prefill_blob, params_diff) column values for a submit"""
+    diff = json_diff(prefill, submitted)
+    return compress_json(prefill), (compress_json(diff) if diff else None)
+
+
+def expand_row(row: dict, parse: bool = False) -> dict:
+    """
+    Rebuild prefill_result / submitted_params for a row read with the blob
+    columns, and drop the blob columns. parse=False leaves the JSON columns
+    as text, like the legacy layout; parse=True decodes them to objects.
+    """
+    blob = row.pop("prefill_blob", None)
+    diff = row.pop("params_diff", None)
+    if blob is not None:
+        prefill = decompress_json(blob)
+        submitted = apply_diff(prefill, decompress_json(diff)) if diff is not None else prefill
+        if parse:
+            row["prefill_result"], row["submitted_params"] = prefill, submitted
+        else:
+            row["prefill_result"], row["submitted_params"] = json.dumps(prefill), json.dumps(submitted)
+    if parse:
+        for k in JSON_COLUMNS:
+            if isinstance(row.get(k), (str, bytes)):
+                row[k] = json.loads(row[k])
+    return row
@@ -0,0 +1,91 @@
+"""
+client_registry.py
+==================
+All client profiles, loaded once into an immutable mapping.
+
+client_profiles is small and rarely changes, so it is read in full at
+startup with urgency_factor already converted to float. refresh() runs a
+one-row version check (row count + MAX(updated_at)) and reloads only when
+that changes. Each load builds a new snapshot, the mapping plus the
+pre-serialized /api/clients payload and its ETag, and swaps it in with a
+single assignment, so readers never see a half-built registry.
+"""
+
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Callable, Hashable, Iterable, Mapping, NamedTuple, Optional
+
+
+class ClientSnapshot(NamedTuple):
+    profiles: Mapping[str, Mapping]      # cpty_id -> read-only profile
+    payload: bytes                       # JSON list served by /api/clients
+    etag: str
+    version: Hashable
+
+
+def _convert(raw: dict) -> dict:
+    row = dict(raw)
+    row["urgency_factor"] = float(row["urgency_factor"])
+    return row
+
+
+def build_snapshot(rows: Iterable[dict], version: Hashable) -> ClientSnapshot:
+    converted = sorted((_convert(r) for r in rows), key=lambda r: r["cpty_id"])
+    # Same compact encoding FastAPI's JSONResponse uses
+    payload = json.dumps(converted, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+    profiles = MappingProxyType({r["cpty_id"]: MappingProxyType(r) for r in converted})
+    return ClientSnapshot(profiles, payload, etag, version)
+
+
+class ClientRegistry:
+    """
+    fetch_all()     -> rows       every client profile
+    fetch_version() -> hashable   changes whenever any profile changes
+    """
+
+    def __init__(self, fetch_all: Callable[[], Iterable[dict]],
+                 fetch_version: Callable[[], Hashable]):
+        self._fetch_all = fetch_all
+        self._fetch_version = fetch_version
+        self._snapshot: Optional[ClientSnapshot] = None
+        self.loads = 0
+        self.checks = 0
+
+    @property
+    def snapshot(self) -> ClientSnapshot:
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    def get(self, cpty_id: str) -> Optional[Mapping]:
+        """Profile from the loaded snapshot; never touches the database"""
+        snap = self._snapshot
+        return snap.profiles.get(cpty_id) if snap else None
+
+    def load(self) -> ClientSnapshot:
+        # Read the version first: a change landing mid-load triggers another reload
+        version = self._fetch_version()
+        self._snapshot = build_snapshot(self._fetch_all(), version)
+        self.loads += 1
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """Reload if the table changed since the last load; True if it did"""
+        self.checks += 1
+        if self._snapshot is not None and self._fetch_version() == self._snapshot.version:
+            return False
+        self.load()
+        return True
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        return {
+            "clients": len(snap.profiles) if snap else 0,
+            "etag": snap.etag if snap else None,
+            "payload_bytes": len(snap.payload) if snap else 0,
+            "version": str(snap.version) if snap else None,
+            "loads": self.loads,
+            "checks": self.checks,
+        }
@@ -0,0 +1,256 @@
+"""
+db_pool.py
+==========
+Bounded, thread-safe pool of DB-API connections.
+
+FastAPI runs sync routes on a worker thread pool, so every route borrows a
+connection here instead of paying TCP + auth + USE on each request:
+
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            ...
+
+Connections are validated with ping() on checkout when they have sat idle
+for a while, recycled once they exceed their idle or total lifetime, and
+dropped when the borrowing code raised one of `broken_errors`. When all
+`max_size` connections are checked out, acquire() waits up to
+`acquire_timeout` seconds and then raises PoolTimeout.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, Tuple
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the acquire timeout"""
+
+
+class _Entry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn, now: float):
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    def __init__(self, connect: Callable[[], Any], min_size: int = 2, max_size: int = 20,
+                 acquire_timeout: float = 5.0, max_idle: float = 300.0,
+                 max_lifetime: float = 3600.0, validate_after: float = 30.0,
+                 broken_errors: Tuple[type, ...] = (),
+                 clock: Callable[[], float] = time.monotonic):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("require 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self.broken_errors = broken_errors
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle: "deque[_Entry]" = deque()    # right end = most recently used
+        self._in_use = {}                         # id(conn) -> _Entry
+        self._size = 0                            # idle + in use + being opened
+        self._closed = False
+        # metrics
+        self.acquired = 0
+        self.created = 0
+        self.closed_count = 0
+        self.recycled = 0
+        self.validation_failures = 0
+        self.connect_errors = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    # ---------- lifecycle ----------
+
+    def warm(self) -> None:
+        """Open connections until min_size are idle (call at startup)"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            entry = self._open()
+            self._checkin(entry)
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones close when released"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    # ---------- checkout ----------
+
+    def acquire(self, timeout: Optional[float] = None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = self._clock()
+        deadline = start + timeout
+        waited = False
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("connection pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"no DB connection available within {timeout:.1f}s "
+                            f"({self._size}/{self.max_size} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                entry = self._open()
+            elif not self._usable(entry):
+                continue
+
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self.acquired += 1
+                if waited:
+                    wait = self._clock() - start
+                    self.waits += 1
+                    self.wait_total += wait
+                    self.wait_max = max(self.wait_max, wait)
+            return entry.conn
+
+    def release(self, conn, broken: bool = False) -> None:
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            raise ValueError("connection does not belong to this pool")
+        if broken or not getattr(conn, "open", True):
+            self._drop(entry)
+        else:
+            entry.last_used = self._clock()
+            self._checkin(entry)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except self.broken_errors:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    # ---------- internals ----------
+
+    def _open(self) -> _Entry:
+        """Open a connection for a slot already counted in _size"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self.connect_errors += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return _Entry(conn, self._clock())
+
+    def _usable(self, entry: _Entry) -> bool:
+        """Recycle stale connections and ping ones idle past validate_after"""
+        now = self._clock()
+        if now - entry.created_at > self.max_lifetime or now - entry.last_used > self.max_idle:
+            with self._cond:
+                self.recycled += 1
+            self._drop(entry)
+            return False
+        if now - entry.last_used > self.validate_after:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self.validation_failures += 1
+                self._drop(entry)
+                return False
+        return True
+
+    def _checkin(self, entry: _Entry) -> None:
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(entry)
+                entry = None
+            self._cond.notify()
+        if entry is not None:
+            self._discard(entry)
+        self._reap()
+
+    def _reap(self) -> None:
+        """Close connections above min_size that have sat idle past max_idle"""
+        stale = []
+        now = self._clock()
+        with self._cond:
+            # Oldest idle connections sit at the left end
+            while (self._idle and self._size > self.min_size
+                   and now - self._idle[0].last_used > self.max_idle):
+                stale.append(self._idle.popleft())
+                self._size -= 1
+                self.recycled += 1
+        for entry in stale:
+            self._discard(entry)
+
+    def _drop(self, entry: _Entry) -> None:
+        """Close a connection that is not in the idle deque and free its slot"""
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._discard(entry)
+
+    def _discard(self, entry: _Entry) -> None:
+        with self._cond:
+            self.closed_count += 1
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "acquired": self.acquired,
+                "created": self.created,
+                "closed": self.closed_count,
+                "recycled": self.recycled,
+                "validation_failures": self.validation_failures,
+                "connect_errors": self.connect_errors,
+                "timeouts": self.timeouts,
+                "waits": self.waits,
+                "wait_ms_mean": round(self.wait_total / self.waits * 1000, 2) if self.waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
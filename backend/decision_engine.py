@@ -0,0 +1,447 @@
+"""
+decision_engine.py
+==================
+Declarative decision rules for the prefill engine, compiled into flat
+lookup tables.
+
+A rule table is plain JSON: for each decision ("field") an ordered list of
+rules, the first one whose conditions hold wins.
+
+    {"fields": {"tif": [
+        {"id": "tif.cas", "when": {"cas": true},
+         "then": {"tif": ["CAS", "HIGH", "CAS window: ..."]}},
+        {"id": "tif.critical", "when": {"urgency": ">90"},
+         "then": {"tif": ["IOC", "MEDIUM", "Critical urgency: ..."]}},
+        {"id": "tif.day", "when": {},
+         "then": {"tif": ["GFD", "HIGH", "Standard day order: ..."]}}]}}
+
+Conditions test one input each: "number" inputs take a comparison
+(">90", ">=80", "<60", "<=25"), "flag" inputs true/false and "label"
+inputs a value or list of values; {"not": ...} negates a label test.
+In "then", a [value, confidence, rationale] triple becomes a response
+field (the rationale may quote inputs, "{size_ratio:.1f}"); anything else
+is a parameter passed through as is.
+
+Compiling splits every number input at the thresholds its field's rules
+mention and every label input into the values they mention plus "other".
+Each combination of buckets is resolved to its winning rule once, so
+evaluating a field is one bucket lookup per input and one list index,
+however many rules there are. The lookup and each rule's outputs are
+generated as small Python functions, close in cost to the if/elif chains
+and dict literals they replace.
+
+The owner declares the inputs and, per field, which inputs it may use and
+which outputs it must produce; a table that breaks that contract, or
+leaves some combination without a rule, is rejected before it can replace
+the running one.
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import string
+import operator
+import threading
+from bisect import bisect_left, bisect_right
+from functools import partial
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+MAX_CELLS = 1 << 16          # per field; guards against a runaway table
+
+_COMPARISON = re.compile(r"^\s*(<=|>=|<|>)\s*(-?\d+(?:\.\d+)?)\s*$")
+_KINDS = ("number", "flag", "label")
+
+
+class RuleError(ValueError):
+    """The rule table is malformed or does not cover every input combination"""
+
+
+# ============================================================
+# COMPILED PIECES
+# ============================================================
+
+class Rule:
+    """
+    One compiled rule. render(ctx) returns its outputs with every triple
+    as a fresh {value, confidence, rationale} dict, rationales formatted.
+    """
+
+    __slots__ = ("id", "then", "render")
+
+    def __init__(self, rule_id: str, then: dict):
+        self.id = rule_id
+        self.then = then
+        self.render = _render_function(then)
+
+    def value(self, key: str):
+        """Raw output: a triple's value or a parameter"""
+        v = self.then[key]
+        return v[0] if isinstance(v, list) else v
+
+
+def _render_function(then: dict):
+    """ctx -> outputs, generated as one dict display with the outputs as constants"""
+    env, items = {}, []
+    for i, (key, v) in enumerate(then.items()):
+        if isinstance(v, list):
+            env[f"v{i}"], env[f"c{i}"], env[f"r{i}"] = v
+            rationale = f"r{i}.format_map(ctx)" if "{" in v[2] else f"r{i}"
+            items.append(f'{key!r}: {{"value": v{i}, "confidence": c{i}, "rationale": {rationale}}}')
+        else:
+            env[f"p{i}"] = v
+            items.append(f"{key!r}: p{i}")
+    exec(f"def render(ctx):\n    return {{{', '.join(items)}}}\n", env)
+    return env["render"]
+
+
+class _Input:
+    """How one input of one field is bucketed"""
+
+    __slots__ = ("name", "kind", "keys", "index", "size", "stride", "bucket")
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.keys: List[Tuple[float, int]] = []    # number: (threshold, 1 if strict) ascending
+        self.index: Dict = {}                      # flag/label: value -> bucket
+        self.size = 0
+        self.stride = 1
+
+    def finish(self, keys: set, values: list) -> None:
+        """Set the buckets and `bucket`, a value -> bucket function"""
+        if self.kind == "number":
+            self.keys = sorted(keys)
+            self.size = len(self.keys) + 1
+            self.bucket = _number_bucket([t for t, strict in self.keys if strict],
+                                         [t for t, strict in self.keys if not strict])
+        elif self.kind == "flag":
+            self.index = {False: 0, True: 1}
+            self.size = 2
+            self.bucket = operator.truth
+        else:
+            for v in values:
+                self.index.setdefault(v, len(self.index))
+            self.size = len(self.index) + 1        # last bucket: any other value
+            self.bucket = lambda v, get=self.index.get, other=self.size - 1: get(v, other)
+
+    def buckets(self, v):
+        """bucket() over a NumPy array (or a scalar)"""
+        if not isinstance(v, np.ndarray):
+            return self.bucket(v)
+        if self.kind == "number":
+            out = np.zeros(v.shape, dtype=np.int64)
+            for t, strict in self.keys:
+                out += (v > t) if strict else (v >= t)
+            return out
+        if self.kind == "flag":
+            return v.astype(bool).astype(np.int64)
+        out = np.full(v.shape, self.size - 1, dtype=np.int64)
+        for value, b in self.index.items():
+            out[v == value] = b
+        return out
+
+    def holds(self, test: tuple, b: int) -> bool:
+        """Does condition `test` hold for every value in bucket b"""
+        if self.kind == "number":
+            key, negate = test
+            return (self.keys.index(key) < b) != negate
+        values, negate = test
+        return any(self.index.get(v) == b for v in values) != negate
+
+
+def _number_bucket(strict: list, loose: list):
+    """
+    Number of thresholds a value is past: the thresholds are nested (each
+    implies the ones below it), so that is how many "> t" and ">= t" hold
+    """
+    if not loose:
+        return partial(bisect_left, strict)
+    if not strict:
+        return partial(bisect_right, loose)
+    return lambda v: bisect_left(strict, v) + bisect_right(loose, v)
+
+
+class _Field:
+    """A field's rules and its lookup table (one rule index per bucket combination)"""
+
+    __slots__ = ("name", "rules", "inputs", "cells", "cells_array", "rule")
+
+    def __init__(self, name: str, rules: List[Rule], inputs: List[_Input], cells: List[int]):
+        self.name = name
+        self.rules = rules
+        self.inputs = inputs
+        self.cells = cells
+        self.cells_array = np.array(cells, dtype=np.int64)
+        self.rule = _lookup_function(inputs, [rules[i] for i in cells])
+
+
+def _lookup_function(inputs: List[_Input], by_cell: List[Rule]):
+    """
+    ctx -> winning Rule, generated as one expression over the field's
+    inputs (cell index = sum of bucket * stride) so a lookup costs a few
+    dict reads and bisects, with no per-input loop
+    """
+    env = {"by_cell": by_cell}
+    terms = []
+    for i, inp in enumerate(inputs):
+        read = f"ctx[{inp.name!r}]"
+        if inp.kind == "flag":
+            terms.append(f"({inp.stride} if {read} else 0)")
+        elif inp.kind == "label":
+            env[f"b{i}"] = inp.index.get
+            terms.append(f"b{i}({read}, {inp.size - 1}) * {inp.stride}")
+        else:
+            env[f"b{i}"] = inp.bucket
+            terms.append(f"b{i}({read}) * {inp.stride}")
+    src = f"def rule(ctx):\n    return by_cell[{' + '.join(terms) or '0'}]\n"
+    exec(src, env)
+    return env["rule"]
+
+
+# ============================================================
+# COMPILER
+# ============================================================
+
+def _parse_test(field: str, rule_id: str, name: str, kind: str, cond) -> tuple:
+    """Condition -> (threshold key, negate) for numbers, (values, negate) otherwise"""
+    where = f"{field}/{rule_id}: '{name}'"
+    if kind == "number":
+        m = _COMPARISON.match(cond) if isinstance(cond, str) else None
+        if not m:
+            raise RuleError(f"{where} needs a comparison such as '>80', got {cond!r}")
+        op, t = m.group(1), float(m.group(2))
+        # everything is "v > t" / "v >= t", possibly negated
+        return {">": ((t, 1), False), ">=": ((t, 0), False),
+                "<": ((t, 0), True), "<=": ((t, 1), True)}[op]
+    negate = isinstance(cond, dict)
+    if negate:
+        if set(cond) != {"not"}:
+            raise RuleError(f"{where} only supports {{'not': ...}}")
+        cond = cond["not"]
+    values = tuple(cond) if isinstance(cond, list) else (cond,)
+    if kind == "flag" and not all(isinstance(v, bool) for v in values):
+        raise RuleError(f"{where} is a flag, conditions must be true/false")
+    if kind == "label" and not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        raise RuleError(f"{where} values must be strings, numbers or null")
+    return values, negate
+
+
+def _is_types(allowed) -> bool:
+    return isinstance(allowed, type) or all(isinstance(a, type) for a in allowed)
+
+
+def _check_then(field: str, rule_id: str, then, outputs: dict, inputs: set) -> None:
+    where = f"{field}/{rule_id}"
+    if not isinstance(then, dict):
+        raise RuleError(f"{where}: 'then' must be an object")
+    missing, extra = set(outputs) - set(then), set(then) - set(outputs)
+    if missing or extra:
+        raise RuleError(f"{where}: outputs must be exactly {sorted(outputs)}")
+    for key, allowed in outputs.items():
+        v = then[key]
+        if isinstance(v, list):
+            if len(v) != 3 or not isinstance(v[1], str) or not isinstance(v[2], str):
+                raise RuleError(f"{where}: '{key}' must be [value, confidence, rationale]")
+            for _, name, spec, _ in string.Formatter().parse(v[2]):
+                if name is not None and name.split(".")[0].split("[")[0] not in inputs:
+                    raise RuleError(f"{where}: '{key}' rationale quotes unknown input '{name}'")
+                if spec and "{" in spec:
+                    raise RuleError(f"{where}: '{key}' rationale has a nested format spec")
+            v = v[0]
+        if allowed is None:
+            continue
+        if _is_types(allowed):
+            if not isinstance(v, allowed) or isinstance(v, bool):
+                raise RuleError(f"{where}: '{key}' must be a number, got {v!r}")
+        elif v not in allowed:
+            raise RuleError(f"{where}: '{key}' must be one of {list(allowed)}, got {v!r}")
+
+
+def _compile_field(field: str, rules, spec: dict, kinds: dict) -> _Field:
+    if not isinstance(rules, list) or not rules:
+        raise RuleError(f"{field}: needs a non-empty list of rules")
+    allowed = set(spec["inputs"])
+    compiled, tests, seen = [], [], set()
+    for n, raw in enumerate(rules):
+        if not isinstance(raw, dict) or set(raw) - {"id", "when", "then", "note"}:
+            raise RuleError(f"{field}: rule {n} must be an object with id, when, then (and note)")
+        rule_id = str(raw.get("id") or f"{field}.{n}")
+        if rule_id in seen:
+            raise RuleError(f"{field}: duplicate rule id '{rule_id}'")
+        seen.add(rule_id)
+        when = raw.get("when") or {}
+        if not isinstance(when, dict):
+            raise RuleError(f"{field}/{rule_id}: 'when' must be an object")
+        unknown = set(when) - allowed
+        if unknown:
+            raise RuleError(f"{field}/{rule_id}: unknown inputs {sorted(unknown)} "
+                            f"(this field may use {sorted(allowed)})")
+        tests.append({name: _parse_test(field, rule_id, name, kinds[name], cond)
+                      for name, cond in when.items()})
+        _check_then(field, rule_id, raw.get("then"), spec["outputs"], allowed)
+        compiled.append(Rule(rule_id, raw["then"]))
+
+    # Bucket only the inputs some rule actually tests, in a fixed order
+    inputs = {}
+    for name in sorted({name for t in tests for name in t}):
+        inp = inputs[name] = _Input(name, kinds[name])
+        parsed = [t[name] for t in tests if name in t]
+        inp.finish({key for key, _ in parsed} if inp.kind == "number" else set(),
+                   [v for values, _ in parsed for v in values] if inp.kind == "label" else [])
+    order = list(inputs.values())
+    size = 1
+    for inp in reversed(order):
+        inp.stride = size
+        size *= inp.size
+    if size > MAX_CELLS:
+        raise RuleError(f"{field}: {size} bucket combinations (max {MAX_CELLS})")
+
+    cells = []
+    for combo in itertools.product(*(range(inp.size) for inp in order)):
+        buckets = dict(zip(inputs, combo))
+        for i, t in enumerate(tests):
+            if all(inputs[name].holds(test, buckets[name]) for name, test in t.items()):
+                cells.append(i)
+                break
+        else:
+            raise RuleError(f"{field}: no rule matches {_describe(order, combo)}; "
+                            f"end the list with a catch-all rule")
+    return _Field(field, compiled, order, cells)
+
+
+def _threshold(key: tuple) -> str:
+    return f"{'>' if key[1] else '>='}{key[0]:g}"
+
+
+def _describe(order: List[_Input], combo: tuple) -> str:
+    """Human-readable bucket combination, for compile errors"""
+    parts = []
+    for inp, b in zip(order, combo):
+        if inp.kind == "number":
+            bounds = ([_threshold(inp.keys[b - 1])] if b else []) + \
+                     ([f"not {_threshold(inp.keys[b])}"] if b < len(inp.keys) else [])
+            parts.append(f"{inp.name} {' and '.join(bounds)}")
+        else:
+            names = [k for k, v in inp.index.items() if v == b]
+            parts.append(f"{inp.name}={names[0]!r}" if names else f"{inp.name}=<other>")
+    return ", ".join(parts) or "any input"
+
+
+class DecisionTable:
+    """
+    An immutable compiled rule table. `inputs` maps input name -> kind
+    ("number", "flag", "label"); `fields` maps field -> {"inputs": names it
+    may use, "outputs": {key: tuple of allowed values, a number type
+    (float, or (int, float)), or None for anything}}.
+    """
+
+    def __init__(self, rules: dict, inputs: Dict[str, str], fields: Dict[str, dict]):
+        for name, kind in inputs.items():
+            if kind not in _KINDS:
+                raise ValueError(f"input '{name}': kind must be one of {_KINDS}")
+        if not isinstance(rules, dict) or not isinstance(rules.get("fields"), dict):
+            raise RuleError("rule table must be an object with a 'fields' object")
+        table = rules["fields"]
+        missing, extra = set(fields) - set(table), set(table) - set(fields)
+        if missing or extra:
+            raise RuleError(f"rule table must define exactly the fields {sorted(fields)} "
+                            f"(missing {sorted(missing)}, unknown {sorted(extra)})")
+        self.source = rules
+        self.version = hashlib.blake2b(json.dumps(rules, sort_keys=True).encode("utf-8"),
+                                       digest_size=8).hexdigest()
+        self._fields = {name: _compile_field(name, table[name], fields[name], inputs)
+                        for name in fields}
+
+    def rule(self, field: str, ctx: dict) -> Rule:
+        """The winning rule for `field`; ctx must hold the field's declared inputs"""
+        return self._fields[field].rule(ctx)
+
+    def decide(self, field: str, ctx: dict) -> dict:
+        return self._fields[field].rule(ctx).render(ctx)
+
+    def trace(self, ctx: dict) -> Dict[str, str]:
+        """field -> id of the rule that fires, for a context holding every input"""
+        return {name: f.rule(ctx).id for name, f in self._fields.items()}
+
+    def rules(self, field: str) -> List[Rule]:
+        return self._fields[field].rules
+
+    def select(self, field: str, columns: dict) -> np.ndarray:
+        """Winning rule positions (into rules(field)) for inputs given as arrays or scalars"""
+        f = self._fields[field]
+        cell = 0
+        for inp in f.inputs:
+            cell = cell + inp.buckets(columns[inp.name]) * inp.stride
+        shape = np.broadcast_shapes(*(np.shape(v) for v in columns.values()))
+        return np.broadcast_to(f.cells_array[cell], shape)
+
+    def summary(self) -> dict:
+        return {
+            name: {"rules": len(f.rules), "cells": len(f.cells),
+                   "inputs": {inp.name: inp.size for inp in f.inputs}}
+            for name, f in self._fields.items()
+        }
+
+
+# ============================================================
+# RUNTIME HOLDER
+# ============================================================
+
+def load_rules(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+class DecisionEngine:
+    """
+    Holds the live DecisionTable. install() compiles the new table first and
+    swaps it in with one assignment, so a prefill sees either the old or the
+    new table; readers take `table` once and use it for the whole request.
+    """
+
+    def __init__(self, inputs: Dict[str, str], fields: Dict[str, dict], path: Optional[str] = None):
+        self.inputs = inputs
+        self.fields = fields
+        self.path = path
+        self._lock = threading.Lock()
+        self.swaps = 0
+        self.loaded_at = None
+        self.origin = None
+        self.table: Optional[DecisionTable] = None
+        if path:
+            self.reload()
+
+    def install(self, rules: dict, origin: str = "api") -> DecisionTable:
+        table = DecisionTable(rules, self.inputs, self.fields)     # raises RuleError
+        with self._lock:
+            if self.table is not None:
+                self.swaps += 1
+            self.table = table
+            self.loaded_at = datetime.utcnow().isoformat() + "Z"
+            self.origin = origin
+        return table
+
+    def reload(self) -> DecisionTable:
+        """Re-read the rules file (the table loaded at startup)"""
+        if not self.path:
+            raise RuleError("no rules file configured")
+        try:
+            rules = load_rules(self.path)
+        except (OSError, json.JSONDecodeError) as e:
+            raise RuleError(f"cannot load {self.path}: {e}") from None
+        return self.install(rules, origin=self.path)
+
+    def stats(self) -> dict:
+        table = self.table
+        return {
+            "version": table.version if table else None,
+            "origin": self.origin,
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+            "fields": table.summary() if table else {},
+        }
@@ -0,0 +1,70 @@
+"""
+intent_cache.py
+===============
+Memoizing layer in front of OrderIntentParser.parse.
+
+Traders paste the same few notes over and over, so parsed intents are kept
+in an LRU cache keyed on the normalized note text (the same lowercased,
+stripped string the parser works on). The cache is dropped automatically
+whenever the parser's pattern tables change.
+"""
+
+import sys
+import threading
+from typing import Optional
+
+from lru_cache import LRUCache
+from order_parser import OrderIntentParser, OrderIntent
+
+
+def _intent_footprint(key: tuple, intent: OrderIntent) -> int:
+    """Approximate bytes held by one cache entry"""
+    size = sys.getsizeof(key) + sys.getsizeof(key[1]) + sys.getsizeof(intent)
+    if intent.deadline_time:
+        size += sys.getsizeof(intent.deadline_time)
+    return size
+
+
+class IntentCache:
+    """Caches immutable OrderIntent results per normalized note"""
+
+    def __init__(self, parser=OrderIntentParser, maxsize: int = 4096,
+                 ttl: Optional[float] = 3600.0):
+        self.parser = parser
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl, sizeof=_intent_footprint)
+        self._lock = threading.Lock()
+        self._version = parser.pattern_version()
+        self.invalidations = 0
+
+    def parse(self, notes: str) -> OrderIntent:
+        if not notes:
+            # Empty notes short-circuit to the default intent inside the parser
+            return self.parser.parse(notes)
+
+        key = (self._check_version(), notes.lower().strip())
+        intent = self._cache.get(key)
+        if intent is None:
+            intent = self.parser.parse(notes)
+            self._cache.put(key, intent)
+        return intent
+
+    def _check_version(self) -> int:
+        """Drop every entry once the pattern tables move to a new version"""
+        version = self.parser.pattern_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._cache.clear()
+                    self._version = version
+                    self.invalidations += 1
+        return version
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "pattern_version": self._version,
+            "invalidations": self.invalidations,
+        }
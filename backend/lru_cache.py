@@ -0,0 +1,103 @@
+"""
+lru_cache.py
+============
+Small thread-safe LRU cache with optional TTL and hit-rate statistics.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry once
+    `maxsize` is reached and drops entries older than `ttl` seconds.
+
+    `sizeof(key, value)` estimates the bytes held by one entry; the running
+    total is reported as `memory_bytes` in stats().
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 sizeof: Optional[Callable[[Any, Any], int]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda k, v: sys.getsizeof(k) + sys.getsizeof(v))
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, stored_at, size)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, stored_at, size = entry
+            if self.ttl is not None and self._clock() - stored_at > self.ttl:
+                del self._data[key]
+                self._memory -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(key, value)
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING:
+                self._memory -= old[2]
+            self._data[key] = (value, self._clock(), size)
+            self._memory += size
+            while len(self._data) > self.maxsize:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._memory -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            self._memory -= entry[2]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._memory = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_bytes": self._memory,
+            }
@@ -1,23 +1,61 @@
 """
-AUO Backend — Single-file FastAPI server
-=========================================
-All business logic inlined (no modularization).
+AUO Backend — FastAPI server
+============================
+Routes, request schemas and the prefill orchestrator live here; the
+supporting pieces are separate modules:
+
+  order_parser, parser_backends,   note parsing, swappable parser backends
+  intent_cache                     and the parsed-intent cache
+  decision_engine                  rule tables compiled from decision_rules.json
+  prefill_cache                    prefill result cache
+  market_cache, client_registry,   in-memory reference data, kept fresh by
+  refresher                        background refreshers
+  db_pool, aio_db                  sync and async MySQL pools
+  order_journal                    write-behind submit journal
+  order_archive, order_stats       partition archival and blotter counters
+  blob_codec                       compact prefill storage on order_data
+  lru_cache                        shared LRU/TTL cache
+
 Response JSON matches the frontend's mockPrefill() schema exactly.
 
 Run:  uvicorn main:app --reload --port 8000
 """
-from order_parser import OrderIntentParser, OrderIntent
+from order_parser import OrderIntent, Urgency, ExecutionStyle, Session, PriceSensitivity
+from intent_cache import IntentCache
+from lru_cache import LRUCache
+from db_pool import ConnectionPool, PoolTimeout
+from aio_db import AsyncDB
+from market_cache import MarketCache, MarketEntry
+from client_registry import ClientRegistry
+from prefill_cache import PrefillCache
+from order_stats import AGGREGATE_SQL, OrderStats
+from order_archive import OrderArchiver
+from order_journal import IdAllocator, OrderJournal
+from blob_codec import BLOB_COLUMNS, encode_params, expand_row, json_diff
+from decision_engine import DecisionEngine, DecisionTable, RuleError
+from refresher import PeriodicRefresher
+from parser_backends import ShadowRunner, available_backends, get_backend
 
 import os
+import re
+import asyncio
+import csv
+import io
+import itertools
 import json
+import secrets
+import threading
 import time as _time
-from datetime import datetime, date
-from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from typing import List, NamedTuple, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
+import numpy as np
 import pymysql
 import pymysql.cursors
 
@@ -48,10 +86,439 @@ DB_CONFIG = {
     "autocommit": True,
 }
 
+# Sized for FastAPI's sync worker threads (40 by default); keep DB_POOL_MAX
+# comfortably below MySQL's max_connections across all server processes.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))           # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))       # close idle connections after this
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 3600))
+
+db_pool = ConnectionPool(
+    lambda: pymysql.connect(**DB_CONFIG),
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    acquire_timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_MAX_IDLE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    broken_errors=(pymysql.err.OperationalError, pymysql.err.InterfaceError),
+)
+
+
+# DB_ASYNC=1 serves the request path from async handlers on an aiomysql
+# pool (same sizing) instead of sync handlers on the threadpool. The
+# blotter endpoints stay sync on db_pool in both modes.
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+aio_db = AsyncDB(DB_CONFIG, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+                 acquire_timeout=DB_POOL_TIMEOUT, max_lifetime=DB_POOL_MAX_LIFETIME)
+
+
+@app.on_event("startup")
+async def open_db_pool():
+    try:
+        if DB_ASYNC:
+            await aio_db.start()
+        else:
+            db_pool.warm()
+    except pymysql.MySQLError as e:
+        # Let the server come up; the pools connect on first use once the DB is
+        # back, and until then routes answer 503
+        print(f"DB pool warm-up failed: {e}")
+
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await aio_db.close()
+    db_pool.close()
+
+
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+# ============================================================
+# INTENT PARSER  (backend registry, shadow mode, cache)
+# ============================================================
+# PARSER_BACKEND picks the parser serving responses. Setting
+# PARSER_SHADOW_BACKEND re-parses a PARSER_SHADOW_RATE fraction of
+# /api/prefill notes with both backends on a background thread and
+# records latency + disagreements (see /api/parser/stats).
+
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "compiled")
+PARSER_SHADOW_BACKEND = os.getenv("PARSER_SHADOW_BACKEND", "")
+PARSER_SHADOW_RATE = float(os.getenv("PARSER_SHADOW_RATE", 0.01))
+
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", 4096))
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", 3600))
+
+parser_backend = get_backend(PARSER_BACKEND)
+parser_shadow = (
+    ShadowRunner(parser_backend, get_backend(PARSER_SHADOW_BACKEND), PARSER_SHADOW_RATE)
+    if PARSER_SHADOW_BACKEND else None
+)
+# Parsed intents keyed on normalized note text; sized via /api/intent-cache/stats
+intent_cache = IntentCache(parser=parser_backend, maxsize=INTENT_CACHE_SIZE,
+                           ttl=INTENT_CACHE_TTL)
+
+
+# ============================================================
+# MARKET SNAPSHOT CACHE
+# ============================================================
+# Latest snapshot per symbol, held in memory so prefill needs no market_data
+# round-trip in steady state. Rows come from market_latest (one row per
+# symbol, kept current by an insert trigger on market_data). A refresher
+# thread polls it every MARKET_REFRESH_INTERVAL seconds on updated_at, which
+# catches both new snapshots and TTC edits; entries not confirmed within
+# MARKET_CACHE_MAX_AGE seconds are reloaded on read.
+
+MARKET_CACHE_MAX_AGE = float(os.getenv("MARKET_CACHE_MAX_AGE", 5))
+MARKET_REFRESH_INTERVAL = float(os.getenv("MARKET_REFRESH_INTERVAL", 1))
+
+MARKET_COLUMNS = (
+    "snapshot_id, symbol, ltp, bid, ask, time_to_close, volatility_pct, avg_trade_size, updated_at"
+)
+MARKET_LATEST_SQL = f"SELECT {MARKET_COLUMNS} FROM market_latest WHERE symbol = %s"
+MARKET_ALL_LATEST_SQL = f"SELECT {MARKET_COLUMNS} FROM market_latest"
+MARKET_IN_SQL = f"SELECT {MARKET_COLUMNS} FROM market_latest WHERE symbol IN %s"
+# >= so rows committed within the same microsecond as the watermark are not
+# skipped; unchanged rows are ignored by the cache
+MARKET_SINCE_SQL = (
+    f"SELECT {MARKET_COLUMNS} FROM market_latest WHERE updated_at >= %s ORDER BY updated_at"
+)
+
+
+def _db_fetchone(sql: str, args=None) -> Optional[dict]:
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, args)
+            return cur.fetchone()
+
+
+def _db_fetchall(sql: str, args=None) -> list:
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, args)
+            return list(cur.fetchall())
+
 
-def get_db():
-    """Return a fresh DB connection (simple approach for MVP)."""
-    return pymysql.connect(**DB_CONFIG)
+def _fetch_market_async(symbol: str):
+    return aio_db.fetchone(MARKET_LATEST_SQL, (symbol,))
+
+
+def _fetch_markets(symbols: list) -> list:
+    return _db_fetchall(MARKET_IN_SQL, (tuple(symbols),))
+
+
+def _fetch_markets_async(symbols: list):
+    return aio_db.fetchall(MARKET_IN_SQL, (tuple(symbols),))
+
+
+market_cache = MarketCache(
+    fetch_latest=lambda symbol: _db_fetchone(MARKET_LATEST_SQL, (symbol,)),
+    fetch_all_latest=lambda: _db_fetchall(MARKET_ALL_LATEST_SQL),
+    fetch_since=lambda mark: _db_fetchall(MARKET_SINCE_SQL, (mark,)),
+    max_age=MARKET_CACHE_MAX_AGE,
+    watermark="updated_at",
+)
+market_refresher = PeriodicRefresher("market-refresh", market_cache.refresh, MARKET_REFRESH_INTERVAL)
+
+
+@app.on_event("startup")
+def load_market_cache():
+    try:
+        market_cache.load_all()
+    except pymysql.MySQLError as e:
+        # Entries load lazily on first read instead
+        print(f"Market cache preload failed: {e}")
+    market_refresher.start()
+
+
+@app.on_event("shutdown")
+def stop_market_refresher():
+    market_refresher.stop()
+
+
+# ============================================================
+# CLIENT PROFILE REGISTRY
+# ============================================================
+# Every client profile in memory, swapped atomically when the
+# CLIENT_REFRESH_INTERVAL version check sees client_profiles change.
+
+CLIENT_REFRESH_INTERVAL = float(os.getenv("CLIENT_REFRESH_INTERVAL", 30))
+
+CLIENTS_SQL = (
+    "SELECT cpty_id, client_name, urgency_factor, "
+    "price_sensitivity, execution_model FROM client_profiles ORDER BY cpty_id"
+)
+CLIENTS_VERSION_SQL = "SELECT COUNT(*) AS n, MAX(updated_at) AS updated_at FROM client_profiles"
+
+
+def _clients_version() -> tuple:
+    row = _db_fetchone(CLIENTS_VERSION_SQL)
+    return (row["n"], row["updated_at"])
+
+
+client_registry = ClientRegistry(
+    fetch_all=lambda: _db_fetchall(CLIENTS_SQL),
+    fetch_version=_clients_version,
+)
+client_refresher = PeriodicRefresher("client-refresh", client_registry.refresh, CLIENT_REFRESH_INTERVAL)
+
+
+@app.on_event("startup")
+def load_client_registry():
+    try:
+        client_registry.load()
+    except pymysql.MySQLError as e:
+        # The first refresh (or /api/clients) loads it instead
+        print(f"Client registry preload failed: {e}")
+    client_refresher.start()
+
+
+@app.on_event("shutdown")
+def stop_client_refresher():
+    client_refresher.stop()
+
+
+# ============================================================
+# PREFILL RESULT CACHE AND SESSIONS
+# ============================================================
+# Repeat /api/prefill calls (same symbol, client, size, notes, TTC) are
+# served from an LRU of finished results, keyed on the request fields plus
+# the market entry, client registry and parser pattern versions and the
+# date, so any change to an input misses. PREFILL_CACHE_SIZE=0 disables it;
+# PREFILL_CACHE_REFRESH_METADATA=0 serves hits with their original
+# timestamp and processing_time_ms.
+
+PREFILL_CACHE_SIZE = int(os.getenv("PREFILL_CACHE_SIZE", 2048))
+PREFILL_CACHE_TTL = float(os.getenv("PREFILL_CACHE_TTL", 0)) or None
+PREFILL_CACHE_REFRESH_METADATA = os.getenv("PREFILL_CACHE_REFRESH_METADATA", "1") == "1"
+
+prefill_cache = (
+    PrefillCache(maxsize=PREFILL_CACHE_SIZE, ttl=PREFILL_CACHE_TTL,
+                 refresh_metadata=PREFILL_CACHE_REFRESH_METADATA)
+    if PREFILL_CACHE_SIZE > 0 else None
+)
+
+# POST /api/prefill/session returns the full prefill plus a session token;
+# POST /api/prefill/session/{token}/ttc?ttc=N then returns only the
+# json_diff patch against the previous result. Sessions live in memory for
+# PREFILL_SESSION_TTL seconds after their last use.
+
+PREFILL_SESSION_TTL = float(os.getenv("PREFILL_SESSION_TTL", 1800))
+PREFILL_SESSION_MAX = int(os.getenv("PREFILL_SESSION_MAX", 10000))
+
+prefill_sessions = LRUCache(maxsize=PREFILL_SESSION_MAX, ttl=PREFILL_SESSION_TTL)
+
+
+# ============================================================
+# ORDER ARCHIVE
+# ============================================================
+# order_data keeps one partition per day; partitions older than
+# ORDER_RETENTION_DAYS (0 = keep everything) move to order_data_archive.
+# Blotter reads split at the archive horizon and only touch the archive
+# when their date range reaches before it. Processes with ORDER_ARCHIVE_JOB=1
+# run the maintenance job, one at a time under a MySQL named lock; the
+# others only poll the horizon, every ORDER_ARCHIVE_HORIZON_REFRESH seconds.
+
+ORDER_RETENTION_DAYS = int(os.getenv("ORDER_RETENTION_DAYS", 90))
+ORDER_PARTITION_DAYS_AHEAD = int(os.getenv("ORDER_PARTITION_DAYS_AHEAD", 7))
+ORDER_ARCHIVE_JOB = os.getenv("ORDER_ARCHIVE_JOB", "1") == "1"
+ORDER_ARCHIVE_INTERVAL = float(os.getenv("ORDER_ARCHIVE_INTERVAL", 3600))
+ORDER_ARCHIVE_HORIZON_REFRESH = float(os.getenv("ORDER_ARCHIVE_HORIZON_REFRESH", 30))
+
+
+def _db_execute(sql: str, args=None) -> None:
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, args)
+
+
+@contextmanager
+def _archive_lock():
+    # A named lock belongs to the connection that took it: hold one for the pass
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT GET_LOCK('order_data_archive', 0) AS held")
+            held = cur.fetchone()["held"] == 1
+        try:
+            yield held
+        finally:
+            if held:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT RELEASE_LOCK('order_data_archive')")
+
+
+order_archiver = OrderArchiver(_db_fetchall, _db_execute, retention_days=ORDER_RETENTION_DAYS,
+                               days_ahead=ORDER_PARTITION_DAYS_AHEAD, maintain=ORDER_ARCHIVE_JOB,
+                               lock=_archive_lock)
+order_archive_job = PeriodicRefresher(
+    "order-archive", order_archiver.run,
+    ORDER_ARCHIVE_INTERVAL if ORDER_ARCHIVE_JOB else ORDER_ARCHIVE_HORIZON_REFRESH)
+
+
+@app.on_event("startup")
+def start_order_archive():
+    try:
+        order_archiver.run()
+    except pymysql.MySQLError as e:
+        print(f"Order archive maintenance failed: {e}")
+    order_archive_job.start()
+
+
+@app.on_event("shutdown")
+def stop_order_archive():
+    order_archive_job.stop()
+
+
+# ============================================================
+# BLOTTER STATISTICS
+# ============================================================
+# Counters maintained on submit/cancel; rebuilt from one aggregate query at
+# startup and every ORDER_STATS_RECONCILE_INTERVAL seconds.
+
+ORDER_STATS_RECONCILE_INTERVAL = float(os.getenv("ORDER_STATS_RECONCILE_INTERVAL", 60))
+
+
+_archived_groups = {"horizon": None, "groups": []}
+
+
+def _archived_stat_groups(horizon: Optional[date]) -> list:
+    # Archived orders never change: aggregate them once per horizon move
+    if horizon is None:
+        return []
+    if _archived_groups["horizon"] != horizon:
+        _archived_groups["groups"] = _db_fetchall(
+            AGGREGATE_SQL.format(table="order_data_archive", where="WHERE arrival_time < %s "),
+            (horizon,))
+        _archived_groups["horizon"] = horizon
+    return _archived_groups["groups"]
+
+
+def _order_stat_groups(max_order_id: Optional[int]) -> list:
+    # Split at the horizon like blotter reads: a partition already copied to
+    # the archive but not yet dropped is counted from the archive only
+    horizon = order_archiver.horizon
+    conds, args = [], []
+    if max_order_id is not None:
+        conds.append("order_id <= %s")
+        args.append(max_order_id)
+    if horizon is not None:
+        conds.append("arrival_time >= %s")
+        args.append(horizon)
+    where = f"WHERE {' AND '.join(conds)} " if conds else ""
+    hot = _db_fetchall(AGGREGATE_SQL.format(table="order_data", where=where), tuple(args) or None)
+    return hot + _archived_stat_groups(horizon)
+
+
+order_stats = OrderStats(
+    fetch_groups=_order_stat_groups,
+    fetch_max_order_id=lambda: _db_fetchone("SELECT MAX(order_id) AS m FROM order_data")["m"],
+)
+order_stats_reconciler = PeriodicRefresher("order-stats-reconcile", order_stats.reconcile,
+                                           ORDER_STATS_RECONCILE_INTERVAL)
+
+
+@app.on_event("startup")
+def load_order_stats():
+    try:
+        order_stats.reconcile()
+    except pymysql.MySQLError as e:
+        # /api/orders/stats loads on first request instead
+        print(f"Order stats preload failed: {e}")
+    order_stats_reconciler.start()
+
+
+@app.on_event("shutdown")
+def stop_order_stats_reconciler():
+    order_stats_reconciler.stop()
+
+
+# ============================================================
+# WRITE-BEHIND ORDER JOURNAL
+# ============================================================
+# ORDER_WRITE_BEHIND=1: submits are acknowledged once fsynced to a local
+# journal and written to order_data by a background writer in batched
+# transactions. Enable it in every server process that submits orders, so
+# IDs all come from order_id_seq rather than AUTO_INCREMENT. A submitted
+# order can take up to one flush to appear in /api/orders.
+
+ORDER_WRITE_BEHIND = os.getenv("ORDER_WRITE_BEHIND", "0") == "1"
+ORDER_JOURNAL_PATH = os.getenv("ORDER_JOURNAL_PATH", "order_journal.jsonl")
+ORDER_JOURNAL_BATCH = int(os.getenv("ORDER_JOURNAL_BATCH", 500))
+ORDER_ID_BLOCK = int(os.getenv("ORDER_ID_BLOCK", 1000))
+
+# Same columns as SUBMIT_SQL plus the pre-allocated order_id. The no-op
+# ON DUPLICATE KEY UPDATE makes replaying a batch that was committed just
+# before a crash harmless without IGNORE's downgrading of data errors to
+# warnings; rows MySQL rejects are dead-lettered by the journal.
+JOURNAL_INSERT_SQL = (
+    "INSERT INTO order_data "
+    "(order_id, symbol, cpty_id, side, size, order_notes, arrival_time, "
+    " prefill_blob, params_diff, trader_overrides, "
+    " urgency_score, urgency_class, executor, order_type, tif, "
+    " submission_status, submitted_at) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE order_id = order_id"
+)
+RESERVE_IDS_SQL = (
+    "UPDATE order_id_seq SET next_id = LAST_INSERT_ID("
+    "GREATEST(next_id, (SELECT COALESCE(MAX(order_id), 0) + 1 FROM order_data), "
+    "(SELECT COALESCE(MAX(order_id), 0) + 1 FROM order_data_archive)) + %s) "
+    "WHERE name = 'order_data'"
+)
+
+
+def _reserve_order_ids(n: int) -> int:
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(RESERVE_IDS_SQL, (n,))
+            # LAST_INSERT_ID() is per connection: this is our block's end
+            cur.execute("SELECT LAST_INSERT_ID() - %s AS first_id", (n,))
+            return cur.fetchone()["first_id"]
+
+
+def _flush_journal(entries: list) -> None:
+    with db_pool.connection() as conn:
+        conn.begin()
+        try:
+            with conn.cursor() as cur:
+                # pymysql folds executemany INSERTs into multi-row statements, but
+                # only when VALUES is all placeholders: pass the status as one
+                cur.executemany(JOURNAL_INSERT_SQL, [(e.order_id, *e.params[:-1], "Submitted", e.params[-1])
+                                                     for e in entries])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+order_ids = IdAllocator(_reserve_order_ids, block_size=ORDER_ID_BLOCK)
+order_journal = OrderJournal(ORDER_JOURNAL_PATH, _flush_journal, batch_size=ORDER_JOURNAL_BATCH,
+                             reject=(pymysql.err.DataError, pymysql.err.IntegrityError))
+
+
+def _journal_submit(params: tuple) -> int:
+    order_id = order_ids.next_id()
+    order_journal.append(order_id, params)
+    return order_id
+
+
+@app.on_event("startup")
+def start_order_journal():
+    if ORDER_WRITE_BEHIND:
+        replayed = order_journal.recover()
+        if replayed:
+            print(f"Order journal: replaying {replayed} unflushed submits")
+        order_journal.start()
+
+
+@app.on_event("shutdown")
+def stop_order_journal():
+    # Entries not drained here are replayed on the next start
+    order_journal.stop()
 
 
 # ============================================================
@@ -75,6 +542,31 @@ class SubmitRequest(BaseModel):
     order_notes: str = ""
     prefilled_params: dict = {}
     trader_overrides: dict = {}
+    # Top-level prefill outputs, stored in their own columns for the blotter
+    urgency_score: Optional[int] = None
+    urgency_classification: Optional[str] = None
+
+
+class BatchPrefillRequest(BaseModel):
+    orders: List[PrefillRequest]
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float                     # inclusive
+    step: float = 1
+
+
+class PrefillSweepRequest(BaseModel):
+    order: PrefillRequest
+    time_to_close: Optional[SweepRange] = None
+    size: Optional[SweepRange] = None
+    urgency_factor: Optional[SweepRange] = None
+
+
+class BatchSubmitRequest(BaseModel):
+    orders: List[SubmitRequest]
+    mode: str = "all_or_nothing"    # or "best_effort"
 
 
 # ============================================================
@@ -90,6 +582,17 @@ URGENCY_KEYWORDS_NEGATIVE = [
     ("patient", -5), ("no urgency", -5), ("no rush", -5),
 ]
 
+SIDE_KEYWORDS_BUY = ("buy", "purchase", "long")
+SIDE_KEYWORDS_SELL = ("sell", "liquidate", "short")
+
+# Every substring the sub-engines look for in order notes. NotesAnalysis
+# scans for all of them in one pass; add new keywords here.
+NOTES_KEYWORDS = tuple(dict.fromkeys(
+    [kw for kw, _ in URGENCY_KEYWORDS_POSITIVE + URGENCY_KEYWORDS_NEGATIVE]
+    + list(SIDE_KEYWORDS_BUY + SIDE_KEYWORDS_SELL)
+    + ["immediate", "vwap", "twap", "must complete"]
+))
+
 CAS_THRESHOLD = 25          # minutes — anything <= this is CAS
 CAS_BAND_UPPER = 1.03       # +3 %
 CAS_BAND_LOWER = 0.97       # -3 %
@@ -103,11 +606,69 @@ IWOULD_URGENCY_THRESHOLD = 40
 IWOULD_PRICE_OFFSET = 0.005
 IWOULD_QTY_PCT = 0.3
 
-LIMIT_PEG_URGENCY_THRESHOLD = 80
+# Classification, order type, limit price, TIF, executor, VWAP settings,
+# limit adjustment and hold come from the rule table in decision_rules.json,
+# compiled by decision_engine into one lookup table per decision. PUT
+# /api/decision-rules installs a new table without a restart; POST
+# /api/decision-rules/reload re-reads the file. DECISION_TRACE=1 adds the
+# id of the rule behind each decision to the prefill metadata.
+
+DECISION_RULES_PATH = os.getenv(
+    "DECISION_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "decision_rules.json"))
+DECISION_TRACE = os.getenv("DECISION_TRACE", "0") == "1"
+
+# What the rules may branch on (and quote in rationales)
+DECISION_INPUTS = {
+    "urgency": "number", "uf": "number", "volatility": "number", "size_ratio": "number",
+    "ttc": "number", "lower_band": "number", "upper_band": "number",
+    "cas": "flag", "must_complete": "flag", "has_deadline": "flag",
+    "minimize_impact": "flag", "notes_must_complete": "flag",
+    "notes_immediate": "flag", "notes_vwap": "flag", "notes_twap": "flag",
+    "side": "label", "style": "label", "session": "label", "algo": "label", "deadline": "label",
+}
+
+LIMIT_PRICES = ("cas_upper", "cas_lower", "ask", "bid", "mid", "near_bid", "near_ask")
+LIMIT_ADJUSTMENTS = (None, "passive_bid", "passive_ask", "ask", "bid")
+
+# Per decision: the inputs its rules may use, and the outputs every rule
+# must produce (allowed values, a number type, or None for any
+# [value, confidence, rationale] field)
+DECISION_FIELDS = {
+    "classification": {"inputs": ("urgency",),
+                       "outputs": {"classification": ("CRITICAL", "HIGH", "MEDIUM", "LOW")}},
+    "order_type": {"inputs": ("cas", "urgency", "uf", "volatility"),
+                   "outputs": {"order_type": ("Limit", "Market"), "price_type": None}},
+    "cas_mult": {"inputs": ("side", "urgency"), "outputs": {"mult": (int, float)}},
+    "limit_price": {"inputs": ("cas", "side", "urgency", "lower_band", "upper_band"),
+                    "outputs": {"price": LIMIT_PRICES, "limit_price": (None,)}},
+    "limit_style": {"inputs": ("style", "cas", "side", "urgency"),
+                    "outputs": {"adjust": LIMIT_ADJUSTMENTS, "limit_price": None}},
+    "tif": {"inputs": ("cas", "must_complete", "urgency"), "outputs": {"tif": None}},
+    "executor": {"inputs": ("cas", "algo", "minimize_impact", "size_ratio", "urgency"),
+                 "outputs": {"executor": None, "service": None, "use_algo": (True, False)}},
+    "pricing": {"inputs": ("style", "urgency", "volatility"), "outputs": {"pricing": None}},
+    "urgency_setting": {"inputs": ("style", "urgency"), "outputs": {"urgency_setting": None}},
+    "get_done": {"inputs": ("must_complete", "has_deadline", "deadline", "urgency", "notes_must_complete"),
+                 "outputs": {"get_done": None}},
+    "opening": {"inputs": ("ttc",), "outputs": {"opening_print": None, "opening_pct": None}},
+    "closing": {"inputs": ("session", "urgency", "ttc"),
+                "outputs": {"closing_print": None, "closing_pct": None}},
+    "limit_adjustment": {"inputs": ("urgency", "side"),
+                         "outputs": {"limit_option": None, "limit_offset": None, "offset_unit": None}},
+    "hold": {"inputs": ("urgency",), "outputs": {"hold": None}},
+    # select_tif / select_algo: standalone helpers with their own branches,
+    # not on the run_prefill path
+    "tif_helper": {"inputs": ("cas", "urgency", "notes_immediate"), "outputs": {"tif": None}},
+    "algo_helper": {"inputs": ("cas", "notes_vwap", "notes_twap", "urgency", "size_ratio"),
+                    "outputs": {"algo": None, "service": ("Market", "BlueBox 2"),
+                                "use_algo": (True, False)}},
+}
+
+decision_rules = DecisionEngine(DECISION_INPUTS, DECISION_FIELDS, DECISION_RULES_PATH)
 
 
 # ============================================================
-# CORE AUO LOGIC — ALL INLINED
+# CORE AUO LOGIC
 # ============================================================
 
 # ---------- helpers ----------
@@ -117,9 +678,86 @@ def _field(value, confidence, rationale):
     return {"value": value, "confidence": confidence, "rationale": rationale}
 
 
+def _compile_keyword_scanner(keywords) -> "re.Pattern":
+    """
+    One regex that stops wherever any keyword starts and reports every
+    keyword found there (optional lookaheads), so overlapping keywords
+    are all seen in a single left-to-right pass.
+    """
+    alternation = "|".join(re.escape(kw) for kw in keywords)
+    probes = "".join(f"(?=(?P<k{i}>{re.escape(kw)}))?" for i, kw in enumerate(keywords))
+    return re.compile(f"(?=(?:{alternation})){probes}")
+
+
+_NOTES_SCANNER = _compile_keyword_scanner(NOTES_KEYWORDS)
+_NOTES_GROUPS = {f"k{i}": kw for i, kw in enumerate(NOTES_KEYWORDS)}
+_NOTES_KNOWN = frozenset(NOTES_KEYWORDS)
+
+
+class NotesAnalysis:
+    """
+    Order notes analysed once per request and shared by every sub-engine.
+
+    Keyword checks keep the original substring semantics ("kw in notes")
+    but read from the set built by a single scan instead of re-lowering
+    and re-scanning the notes in each engine.
+    """
+
+    __slots__ = ("text", "keywords", "_intent", "_intent_labels")
+
+    def __init__(self, notes: str):
+        self.text = notes or ""
+        found = set()
+        for match in _NOTES_SCANNER.finditer(self.text.lower()):
+            for name, value in match.groupdict().items():
+                if value is not None:
+                    found.add(_NOTES_GROUPS[name])
+        self.keywords = frozenset(found)
+        self._intent = None
+        self._intent_labels = None
+
+    @classmethod
+    def of(cls, notes) -> "NotesAnalysis":
+        """Accept either raw notes or an existing analysis."""
+        return notes if isinstance(notes, cls) else cls(notes)
+
+    def has(self, keyword: str) -> bool:
+        if keyword not in _NOTES_KNOWN:
+            raise KeyError(f"'{keyword}' is not in NOTES_KEYWORDS")
+        return keyword in self.keywords
+
+    def has_any(self, keywords) -> bool:
+        return any(self.has(kw) for kw in keywords)
+
+    @property
+    def intent(self) -> OrderIntent:
+        """Parsed order intent (via the intent cache), computed on first use."""
+        if self._intent is None:
+            self._intent = intent_cache.parse(self.text)
+        return self._intent
+
+    @property
+    def intent_labels(self) -> dict:
+        """intent.as_dict(), computed on first use; read-only"""
+        if self._intent_labels is None:
+            self._intent_labels = self.intent.as_dict()
+        return self._intent_labels
+
+    @property
+    def notes_urgency(self) -> int:
+        """First matching positive keyword wins, else first negative, else 0."""
+        for kw, pts in URGENCY_KEYWORDS_POSITIVE:
+            if kw in self.keywords:
+                return pts
+        for kw, pts in URGENCY_KEYWORDS_NEGATIVE:
+            if kw in self.keywords:
+                return pts
+        return 0
+
+
 # ---------- 1. urgency calculator ----------
 
-def calculate_urgency(order_notes: str, size: int, time_to_close: int,
+def calculate_urgency(order_notes, size: int, time_to_close: int,
                       avg_trade_size: int, urgency_factor: float) -> dict:
     """
     Urgency = Time(40) + Size(30) + Client(20) + Notes(10)
@@ -146,33 +784,18 @@ def calculate_urgency(order_notes: str, size: int, time_to_close: int,
     client_score = urgency_factor * 20
 
     # Notes urgency (10 pts max)
-    notes_lower = order_notes.lower()
-    notes_score = 0
-    for kw, pts in URGENCY_KEYWORDS_POSITIVE:
-        if kw in notes_lower:
-            notes_score = pts
-            break
-    if notes_score == 0:
-        for kw, pts in URGENCY_KEYWORDS_NEGATIVE:
-            if kw in notes_lower:
-                notes_score = pts
-                break
+    notes_score = NotesAnalysis.of(order_notes).notes_urgency
 
     raw = time_score + size_score + client_score + notes_score
     score = round(max(0, min(100, raw)))
+    return _urgency_result(score, time_score, size_score, client_score, notes_score)
 
-    if score >= 80:
-        classification = "CRITICAL"
-    elif score >= 60:
-        classification = "HIGH"
-    elif score >= 40:
-        classification = "MEDIUM"
-    else:
-        classification = "LOW"
 
+def _urgency_result(score: int, time_score: float, size_score: float,
+                    client_score: float, notes_score: int) -> dict:
     return {
         "urgency_score": score,
-        "urgency_classification": classification,
+        "urgency_classification": classify_urgency(score),
         "urgency_breakdown": {
             "time_pressure": round(time_score, 1),
             "size_pressure": round(size_score, 1),
@@ -182,6 +805,10 @@ def calculate_urgency(order_notes: str, size: int, time_to_close: int,
     }
 
 
+def classify_urgency(score: int, rules: Optional[DecisionTable] = None) -> str:
+    return (rules or decision_rules.table).rule("classification", {"urgency": score}).value("classification")
+
+
 # ---------- 2. CAS detector ----------
 
 def detect_cas(time_to_close: int, ltp: float) -> dict:
@@ -195,7 +822,10 @@ def detect_cas(time_to_close: int, ltp: float) -> dict:
 
     upper = round(ltp * CAS_BAND_UPPER, 1)
     lower = round(ltp * CAS_BAND_LOWER, 1)
+    return _cas_result(cas_active, state, ltp, upper, lower)
+
 
+def _cas_result(cas_active: bool, state: str, ltp: float, upper: float, lower: float) -> dict:
     return {
         "cas_active": cas_active,
         "market_state": state,
@@ -207,196 +837,156 @@ def detect_cas(time_to_close: int, ltp: float) -> dict:
 
 # ---------- 3. side detection ----------
 
-def detect_side(order_notes: str, user_side: Optional[str]) -> dict:
+def detect_side(order_notes, user_side: Optional[str]) -> dict:
     if user_side:
         return _field(user_side, "HIGH", "User-specified side")
 
-    nl = order_notes.lower()
-    if any(w in nl for w in ("buy", "purchase", "long")):
+    notes = NotesAnalysis.of(order_notes)
+    if notes.has_any(SIDE_KEYWORDS_BUY):
         return _field("Buy", "HIGH", "Order notes indicate buy instruction")
-    if any(w in nl for w in ("sell", "liquidate", "short")):
+    if notes.has_any(SIDE_KEYWORDS_SELL):
         return _field("Sell", "HIGH", "Order notes indicate sell instruction")
 
     return _field(None, "LOW", "Require manual selection")
 
 
 # ---------- 4. order type ----------
+# Decisions 4, 5, 8 and 11 and the TIF and executor choices in
+# _assemble_prefill are rule lookups (decision_rules.json). The helpers
+# take their inputs as arguments; _assemble_prefill builds one context
+# with every input (_decision_context) and looks the rules up directly.
 
 def select_order_type(urgency: int, cas_active: bool,
-                      urgency_factor: float, volatility: float) -> tuple:
+                      urgency_factor: float, volatility: float,
+                      rules: Optional[DecisionTable] = None) -> tuple:
     """Returns (order_type_field, price_type_field)."""
-    if cas_active:
-        r = "CAS window detected. Limit order required for auction participation within ±3% band."
-        return _field("Limit", "HIGH", r), _field("Limit", "HIGH", "Limit pricing")
-    if urgency > 80 and urgency_factor > 0.7:
-        r = "High urgency + low price sensitivity → Market order for guaranteed fill"
-        return _field("Market", "HIGH", r), _field("Market", "HIGH", "Market pricing")
-    if volatility > 2.5:
-        r = f"High volatility ({volatility}%) → Limit order to avoid adverse selection"
-        return _field("Limit", "HIGH", r), _field("Limit", "HIGH", "Limit pricing")
-
-    return (_field("Limit", "MEDIUM", "Standard limit order for price protection"),
-            _field("Limit", "MEDIUM", "Limit pricing"))
+    ctx = {"cas": cas_active, "urgency": urgency, "uf": urgency_factor, "volatility": volatility}
+    out = (rules or decision_rules.table).decide("order_type", ctx)
+    return out["order_type"], out["price_type"]
 
 
 # ---------- 5. limit price ----------
 
 def calc_limit_price(side: Optional[str], urgency: int, cas: dict,
-                     ltp: float, bid: float, ask: float) -> dict:
-    if side is None:
-        side = "Buy"  # default for calculation
-
-    if cas["cas_active"]:
-        ref = cas["reference_price"]
-        ub, lb = cas["upper_band"], cas["lower_band"]
-        if side == "Buy":
-            mult = 1.008 if urgency > 80 else 1.005
-            lim = round(ref * mult, 1)
-            lim = min(lim, ub)
-            pct = "+0.8%" if urgency > 80 else "+0.5%"
-            rat = f"CAS: Aggressive limit at {pct} for high fill probability (Band: {lb} - {ub})"
-        else:
-            mult = 0.992 if urgency > 80 else 0.995
-            lim = round(ref * mult, 1)
-            lim = max(lim, lb)
-            pct = "-0.8%" if urgency > 80 else "-0.5%"
-            rat = f"CAS: Aggressive limit at {pct} for high fill probability (Band: {lb} - {ub})"
-        return _field(lim, "HIGH", rat)
-
-    mid = round((bid + ask) / 2, 1)
-    if side == "Buy":
-        if urgency > 70:
-            return _field(ask, "HIGH", "High urgency: Limit at ask price for immediate execution")
-        elif urgency > 40:
-            return _field(mid, "HIGH", "Medium urgency: Mid-price balances cost and fill probability")
-        else:
-            return _field(round(bid + 0.1, 1), "HIGH", "Low urgency: Patient limit near bid for better price")
+                     ltp: float, bid: float, ask: float,
+                     rules: Optional[DecisionTable] = None) -> dict:
+    """The limit_price rule picks the price; cas_mult sets the CAS offset from the reference"""
+    rules = rules or decision_rules.table
+    ctx = {"side": side, "urgency": urgency, "cas": cas["cas_active"],
+           "lower_band": cas["lower_band"], "upper_band": cas["upper_band"]}
+    rule = rules.rule("limit_price", ctx)
+    cas_lim = None
+    if rule.value("price") in ("cas_upper", "cas_lower"):
+        cas_lim = round(cas["reference_price"] * rules.rule("cas_mult", ctx).value("mult"), 1)
+    return _limit_price(rule, ctx, cas, cas_lim, _book_prices(bid, ask))
+
+
+def _book_prices(bid: float, ask: float) -> dict:
+    """Continuous-session limit candidates; near_* is one step inside the touch"""
+    return {"ask": ask, "bid": bid, "mid": round((bid + ask) / 2, 1),
+            "near_bid": round(bid + 0.1, 1), "near_ask": round(ask - 0.1, 1)}
+
+
+def _limit_price(rule, ctx: dict, cas: dict, cas_lim: Optional[float], book: dict) -> dict:
+    """The limit_price rule's field; `cas_lim` is the rounded reference * cas_mult"""
+    lp = rule.render(ctx)["limit_price"]
+    price = rule.value("price")
+    if price == "cas_upper":
+        lp["value"] = min(cas_lim, cas["upper_band"])
+    elif price == "cas_lower":
+        lp["value"] = max(cas_lim, cas["lower_band"])
     else:
-        if urgency > 70:
-            return _field(bid, "HIGH", "High urgency: Limit at bid price for immediate execution")
-        elif urgency > 40:
-            return _field(mid, "HIGH", "Medium urgency: Mid-price balances cost and fill probability")
-        else:
-            return _field(round(ask - 0.1, 1), "HIGH", "Low urgency: Patient limit near ask for better price")
+        lp["value"] = book[price]
+    return lp
+
+
+def _style_limit(rules: DecisionTable, ctx: dict, lp: dict, bid: float, ask: float) -> dict:
+    """Execution-style adjustment of the limit price (the limit_style rule)"""
+    out = rules.decide("limit_style", ctx)
+    adjust = out["adjust"]
+    if adjust is None:
+        return lp
+    adjusted = out["limit_price"]
+    if adjust == "passive_bid":
+        adjusted["value"] = round(min(lp["value"], bid + 0.05), 1)
+    elif adjust == "passive_ask":
+        adjusted["value"] = round(max(lp["value"], ask - 0.05), 1)
+    else:
+        adjusted["value"] = ask if adjust == "ask" else bid
+    return adjusted
 
 
 # ---------- 6. TIF ----------
 
-def select_tif(urgency: int, cas_active: bool, order_notes: str) -> dict:
-    if cas_active:
-        return _field("CAS", "HIGH", "CAS session: Order valid only for closing auction window")
-    nl = order_notes.lower()
-    if urgency > 90 and "immediate" in nl:
-        return _field("IOC", "MEDIUM", "Critical urgency: IOC ensures immediate execution attempt")
-    return _field("GFD", "HIGH", "Standard day order: Valid until market close")
+def select_tif(urgency: int, cas_active: bool, order_notes,
+               rules: Optional[DecisionTable] = None) -> dict:
+    ctx = {"cas": cas_active, "urgency": urgency,
+           "notes_immediate": NotesAnalysis.of(order_notes).has("immediate")}
+    return (rules or decision_rules.table).decide("tif_helper", ctx)["tif"]
 
 
 # ---------- 7. algo selection ----------
 
-def select_algo(urgency: int, cas_active: bool, order_notes: str,
-                size_ratio: float) -> dict:
+def select_algo(urgency: int, cas_active: bool, order_notes,
+                size_ratio: float, rules: Optional[DecisionTable] = None) -> dict:
     """Returns dict with value, use_algo, confidence, rationale + service."""
-    nl = order_notes.lower()
-    if cas_active:
-        return {"value": None, "use_algo": False, "service": "Market",
-                "confidence": "HIGH",
-                "rationale": "CAS window: Direct limit order to closing auction (no algo needed)"}
-    if "vwap" in nl:
-        return {"value": "VWAP", "use_algo": True, "service": "BlueBox 2",
-                "confidence": "HIGH",
-                "rationale": "Client explicitly requires VWAP benchmark execution"}
-    if "twap" in nl:
-        return {"value": "TWAP", "use_algo": True, "service": "BlueBox 2",
-                "confidence": "HIGH",
-                "rationale": "Client explicitly requires TWAP execution"}
-    if urgency > 70 and size_ratio > 3:
-        return {"value": "POV", "use_algo": True, "service": "BlueBox 2",
-                "confidence": "HIGH",
-                "rationale": "High urgency with large order requires aggressive participation (POV)"}
-    if size_ratio > 2:
-        return {"value": "VWAP", "use_algo": True, "service": "BlueBox 2",
-                "confidence": "MEDIUM",
-                "rationale": "Standard VWAP execution balances cost and completion"}
-    return {"value": None, "use_algo": False, "service": "Market",
-            "confidence": "HIGH",
-            "rationale": "Small order - direct market execution sufficient"}
+    notes = NotesAnalysis.of(order_notes)
+    ctx = {"cas": cas_active, "urgency": urgency, "size_ratio": size_ratio,
+           "notes_vwap": notes.has("vwap"), "notes_twap": notes.has("twap")}
+    out = (rules or decision_rules.table).decide("algo_helper", ctx)
+    algo = out["algo"]
+    return {"value": algo["value"], "use_algo": out["use_algo"], "service": out["service"],
+            "confidence": algo["confidence"], "rationale": algo["rationale"]}
 
 
 # ---------- 8. VWAP params ----------
 
-def build_vwap_params(urgency: int, order_notes: str,
-                      time_to_close: int, volatility: float) -> dict:
-    nl = order_notes.lower()
-
-    # pricing
-    if urgency > 70:
-        pricing = _field("Adaptive", "HIGH",
-                         "High urgency: Adaptive pricing crosses spread when necessary")
-    elif volatility > 2.5:
-        pricing = _field("Passive", "HIGH",
-                         "High volatility: Passive pricing avoids adverse selection")
-    else:
-        pricing = _field("Adaptive", "HIGH",
-                         "Standard adaptive pricing balances aggression and patience")
-
-    layering = _field("Auto", "HIGH",
-                      "Auto-layering optimizes order book placement dynamically")
+def build_vwap_params(urgency: int, order_notes,
+                      time_to_close: int, volatility: float,
+                      intent: Optional[OrderIntent] = None,
+                      rules: Optional[DecisionTable] = None) -> dict:
+    """
+    VWAP / algo settings; with `intent`, the trader's style, session,
+    deadline and must-complete instructions take precedence
+    """
+    notes = NotesAnalysis.of(order_notes)
+    ctx = {
+        "urgency": urgency, "volatility": volatility, "ttc": time_to_close,
+        "notes_must_complete": notes.has("must complete"),
+        "style": intent.execution_style.name if intent else None,
+        "session": intent.session_target.name if intent and intent.session_target else None,
+        "must_complete": bool(intent and intent.must_complete),
+        "deadline": intent.deadline_time if intent else None,
+        "has_deadline": bool(intent and intent.deadline_time),
+    }
+    return _vwap_params(rules or decision_rules.table, ctx)
 
-    # urgency setting
-    if urgency > 80:
-        urg = _field("High", "HIGH", f"Urgency score: {urgency}/100 → High")
-    elif urgency > 50:
-        urg = _field("Auto", "HIGH", "Auto urgency adapts to market conditions")
-    else:
-        urg = _field("Low", "HIGH", "Low urgency allows patient accumulation")
-
-    # get done
-    gd = urgency > 75 or "must complete" in nl
-    get_done = _field("True" if gd else "False", "HIGH",
-                      "Force completion by end time" if gd
-                      else "Allow unfilled quantity to remain")
-
-    # opening
-    op = time_to_close > 300
-    opening_print = _field("True" if op else "False", "HIGH",
-                           "Participate in opening auction for early liquidity"
-                           if op else "Order entered after open")
-    opening_pct = _field(10 if op else 0, "MEDIUM", "Max % in opening auction")
-
-    # closing
-    cp = time_to_close < 60
-    cp_pct = (30 if urgency > 80 else 20) if cp else 0
-    closing_print = _field("True" if cp else "False", "HIGH",
-                           "Approaching close - participate in closing auction"
-                           if cp else "Sufficient time remaining")
-    closing_pct = _field(cp_pct, "MEDIUM", f"Max {cp_pct}% in closing auction")
 
+def _vwap_params(rules: DecisionTable, ctx: dict) -> dict:
     return {
-        "pricing": pricing,
-        "layering": layering,
-        "urgency_setting": urg,
-        "get_done": get_done,
-        "opening_print": opening_print,
-        "opening_pct": opening_pct,
-        "closing_print": closing_print,
-        "closing_pct": closing_pct,
+        **rules.decide("pricing", ctx),
+        "layering": _field("Auto", "HIGH", "Auto-layering optimizes order book placement dynamically"),
+        **rules.decide("urgency_setting", ctx),
+        **rules.decide("get_done", ctx),
+        **rules.decide("opening", ctx),
+        **rules.decide("closing", ctx),
     }
 
 
 # ---------- 9. crossing ----------
 
 def build_crossing(size: int, size_ratio: float) -> dict:
-    enabled = size_ratio > CROSSING_SIZE_THRESHOLD
-    if enabled:
-        mn = round(size * CROSSING_MIN_PCT)
-        mx = round(size * CROSSING_MAX_PCT)
-        rat = "Large order: Enable crossing for 20-50% blocks"
-    else:
-        mn, mx = None, None
-        rat = "Not applicable"
+    if size_ratio > CROSSING_SIZE_THRESHOLD:
+        return _crossing_fields(round(size * CROSSING_MIN_PCT), round(size * CROSSING_MAX_PCT))
+    return _crossing_fields(None, None)
+
+
+def _crossing_fields(mn: Optional[int], mx: Optional[int]) -> dict:
+    """None quantities mean crossing is off"""
+    rat = "Large order: Enable crossing for 20-50% blocks" if mn is not None else "Not applicable"
     return {
-        "min_cross_qty": _field(mn, "MEDIUM", rat if enabled else "Not applicable"),
-        "max_cross_qty": _field(mx, "MEDIUM", rat if enabled else "Not applicable"),
+        "min_cross_qty": _field(mn, "MEDIUM", rat),
+        "max_cross_qty": _field(mx, "MEDIUM", rat),
         "cross_qty_unit": _field("Shares", "HIGH", "Standard unit"),
         "leave_active_slice": _field("False", "HIGH", "Avoid over-execution during cross"),
     }
@@ -411,7 +1001,13 @@ def build_iwould(urgency: int, side: Optional[str], size: int, ltp: float) -> di
             price = round(ltp * (1 + IWOULD_PRICE_OFFSET), 1)
         else:
             price = round(ltp * (1 - IWOULD_PRICE_OFFSET), 1)
-        qty = round(size * IWOULD_QTY_PCT)
+        return _iwould_fields(price, round(size * IWOULD_QTY_PCT))
+    return _iwould_fields(None, None)
+
+
+def _iwould_fields(price: Optional[float], qty: Optional[int]) -> dict:
+    """None price means IWould is off (urgent order)"""
+    if price is not None:
         return {
             "iwould_price": _field(price, "MEDIUM", "Opportunistic execution price"),
             "iwould_qty": _field(qty, "MEDIUM", "30% of total order"),
@@ -424,240 +1020,211 @@ def build_iwould(urgency: int, side: Optional[str], size: int, ltp: float) -> di
 
 # ---------- 11. limit adjustment ----------
 
-def build_limit_adjustment(urgency: int, side: Optional[str]) -> dict:
-    if urgency >= LIMIT_PEG_URGENCY_THRESHOLD:
-        if (side or "Buy") == "Buy":
-            opt = "Primary Best Bid"
-        else:
-            opt = "Primary Best Ask"
-        return {
-            "limit_option": _field(opt, "MEDIUM", "Peg to best price for aggressive fill"),
-            "limit_offset": _field(1, "HIGH", "1 tick offset"),
-            "offset_unit": _field("Tick", "HIGH", "Standard tick-based offset"),
-        }
-    return {
-        "limit_option": _field("Order Limit", "HIGH", "Static limit price from order"),
-        "limit_offset": _field(0, "HIGH", "No offset"),
-        "offset_unit": _field("Tick", "HIGH", "Standard tick-based offset"),
-    }
+def build_limit_adjustment(urgency: int, side: Optional[str],
+                           rules: Optional[DecisionTable] = None) -> dict:
+    return (rules or decision_rules.table).decide("limit_adjustment", {"urgency": urgency, "side": side})
 
 
 # ============================================================
 # MAIN PREFILL ORCHESTRATOR
 # ============================================================
 
-def run_prefill(req: PrefillRequest, market: dict, client: dict) -> dict:
-    """
-    Orchestrates all AUO sub-engines with intelligent note parsing
-    """
-    t0 = _time.perf_counter()
+INSTRUMENT_NAMES = {
+    "RELIANCE.NS": "RELIANCE INDS T+1",
+    "INFY.NS": "INFOSYS LTD T+1",
+    "TCS.NS": "TCS LTD T+1",
+    "HDFCBANK.NS": "HDFC BANK T+1",
+    "ICICIBANK.NS": "ICICI BANK T+1",
+    "SBIN.NS": "STATE BANK T+1",
+    "BHARTIARTL.NS": "BHARTI AIRTEL T+1",
+    "ITC.NS": "ITC LTD T+1",
+    "KOTAKBANK.NS": "KOTAK BANK T+1",
+    "LT.NS": "LARSEN & TOUBRO T+1",
+    "HINDUNILVR.NS": "HINDUSTAN UNILEVER T+1",
+    "BAJFINANCE.NS": "BAJAJ FINANCE T+1",
+    "MARUTI.NS": "MARUTI SUZUKI T+1",
+    "ASIANPAINT.NS": "ASIAN PAINTS T+1",
+    "WIPRO.NS": "WIPRO LTD T+1",
+}
 
-    # --- PARSE ORDER INTENT (The Brain) ---
-    intent = OrderIntentParser.parse(req.order_notes or "")
-    
-    # --- Basic Inputs ---
-    notes = req.order_notes or ""
-    size = req.size
-    ttc = req.time_to_close if req.time_to_close is not None else int(market["time_to_close"])
-    ltp = float(market["ltp"])
-    bid = float(market["bid"])
-    ask = float(market["ask"])
-    vol = float(market["volatility_pct"])
+
+class _PrefillInputs(NamedTuple):
+    """Everything run_prefill needs from one request, its market row and client"""
+    req: PrefillRequest
+    notes: NotesAnalysis
+    intent: OrderIntent
+    size: int
+    ttc: int
+    ltp: float
+    bid: float
+    ask: float
+    vol: float
+    avg_ts: int
+    uf: float
+    size_ratio: float
+    side_field: dict
+
+
+def _prefill_inputs(req: PrefillRequest, market: dict, client: dict,
+                    notes: Optional[NotesAnalysis] = None) -> _PrefillInputs:
+    # --- ANALYSE NOTES ONCE (keywords + parsed intent, shared by all engines) ---
+    if notes is None:
+        notes = NotesAnalysis(req.order_notes or "")
     avg_ts = int(market["avg_trade_size"])
-    uf = float(client["urgency_factor"])
-    size_ratio = size / max(avg_ts, 1)
-
-    instrument = {
-        "RELIANCE.NS": "RELIANCE INDS T+1",
-        "INFY.NS": "INFOSYS LTD T+1",
-        "TCS.NS": "TCS LTD T+1",
-        "HDFCBANK.NS": "HDFC BANK T+1",
-        "ICICIBANK.NS": "ICICI BANK T+1",
-        "SBIN.NS": "STATE BANK T+1",
-        "BHARTIARTL.NS": "BHARTI AIRTEL T+1",
-        "ITC.NS": "ITC LTD T+1",
-        "KOTAKBANK.NS": "KOTAK BANK T+1",
-        "LT.NS": "LARSEN & TOUBRO T+1",
-        "HINDUNILVR.NS": "HINDUSTAN UNILEVER T+1",
-        "BAJFINANCE.NS": "BAJAJ FINANCE T+1",
-        "MARUTI.NS": "MARUTI SUZUKI T+1",
-        "ASIANPAINT.NS": "ASIAN PAINTS T+1",
-        "WIPRO.NS": "WIPRO LTD T+1",
-    }.get(req.symbol, f"{req.symbol} T+1")
+    return _PrefillInputs(
+        req=req,
+        notes=notes,
+        intent=notes.intent,
+        size=req.size,
+        ttc=req.time_to_close if req.time_to_close is not None else int(market["time_to_close"]),
+        ltp=float(market["ltp"]),
+        bid=float(market["bid"]),
+        ask=float(market["ask"]),
+        vol=float(market["volatility_pct"]),
+        avg_ts=avg_ts,
+        uf=float(client["urgency_factor"]),
+        size_ratio=req.size / max(avg_ts, 1),
+        side_field=detect_side(notes, req.side),
+    )
 
-    # --- 1. INTELLIGENT URGENCY CALCULATION ---
-    base_urg = calculate_urgency(notes, size, ttc, avg_ts, uf)
-    score = base_urg["urgency_score"]
-    
-    # Apply intent-based overrides
-    if intent.urgency_level == 'CRITICAL':
+
+def _intent_score(score: int, intent: OrderIntent) -> int:
+    """Apply intent-based overrides to the base urgency score"""
+    if intent.urgency_level == Urgency.CRITICAL:
         score = max(score, 85)
-    elif intent.urgency_level == 'HIGH':
+    elif intent.urgency_level == Urgency.HIGH:
         score = max(score, 65)
-    elif intent.urgency_level == 'LOW':
+    elif intent.urgency_level == Urgency.LOW:
         score = min(score, 35)
-    
+
     if intent.must_complete:
         score = min(score + 15, 100)
-    
-    classification = (
-        "CRITICAL" if score >= 80 else
-        "HIGH" if score >= 60 else
-        "MEDIUM" if score >= 40 else
-        "LOW"
-    )
+    return score
 
-    # --- 2. CAS DETECTION (Enhanced) ---
-    cas = detect_cas(ttc, ltp)
-    
-    if intent.session_target == 'CAS':
+
+def _intent_cas(cas: dict, intent: OrderIntent, ttc: int) -> dict:
+    if intent.session_target == Session.CAS:
         cas["cas_active"] = True
         cas["market_state"] = "CAS_Targeted"
-    elif intent.session_target == 'CLOSING':
+    elif intent.session_target == Session.CLOSING:
         if ttc > 25:
             cas["market_state"] = "Pre_Close_Targeted"
+    return cas
 
-    # --- 3. SIDE DETECTION ---
-    side_field = detect_side(notes, req.side)
-    side_val = side_field["value"]
-
-    # --- 4. INTELLIGENT ALGO SELECTION ---
-    use_algo = False
-    executor = None
-    exec_conf = "MEDIUM"
-    exec_rat = "Standard execution"
-    service = "Market"
-    
-    if cas["cas_active"]:
-        use_algo = False
-        executor = None
-        service = "Market"
-        exec_conf = "HIGH"
-        exec_rat = "CAS window: Direct limit order to closing auction"
-        
-    elif intent.algo_strategy:
-        use_algo = True
-        executor = intent.algo_strategy
-        service = "BlueBox 2"
-        exec_conf = "HIGH"
-        
-        if executor == "VWAP":
-            exec_rat = "Client explicitly requested VWAP benchmark execution"
-        elif executor == "TWAP":
-            exec_rat = "Client explicitly requested TWAP execution"
-        elif executor == "POV":
-            exec_rat = "Client requested POV (Percentage of Volume) execution"
-        elif executor == "ICEBERG":
-            exec_rat = "Client requested minimal market impact (Iceberg display strategy)"
-            
-    elif intent.price_sensitivity == 'MINIMIZE_IMPACT' and size_ratio > 2:
-        use_algo = True
-        executor = "ICEBERG"
-        service = "BlueBox 2"
-        exec_conf = "HIGH"
-        exec_rat = "Large order with minimize impact instruction → Iceberg strategy"
-        
-    elif size_ratio > 10:
-        use_algo = True
-        executor = "VWAP"
-        service = "BlueBox 2"
-        exec_conf = "MEDIUM"
-        exec_rat = f"Very large order (Size Ratio: {size_ratio:.1f}x) → VWAP recommended"
-        
-    elif size_ratio > 3 and score > 70:
-        use_algo = True
-        executor = "POV"
-        service = "BlueBox 2"
-        exec_conf = "HIGH"
-        exec_rat = "Large urgent order requires aggressive participation (POV)"
+
+def run_prefill(req: PrefillRequest, market: dict, client: dict) -> dict:
+    """
+    Orchestrates all AUO sub-engines with intelligent note parsing
+    """
+    t0 = _time.perf_counter()
+    p = _prefill_inputs(req, market, client)
+    static = _static_prefill(p, build_crossing(p.size, p.size_ratio))
+    return _assemble_prefill(p, static, *_time_dependent(p), t0)
+
+
+def _time_dependent(p: _PrefillInputs) -> tuple:
+    """(base_urg, score, cas, lp, iw): the engine results that move with TTC"""
+    # --- 1. INTELLIGENT URGENCY CALCULATION ---
+    base_urg = calculate_urgency(p.notes, p.size, p.ttc, p.avg_ts, p.uf)
+    score = _intent_score(base_urg["urgency_score"], p.intent)
+
+    # --- 2. CAS DETECTION (Enhanced) ---
+    cas = _intent_cas(detect_cas(p.ttc, p.ltp), p.intent, p.ttc)
+
+    side_val = p.side_field["value"]
+    lp = calc_limit_price(side_val, score, cas, p.ltp, p.bid, p.ask)
+    iw = build_iwould(score, side_val, p.size, p.ltp)
+    return base_urg, score, cas, lp, iw
+
+
+def _static_prefill(p: _PrefillInputs, cross: dict) -> dict:
+    """
+    Result parts that depend on neither TTC nor the urgency score: Tier 1
+    fields, the static Tier 2 fields, crossing, spread and the parsed
+    intent. Shared, never modified, by every result assembled from it.
+    """
+    # --- 12. STATIC FIELDS ---
+    capacity_val = "Principal" if p.uf > 0.6 else "Agent"
+    capacity_rat = "Standard principal capacity" if p.uf > 0.6 else "Agency execution model"
+    instrument = INSTRUMENT_NAMES.get(p.req.symbol, f"{p.req.symbol} T+1")
+    intent, intent_labels = p.intent, p.notes.intent_labels
+    return {
+        "instrument": _field(instrument, "HIGH", "Auto-populated from symbol"),
+        "side": p.side_field,
+        "quantity": _field(p.size, "HIGH", "Quantity from client mandate"),
+        "release_date": _field(date.today().isoformat(), "HIGH", "Immediate execution requested"),
+        "category": _field("Client", "HIGH", "Client order flow"),
+        "capacity": _field(capacity_val, "MEDIUM", capacity_rat),
+        "account": _field("UNALLOC", "MEDIUM", "Standard unallocated block order"),
+        # --- 9. CROSSING ---
+        "crossing": cross,
+        "spread_bps": round(((p.ask - p.bid) / p.ltp) * 10000, 1),
+        "intent_detected": {
+            "urgency": intent_labels["urgency_level"],
+            "algo": intent_labels["algo_strategy"],
+            "style": intent_labels["execution_style"],
+            "session": intent_labels["session_target"],
+            "deadline": intent.deadline_time,
+            "must_complete": intent.must_complete,
+            "parser_confidence": round(intent.confidence_score, 2)
+        },
+    }
+
+
+def _assemble_prefill(p: _PrefillInputs, static: dict, base_urg: dict, score: int,
+                      cas: dict, lp: dict, iw: dict, t0: float) -> dict:
+    """
+    The rest of run_prefill, given the static parts and the urgency, CAS,
+    limit price and IWould results (computed one order at a time, for a
+    whole basket at once by run_prefill_batch, or per TTC move in a
+    prefill session)
+    """
+    intent = p.intent
+    ttc, ltp, bid, ask, vol = p.ttc, p.ltp, p.bid, p.ask, p.vol
+    rules = decision_rules.table
+    ctx = _decision_context(p, score, cas)
+
+    # --- 4. ALGO SELECTION ---
+    ex = rules.decide("executor", ctx)
 
     # --- 5. ORDER TYPE & PRICE TYPE ---
-    ot, pt = select_order_type(score, cas["cas_active"], uf, vol)
-
-    # --- 6. INTELLIGENT LIMIT PRICE ---
-    lp = calc_limit_price(side_val, score, cas, ltp, bid, ask)
-    
-    # Adjust for execution style
-    if intent.execution_style == 'PASSIVE' and not cas["cas_active"]:
-        if side_val == "Buy":
-            current_limit = lp["value"]
-            passive_limit = round(min(current_limit, bid + 0.05), 1)
-            lp = _field(passive_limit, "HIGH", "Passive execution: Limit near bid for better price")
-        elif side_val == "Sell":
-            current_limit = lp["value"]
-            passive_limit = round(max(current_limit, ask - 0.05), 1)
-            lp = _field(passive_limit, "HIGH", "Passive execution: Limit near ask for better price")
-    
-    elif intent.execution_style == 'AGGRESSIVE':
-        if side_val == "Buy":
-            lp = _field(ask, "HIGH", "Aggressive execution: Limit at ask for immediate fill")
-        elif side_val == "Sell":
-            lp = _field(bid, "HIGH", "Aggressive execution: Limit at bid for immediate fill")
+    ot = rules.decide("order_type", ctx)
+
+    # --- 6. LIMIT PRICE, adjusted for execution style ---
+    lp = _style_limit(rules, ctx, lp, bid, ask)
 
     # --- 7. TIF SELECTION ---
-    if cas["cas_active"]:
-        tif = _field("CAS", "HIGH", "CAS window: Order valid only for closing auction")
-    elif intent.must_complete or score > 90:
-        tif = _field("IOC", "MEDIUM", "Critical urgency: IOC ensures immediate execution attempt")
-    else:
-        tif = _field("GFD", "HIGH", "Standard day order: Valid until market close")
-
-    # --- 8. VWAP PARAMS (Enhanced) ---
-    vwap = build_vwap_params(score, notes, ttc, vol)
-    
-    if intent.deadline_time:
-        vwap["get_done"] = _field("True", "HIGH", f"Must complete by {intent.deadline_time}")
-    
-    if intent.must_complete:
-        vwap["get_done"] = _field("True", "HIGH", "Trader explicitly requires completion")
-    
-    if intent.execution_style == 'PASSIVE':
-        vwap["pricing"] = _field("Passive", "HIGH", "Passive pricing per trader instruction")
-        vwap["urgency_setting"] = _field("Low", "HIGH", "Low urgency for passive execution")
-    elif intent.execution_style == 'AGGRESSIVE':
-        vwap["pricing"] = _field("Aggressive", "HIGH", "Aggressive pricing crosses spread when necessary")
-        vwap["urgency_setting"] = _field("High", "HIGH", "High urgency for aggressive execution")
-    
-    if intent.session_target == 'CLOSING' or intent.session_target == 'CAS':
-        vwap["closing_print"] = _field("True", "HIGH", "Trader targeted closing session")
-        vwap["closing_pct"] = _field(30 if score > 80 else 25, "HIGH", "Increased closing participation per instruction")
-
-    # --- 9. CROSSING ---
-    cross = build_crossing(size, size_ratio)
-
-    # --- 10. IWOULD ---
-    iw = build_iwould(score, side_val, size, ltp)
+    tif = rules.decide("tif", ctx)["tif"]
 
-    # --- 11. LIMIT ADJUSTMENT ---
-    la = build_limit_adjustment(score, side_val)
+    # --- 8. VWAP PARAMS (intent instructions included) ---
+    vwap = _vwap_params(rules, ctx)
 
-    # --- 12. STATIC FIELDS ---
-    capacity_val = "Principal" if uf > 0.6 else "Agent"
-    capacity_rat = "Standard principal capacity" if uf > 0.6 else "Agency execution model"
-    hold_rat = "High urgency - release immediately" if score > 70 else "Standard immediate release"
-    today = date.today().isoformat()
+    # --- 10. IWOULD comes in as iw ---
+
+    # --- 11. LIMIT ADJUSTMENT ---
+    la = rules.decide("limit_adjustment", ctx)
 
     elapsed_ms = round((_time.perf_counter() - t0) * 1000)
 
     # --- BUILD RESPONSE ---
     prefilled_params = {
         # Tier 1
-        "instrument": _field(instrument, "HIGH", "Auto-populated from symbol"),
-        "side": side_field,
-        "quantity": _field(size, "HIGH", "Quantity from client mandate"),
+        "instrument": static["instrument"],
+        "side": static["side"],
+        "quantity": static["quantity"],
         # Tier 2
-        "order_type": ot,
-        "price_type": pt,
+        "order_type": ot["order_type"],
+        "price_type": ot["price_type"],
         "limit_price": lp,
         "tif": tif,
-        "release_date": _field(today, "HIGH", "Immediate execution requested"),
-        "hold": _field("No", "HIGH", hold_rat),
-        "category": _field("Client", "HIGH", "Client order flow"),
-        "capacity": _field(capacity_val, "MEDIUM", capacity_rat),
-        "account": _field("UNALLOC", "MEDIUM", "Standard unallocated block order"),
-        "service": _field(service, "HIGH", "Algo engine" if use_algo else "Direct market execution"),
-        "executor": _field(executor, exec_conf, exec_rat),
-        "use_algo": use_algo,
+        "release_date": static["release_date"],
+        "hold": rules.decide("hold", ctx)["hold"],
+        "category": static["category"],
+        "capacity": static["capacity"],
+        "account": static["account"],
+        "service": ex["service"],
+        "executor": ex["executor"],
+        "use_algo": ex["use_algo"],
         # VWAP / algo params
         "pricing": vwap["pricing"],
         "layering": vwap["layering"],
@@ -668,20 +1235,19 @@ def run_prefill(req: PrefillRequest, market: dict, client: dict) -> dict:
         "closing_print": vwap["closing_print"],
         "closing_pct": vwap["closing_pct"],
         # Crossing
-        **cross,
+        **static["crossing"],
         # IWould
         **iw,
         # Limit adjustment
         **la,
     }
 
-    spread_bps = round(((ask - bid) / ltp) * 10000, 1)
     base_confidence = 0.82 + (score / 500)
     adjusted_confidence = (base_confidence + intent.confidence_score) / 2
-    
-    return {
+
+    result = {
         "urgency_score": score,
-        "urgency_classification": classification,
+        "urgency_classification": rules.rule("classification", ctx).value("classification"),
         "urgency_breakdown": base_urg["urgency_breakdown"],
         "prefilled_params": prefilled_params,
         "market_context": {
@@ -695,202 +1261,1227 @@ def run_prefill(req: PrefillRequest, market: dict, client: dict) -> dict:
             "bid": bid,
             "ask": ask,
             "volatility": vol,
-            "spread_bps": spread_bps,
+            "spread_bps": static["spread_bps"],
         },
         "metadata": {
             "auo_version": "1.0.0",
             "processing_time_ms": elapsed_ms,
             "confidence_score": min(round(adjusted_confidence, 2), 0.99),
             "timestamp": datetime.utcnow().isoformat() + "Z",
-            "intent_detected": {
-                "urgency": intent.urgency_level,
-                "algo": intent.algo_strategy,
-                "style": intent.execution_style,
-                "session": intent.session_target,
-                "deadline": intent.deadline_time,
-                "must_complete": intent.must_complete,
-                "parser_confidence": round(intent.confidence_score, 2)
-            }
+            "intent_detected": static["intent_detected"],
+        },
+    }
+    if DECISION_TRACE:
+        result["metadata"]["decision_trace"] = {"version": rules.version, "rules": rules.trace(ctx)}
+    return result
+
+
+def _decision_context(p: _PrefillInputs, score, cas: dict) -> dict:
+    """Every DECISION_INPUTS value for one order (score and CAS flag may be arrays)"""
+    intent, labels = p.intent, p.notes.intent_labels
+    return {
+        "urgency": score, "uf": p.uf, "volatility": p.vol, "size_ratio": p.size_ratio,
+        "ttc": p.ttc, "lower_band": cas["lower_band"], "upper_band": cas["upper_band"],
+        "cas": cas["cas_active"],
+        "must_complete": intent.must_complete,
+        "has_deadline": bool(intent.deadline_time),
+        "minimize_impact": intent.price_sensitivity == PriceSensitivity.MINIMIZE_IMPACT,
+        "notes_must_complete": p.notes.has("must complete"),
+        "notes_immediate": p.notes.has("immediate"),
+        "notes_vwap": p.notes.has("vwap"),
+        "notes_twap": p.notes.has("twap"),
+        "side": p.side_field["value"],
+        "style": labels["execution_style"],
+        "session": labels["session_target"],
+        "algo": labels["algo_strategy"],
+        "deadline": intent.deadline_time,
+    }
+
+
+# ---------- basket prefill ----------
+# run_prefill for a whole basket: the numeric engines (urgency, CAS bands,
+# limit price, crossing, IWould) run once over NumPy arrays instead of once
+# per order. Every rounding goes through Python's round() on .tolist()
+# values: np.round scales by 10 first and can land on the other side of a
+# tie, and results must match run_prefill to the last digit.
+
+_CAS_STATES = ("CAS_Targeted", "Pre_Close_Targeted", "CAS", "Pre_Close", "Continuous")
+
+
+def _round1(values: np.ndarray) -> list:
+    return [round(v, 1) for v in values.tolist()]
+
+
+def _round0(values: np.ndarray) -> list:
+    # np.rint and round() both round half to even on the float itself
+    return np.rint(values).astype(np.int64).tolist()
+
+
+def _order_flags(inputs: List[_PrefillInputs]) -> dict:
+    """Per-order booleans the numeric engines branch on (parsed intent, side)"""
+    sides = [p.side_field["value"] or "Buy" for p in inputs]
+    return {
+        "critical": np.array([p.intent.urgency_level == Urgency.CRITICAL for p in inputs], dtype=bool),
+        "high": np.array([p.intent.urgency_level == Urgency.HIGH for p in inputs], dtype=bool),
+        "low": np.array([p.intent.urgency_level == Urgency.LOW for p in inputs], dtype=bool),
+        "must": np.array([p.intent.must_complete for p in inputs], dtype=bool),
+        "cas_target": np.array([p.intent.session_target == Session.CAS for p in inputs], dtype=bool),
+        "closing": np.array([p.intent.session_target == Session.CLOSING for p in inputs], dtype=bool),
+        "sell": np.array([s == "Sell" for s in sides], dtype=bool),
+    }
+
+
+def _urgency_arrays(flags: dict, size: np.ndarray, ttc: np.ndarray, uf: np.ndarray,
+                    avg_ts: np.ndarray, notes_score: np.ndarray) -> dict:
+    """
+    calculate_urgency + intent overrides and detect_cas + session target,
+    over arrays that broadcast against each other (flags included)
+    """
+    time_score = np.where(ttc <= CAS_THRESHOLD, 40.0, (1 - ttc / TOTAL_TRADING_MINUTES) * 40)
+    size_ratio = size / np.maximum(avg_ts, 1)
+    size_score = np.select([size_ratio > 20, size_ratio > 10, size_ratio > 5],
+                           [30.0, 25.0, 20.0], size_ratio * 3)
+    client_score = uf * 20
+    raw = time_score + size_score + client_score + notes_score
+    base = np.rint(np.clip(raw, 0, 100)).astype(np.int64)
+
+    score = np.where(flags["critical"], np.maximum(base, 85), base)
+    score = np.where(flags["high"], np.maximum(score, 65), score)
+    score = np.where(flags["low"], np.minimum(score, 35), score)
+    score = np.where(flags["must"], np.minimum(score + 15, 100), score)
+
+    cas_active = (ttc <= CAS_THRESHOLD) | flags["cas_target"]
+    state = np.select([flags["cas_target"], flags["closing"] & (ttc > 25),
+                       ttc <= CAS_THRESHOLD, ttc <= 60], [0, 1, 2, 3], 4)
+    return {
+        "time_score": time_score, "size_score": size_score, "client_score": client_score,
+        "size_ratio": size_ratio, "base": base, "score": score,
+        "cas_active": cas_active, "state": state,
+    }
+
+
+def _rule_values(rules: DecisionTable, field: str, key: str, columns: dict) -> np.ndarray:
+    """One output of the winning rule at every point of `columns`"""
+    return np.array([r.value(key) for r in rules.rules(field)])[rules.select(field, columns)]
+
+
+def _prefill_kernels(inputs: List[_PrefillInputs]) -> list:
+    """(base_urg, score, cas, lp, cross, iw) per order, exactly as run_prefill computes them"""
+    size = np.array([p.size for p in inputs], dtype=np.float64)
+    ltp = np.array([p.ltp for p in inputs], dtype=np.float64)
+    bid = np.array([p.bid for p in inputs], dtype=np.float64)
+    ask = np.array([p.ask for p in inputs], dtype=np.float64)
+    notes_score = [p.notes.notes_urgency for p in inputs]
+    flags = _order_flags(inputs)
+    u = _urgency_arrays(
+        flags, size,
+        np.array([p.ttc for p in inputs], dtype=np.int64),
+        np.array([p.uf for p in inputs], dtype=np.float64),
+        np.array([p.avg_ts for p in inputs], dtype=np.float64),
+        np.array(notes_score, dtype=np.float64),
+    )
+    score, cas_active = u["score"], u["cas_active"]
+    rules = decision_rules.table
+    limit_cols = {"side": np.array([p.side_field["value"] for p in inputs], dtype=object),
+                  "urgency": score, "cas": cas_active}
+    limit_rules = rules.rules("limit_price")
+
+    # 5. limit price candidates, 9. crossing, 10. IWould
+    iw_mult = np.where(flags["sell"], 1 + IWOULD_PRICE_OFFSET, 1 - IWOULD_PRICE_OFFSET)
+    cross_on = u["size_ratio"] > CROSSING_SIZE_THRESHOLD
+    iw_on = score < IWOULD_URGENCY_THRESHOLD
+
+    columns = zip(
+        u["base"].tolist(), score.tolist(), _round1(u["time_score"]), _round1(u["size_score"]),
+        _round1(u["client_score"]), cas_active.tolist(), u["state"].tolist(),
+        _round1(ltp * CAS_BAND_UPPER), _round1(ltp * CAS_BAND_LOWER),
+        _round1(ltp * _rule_values(rules, "cas_mult", "mult", limit_cols)),
+        rules.select("limit_price", limit_cols).tolist(),
+        _round1((bid + ask) / 2), _round1(bid + 0.1), _round1(ask - 0.1),
+        cross_on.tolist(), _round0(size * CROSSING_MIN_PCT), _round0(size * CROSSING_MAX_PCT),
+        iw_on.tolist(), _round1(ltp * iw_mult), _round0(size * IWOULD_QTY_PCT),
+    )
+    out = []
+    for p, notes_pts, col in zip(inputs, notes_score, columns):
+        (b, sc, t_r, s_r, c_r, active, st, upper, lower, cas_lim, lim_rule, mid, near_bid, near_ask,
+         cross, mn, mx, iwould, iw_price, iw_qty) = col
+        base_urg = _urgency_result(b, t_r, s_r, c_r, notes_pts)
+        cas = _cas_result(active, _CAS_STATES[st], p.ltp, upper, lower)
+        ctx = {"side": p.side_field["value"], "urgency": sc, "cas": active,
+               "lower_band": lower, "upper_band": upper}
+        book = {"ask": p.ask, "bid": p.bid, "mid": mid, "near_bid": near_bid, "near_ask": near_ask}
+        lp = _limit_price(limit_rules[lim_rule], ctx, cas, cas_lim, book)
+        out.append((
+            base_urg, sc, cas, lp,
+            _crossing_fields(mn, mx) if cross else _crossing_fields(None, None),
+            _iwould_fields(iw_price, iw_qty) if iwould else _iwould_fields(None, None),
+        ))
+    return out
+
+
+def run_prefill_batch(orders: List[tuple]) -> List[dict]:
+    """
+    run_prefill over a basket of (req, market, client) tuples; same results
+    in the same order. processing_time_ms counts from the start of the basket.
+    """
+    t0 = _time.perf_counter()
+    if not orders:
+        return []
+    # Baskets tend to repeat notes: analyse each distinct text once
+    analyses = {}
+    inputs = []
+    for req, market, client in orders:
+        text = req.order_notes or ""
+        notes = analyses.get(text)
+        if notes is None:
+            notes = analyses[text] = NotesAnalysis(text)
+        inputs.append(_prefill_inputs(req, market, client, notes))
+    return [_assemble_prefill(p, _static_prefill(p, cross), base_urg, score, cas, lp, iw, t0)
+            for p, (base_urg, score, cas, lp, cross, iw) in zip(inputs, _prefill_kernels(inputs))]
+
+
+# ---------- what-if sweep ----------
+# One order evaluated over a grid of time_to_close x size x urgency_factor,
+# for the TTC slider. Only the headline decisions are computed, straight
+# from the urgency arrays (rules looked up for the whole grid at once), and
+# returned column-wise.
+
+def _sweep_limit_price(rules: DecisionTable, p: _PrefillInputs, columns: dict) -> list:
+    """calc_limit_price plus the execution-style adjustment, one order, many scores"""
+    cas_lim = np.array(_round1(p.ltp * _rule_values(rules, "cas_mult", "mult", columns)))
+    candidates = {"cas_upper": np.minimum(cas_lim, columns["upper_band"]),
+                  "cas_lower": np.maximum(cas_lim, columns["lower_band"]),
+                  **_book_prices(p.bid, p.ask)}
+    price = _rule_values(rules, "limit_price", "price", columns)
+    lim = np.select([price == k for k in candidates], list(candidates.values()))
+
+    adjust = _rule_values(rules, "limit_style", "adjust", columns)
+    lim = np.select(
+        [adjust == "passive_bid", adjust == "passive_ask", adjust == "ask", adjust == "bid"],
+        [np.array(_round1(np.minimum(lim, p.bid + 0.05))), np.array(_round1(np.maximum(lim, p.ask - 0.05))),
+         p.ask, p.bid], lim)
+    return lim.tolist()
+
+
+def run_prefill_sweep(req: PrefillRequest, market: dict, client: dict,
+                      ttcs: Optional[list] = None, sizes: Optional[list] = None,
+                      factors: Optional[list] = None) -> dict:
+    """
+    Urgency score, CAS state, order type, limit price, TIF and executor for
+    every (time_to_close, size, urgency_factor) combination, in that nesting
+    order (time_to_close outermost). Axes left out hold the order's own value.
+    Each point matches run_prefill for the same inputs.
+    """
+    p = _prefill_inputs(req, market, client)
+    axes = {
+        "time_to_close": list(ttcs) if ttcs else [p.ttc],
+        "size": list(sizes) if sizes else [p.size],
+        "urgency_factor": list(factors) if factors else [p.uf],
+    }
+    ttc, size, uf = (g.ravel() for g in np.meshgrid(
+        np.array(axes["time_to_close"], dtype=np.int64),
+        np.array(axes["size"], dtype=np.float64),
+        np.array(axes["urgency_factor"], dtype=np.float64), indexing="ij"))
+
+    u = _urgency_arrays(_order_flags([p]), size, ttc, uf, p.avg_ts, p.notes.notes_urgency)
+    score, cas_active = u["score"], u["cas_active"]
+    rules = decision_rules.table
+    bands = {"cas_active": cas_active, "upper_band": round(p.ltp * CAS_BAND_UPPER, 1),
+             "lower_band": round(p.ltp * CAS_BAND_LOWER, 1)}
+    columns = dict(_decision_context(p, score, bands), uf=uf, ttc=ttc, size_ratio=u["size_ratio"])
+
+    return {
+        "points": int(score.size),
+        "axes": axes,
+        "columns": {
+            "time_to_close": ttc.tolist(),
+            "size": size.astype(np.int64).tolist(),
+            "urgency_factor": uf.tolist(),
+            "urgency_score": score.tolist(),
+            "urgency_classification": _rule_values(rules, "classification", "classification", columns).tolist(),
+            "market_state": [_CAS_STATES[c] for c in u["state"].tolist()],
+            "cas_active": cas_active.tolist(),
+            "order_type": _rule_values(rules, "order_type", "order_type", columns).tolist(),
+            "limit_price": _sweep_limit_price(rules, p, columns),
+            "tif": _rule_values(rules, "tif", "tif", columns).tolist(),
+            "executor": _rule_values(rules, "executor", "executor", columns).tolist(),
         },
     }
+
+
+# ---------- prefill sessions ----------
+# Interactive TTC moves: a session keeps everything a prefill does not
+# recompute when only time_to_close changes (parsed notes and intent, side,
+# crossing, the static fields). reprefill_ttc reruns urgency, CAS, limit
+# price, IWould and the score-dependent assembly, against the market row
+# the session started from, and reports what changed.
+
+class PrefillSession:
+    __slots__ = ("inputs", "static", "result", "lock")
+
+    def __init__(self, inputs: _PrefillInputs, static: dict, result: dict):
+        self.inputs = inputs
+        self.static = static
+        self.result = result            # latest full result, the base of the next diff
+        self.lock = threading.Lock()
+
+
+def start_prefill_session(req: PrefillRequest, market: dict, client: dict) -> PrefillSession:
+    t0 = _time.perf_counter()
+    p = _prefill_inputs(req, market, client)
+    static = _static_prefill(p, build_crossing(p.size, p.size_ratio))
+    return PrefillSession(p, static, _assemble_prefill(p, static, *_time_dependent(p), t0))
+
+
+def reprefill_ttc(session: PrefillSession, ttc: int) -> dict:
+    """
+    Move the session to a new TTC. Returns the blob_codec.json_diff patch
+    from the previous result to the new one (apply_diff rebuilds it).
+    """
+    with session.lock:
+        t0 = _time.perf_counter()
+        p = session.inputs._replace(ttc=ttc)
+        result = _assemble_prefill(p, session.static, *_time_dependent(p), t0)
+        diff = json_diff(session.result, result)
+        session.inputs, session.result = p, result
+    return diff
+
+
 # ============================================================
 # API ROUTES
 # ============================================================
+# Routes that touch the database exist twice: a sync handler on the pymysql
+# pool (default) and an async handler on the aiomysql pool, registered when
+# DB_ASYNC=1. Both share the SQL and row helpers below; run_prefill is pure
+# CPU and identical in both modes.
+
+def sync_route(register):
+    """Register the decorated handler only in sync (threadpool) mode."""
+    return (lambda f: f) if DB_ASYNC else register
+
+
+def async_route(register):
+    """Register the decorated handler only in async (DB_ASYNC=1) mode."""
+    return register if DB_ASYNC else (lambda f: f)
+
+
+CLIENT_SQL = (
+    "SELECT cpty_id, client_name, urgency_factor, price_sensitivity, execution_model "
+    "FROM client_profiles WHERE cpty_id = %s"
+)
+CLIENT_IN_SQL = (
+    "SELECT cpty_id, client_name, urgency_factor, price_sensitivity, execution_model "
+    "FROM client_profiles WHERE cpty_id IN %s"
+)
+SUBMIT_SQL = (
+    "INSERT INTO order_data "
+    "(symbol, cpty_id, side, size, order_notes, arrival_time, "
+    " prefill_blob, params_diff, trader_overrides, "
+    " urgency_score, urgency_class, executor, order_type, tif, "
+    " submission_status, submitted_at) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Submitted', %s)"
+)
+UPDATE_TTC_SQL = "UPDATE market_latest SET time_to_close = %s WHERE symbol = %s"
+
+
+def _client_row(row: dict) -> dict:
+    row["urgency_factor"] = float(row["urgency_factor"])
+    return row
+
+
+def _client_profile(cpty_id: str) -> Optional[dict]:
+    client = client_registry.get(cpty_id)
+    if client is None:
+        # Not in the registry (yet); the next refresh picks new clients up
+        row = _db_fetchone(CLIENT_SQL, (cpty_id,))
+        client = _client_row(row) if row else None
+    return client
+
+
+async def _client_profile_async(cpty_id: str) -> Optional[dict]:
+    client = client_registry.get(cpty_id)
+    if client is None:
+        row = await aio_db.fetchone(CLIENT_SQL, (cpty_id,))
+        client = _client_row(row) if row else None
+    return client
+
+
+def _registry_clients(cpty_ids) -> tuple:
+    """({cpty_id: profile} from the registry, [cpty_ids it does not have])"""
+    clients, missing = {}, []
+    for cpty_id in dict.fromkeys(cpty_ids):
+        client = client_registry.get(cpty_id)
+        if client is None:
+            missing.append(cpty_id)
+        else:
+            clients[cpty_id] = client
+    return clients, missing
+
+
+def _client_profiles(cpty_ids) -> dict:
+    """_client_profile for several clients; registry misses load in one query"""
+    clients, missing = _registry_clients(cpty_ids)
+    if missing:
+        for row in _db_fetchall(CLIENT_IN_SQL, (tuple(missing),)):
+            clients[row["cpty_id"]] = _client_row(row)
+    return clients
+
+
+async def _client_profiles_async(cpty_ids) -> dict:
+    clients, missing = _registry_clients(cpty_ids)
+    if missing:
+        for row in await aio_db.fetchall(CLIENT_IN_SQL, (tuple(missing),)):
+            clients[row["cpty_id"]] = _client_row(row)
+    return clients
+
+
+def _param_value(params: dict, key: str):
+    """Value of a prefilled field, whether sent as _field() dict or bare value"""
+    v = params.get(key)
+    return v.get("value") if isinstance(v, dict) else v
+
+
+def _blotter_columns(req: SubmitRequest) -> tuple:
+    """urgency_score, urgency_class, executor, order_type, tif at submit time"""
+    p = req.prefilled_params
+    score = req.urgency_score if req.urgency_score is not None else p.get("urgency_score")
+    cls = req.urgency_classification or p.get("urgency_classification")
+    return (score, cls, _param_value(p, "executor"), _param_value(p, "order_type"),
+            _param_value(p, "tif"))
+
+
+# trader_overrides is keyed by the ticket's field labels ("Side", "Open %");
+# labels that are not just the param name title-cased are listed here
+OVERRIDE_LABELS = {
+    "Release": "release_date",
+    "Urgency": "urgency_setting",
+    "Open Print": "opening_print",
+    "Open %": "opening_pct",
+    "Close Print": "closing_print",
+    "Close %": "closing_pct",
+    "Min Cross": "min_cross_qty",
+    "Max Cross": "max_cross_qty",
+    "Cross Unit": "cross_qty_unit",
+    "Leave Active": "leave_active_slice",
+    "IW Price": "iwould_price",
+    "IW Qty": "iwould_qty",
+    "Lim Option": "limit_option",
+    "Lim Offset": "limit_offset",
+}
+
+
+def apply_overrides(prefill: dict, overrides: dict) -> dict:
+    """
+    The params the trader submitted: the prefill with each override's value
+    put in its field. Overrides may name a field by ticket label or param
+    name; ones matching no prefilled field are left out.
+    """
+    submitted = dict(prefill)
+    for label, value in overrides.items():
+        key = OVERRIDE_LABELS.get(label) or label.lower().replace(" ", "_")
+        if key not in prefill:
+            continue
+        field = prefill[key]
+        submitted[key] = dict(field, value=value) if isinstance(field, dict) else value
+    return submitted
+
+
+def _submit_params(req: SubmitRequest, now: datetime) -> tuple:
+    return (
+        req.symbol,
+        req.cpty_id,
+        req.side,
+        req.size,
+        req.order_notes,
+        now,
+        # Submitted params (prefill + trader edits) are stored as a diff against it
+        *encode_params(req.prefilled_params,
+                       apply_overrides(req.prefilled_params, req.trader_overrides)),
+        json.dumps(req.trader_overrides),
+        *_blotter_columns(req),
+        now,
+    )
+
+
+def _record_submit(req: SubmitRequest, order_id: int, now: datetime) -> None:
+    order_stats.on_insert(order_id, now.date(), req.cpty_id, req.symbol, req.side,
+                          req.size, "Submitted")
+
+
+def _submit_response(order_id: int) -> dict:
+    return {
+        "order_id": order_id,
+        "status": "submitted",
+        "submission_time": datetime.utcnow().isoformat() + "Z",
+        "validation_status": "PASSED",
+    }
+
+
+def _order_row(row: dict) -> dict:
+    expand_row(row)
+    # Serialize datetimes
+    for k, v in row.items():
+        if isinstance(v, datetime):
+            row[k] = v.isoformat()
+    return row
+
+
+def _prefill_key(req: PrefillRequest, market: MarketEntry, client) -> Optional[tuple]:
+    """Result cache key, or None if the inputs are not the ones the caches hold"""
+    snap = client_registry.snapshot
+    # A row loaded while racing an invalidation, or a client read straight
+    # from the database, has no version of its own: compute, don't cache
+    if not market_cache.is_current(market) or snap.profiles.get(req.cpty_id) is not client:
+        return None
+    return PrefillCache.key(req.model_dump(), market.snapshot_id, market.version, snap.version,
+                            intent_cache.parser.pattern_version(), decision_rules.table.version,
+                            date.today())
+
+
+def _prefill_result(req: PrefillRequest, market: MarketEntry, client: dict) -> dict:
+    # Run the AUO engine
+    if prefill_cache is None:
+        return _annotate_prefill(req, market, run_prefill(req, market.row, client))
+    result, _ = prefill_cache.lookup(_prefill_key(req, market, client),
+                                     lambda: run_prefill(req, market.row, client))
+    return _annotate_prefill(req, market, result)
+
+
+def _annotate_prefill(req: PrefillRequest, market: MarketEntry, result: dict) -> dict:
+    result["metadata"]["market_snapshot"] = market_cache.describe(market)
+    if parser_shadow:
+        parser_shadow.offer(req.order_notes)
+    return result
+
 
 # ---------- health ----------
 
-@app.get("/api/health")
+@sync_route(app.get("/api/health"))
 def health():
     try:
-        conn = get_db()
-        conn.ping()
-        conn.close()
+        with db_pool.connection() as conn:
+            conn.ping(reconnect=False)
+        db_status = "connected"
+    except Exception as e:
+        db_status = f"error: {e}"
+    return {"status": "healthy", "database": db_status, "db_pool": db_pool.stats(),
+            "version": "1.0.0"}
+
+
+@async_route(app.get("/api/health"))
+async def health_async():
+    try:
+        await aio_db.ping()
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {e}"
-    return {"status": "healthy", "database": db_status, "version": "1.0.0"}
+    return {"status": "healthy", "database": db_status, "db_pool": aio_db.stats(),
+            "mode": "async", "version": "1.0.0"}
+
+
+# ---------- intent cache ----------
+
+@app.get("/api/intent-cache/stats")
+def get_intent_cache_stats():
+    """Hits, misses, evictions and approximate memory of the intent cache."""
+    return intent_cache.stats()
+
+
+@app.delete("/api/intent-cache")
+def clear_intent_cache():
+    intent_cache.clear()
+    return {"cleared": True}
+
+
+@app.get("/api/prefill-cache/stats")
+def get_prefill_cache_stats():
+    """Hit rate and approximate memory of the prefill result cache."""
+    return prefill_cache.stats() if prefill_cache else {"enabled": False}
+
+
+@app.delete("/api/prefill-cache")
+def clear_prefill_cache():
+    if prefill_cache:
+        prefill_cache.clear()
+    return {"cleared": True}
+
+
+@app.get("/api/prefill-sessions/stats")
+def get_prefill_session_stats():
+    return prefill_sessions.stats()
+
+
+# ---------- parser backends ----------
+
+@app.get("/api/parser/stats")
+def get_parser_stats():
+    """Active backend plus shadow-mode latency histograms and disagreements."""
+    return {
+        "backend": parser_backend.name,
+        "available": available_backends(),
+        "shadow": parser_shadow.stats() if parser_shadow else None,
+    }
+
+
+# ---------- decision rules ----------
+
+@app.get("/api/decision-rules")
+def get_decision_rules():
+    """The live rule table, its version and the size of each compiled lookup table."""
+    return {**decision_rules.stats(), "rules": decision_rules.table.source}
+
+
+@app.put("/api/decision-rules")
+def put_decision_rules(rules: dict):
+    """Compile and install a new rule table; on any error the running one stays."""
+    try:
+        decision_rules.install(rules)
+    except RuleError as e:
+        raise HTTPException(422, str(e))
+    return decision_rules.stats()
+
+
+@app.post("/api/decision-rules/reload")
+def reload_decision_rules():
+    """Re-read DECISION_RULES_PATH (undoes a PUT)."""
+    try:
+        decision_rules.reload()
+    except RuleError as e:
+        raise HTTPException(422, str(e))
+    return decision_rules.stats()
 
 
 # ---------- clients ----------
 
 @app.get("/api/clients")
-def list_clients():
-    conn = get_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT cpty_id, client_name, urgency_factor, "
-                "price_sensitivity, execution_model FROM client_profiles ORDER BY cpty_id"
-            )
-            rows = cur.fetchall()
-        # Convert Decimal → float for JSON serialization
-        for r in rows:
-            r["urgency_factor"] = float(r["urgency_factor"])
-        return rows
-    finally:
-        conn.close()
+def list_clients(if_none_match: Optional[str] = Header(None)):
+    """Pre-serialized client list; 304 when the caller's ETag is current."""
+    snap = client_registry.snapshot
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if if_none_match == snap.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snap.payload, media_type="application/json", headers=headers)
+
+
+@app.get("/api/client-registry/stats")
+def get_client_registry_stats():
+    return {**client_registry.stats(), "refresher": client_refresher.stats()}
 
 
 # ---------- market data ----------
 
-@app.get("/api/market/{symbol}")
+@sync_route(app.get("/api/market/{symbol}"))
 def get_market(symbol: str):
-    conn = get_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT symbol, ltp, bid, ask, time_to_close, volatility_pct, avg_trade_size "
-                "FROM market_data WHERE symbol = %s ORDER BY snapshot_id DESC LIMIT 1",
-                (symbol,),
-            )
-            row = cur.fetchone()
-        if not row:
-            raise HTTPException(404, f"Symbol {symbol} not found")
-        # Decimal → float
-        for k in ("ltp", "bid", "ask", "volatility_pct"):
-            row[k] = float(row[k])
-        return row
-    finally:
-        conn.close()
+    entry = market_cache.get(symbol)
+    if not entry:
+        raise HTTPException(404, f"Symbol {symbol} not found")
+    return entry.row
+
+
+@async_route(app.get("/api/market/{symbol}"))
+async def get_market_async(symbol: str):
+    entry = await market_cache.get_async(symbol, _fetch_market_async)
+    if not entry:
+        raise HTTPException(404, f"Symbol {symbol} not found")
+    return entry.row
+
+
+@app.get("/api/market-cache/stats")
+def get_market_cache_stats():
+    """Hit rate, snapshot high-water mark and refresher health."""
+    return {**market_cache.stats(), "refresher": market_refresher.stats()}
+
+
+@app.get("/api/order-stats/stats")
+def get_order_stats_health():
+    """Reconciliation count, drift corrections and reconciler health."""
+    return {**order_stats.stats(), "reconciler": order_stats_reconciler.stats()}
+
+
+@app.get("/api/order-archive/stats")
+def get_order_archive_stats():
+    """Archive horizon, partition maintenance counts and job health."""
+    return {**order_archiver.stats(), "job": order_archive_job.stats()}
+
+
+@app.get("/api/order-journal/stats")
+def get_order_journal_stats():
+    """Write-behind backlog, group-commit ratio and flush errors."""
+    return {"enabled": ORDER_WRITE_BEHIND, "id_blocks": order_ids.blocks, **order_journal.stats()}
 
 
 # ---------- MAIN: prefill ----------
 
-@app.post("/api/prefill")
+def _prefill_context(req: PrefillRequest) -> tuple:
+    """(market entry, client profile) for a prefill, or 404"""
+    # Market data from the in-memory snapshot cache
+    market = market_cache.get(req.symbol)
+    if not market:
+        raise HTTPException(404, f"Symbol {req.symbol} not found in market_data")
+
+    # Client profile from the in-memory registry
+    client = _client_profile(req.cpty_id)
+    if not client:
+        raise HTTPException(404, f"Client {req.cpty_id} not found in client_profiles")
+    return market, client
+
+
+async def _prefill_context_async(req: PrefillRequest) -> tuple:
+    # Cache/registry misses load concurrently on separate pooled connections
+    market, client = await asyncio.gather(
+        market_cache.get_async(req.symbol, _fetch_market_async),
+        _client_profile_async(req.cpty_id),
+    )
+    if not market:
+        raise HTTPException(404, f"Symbol {req.symbol} not found in market_data")
+    if not client:
+        raise HTTPException(404, f"Client {req.cpty_id} not found in client_profiles")
+    return market, client
+
+
+@sync_route(app.post("/api/prefill"))
 def prefill(req: PrefillRequest):
-    conn = get_db()
-    try:
-        with conn.cursor() as cur:
-            # Fetch market data
-            cur.execute(
-                "SELECT symbol, ltp, bid, ask, time_to_close, volatility_pct, avg_trade_size "
-                "FROM market_data WHERE symbol = %s ORDER BY snapshot_id DESC LIMIT 1",
-                (req.symbol,),
-            )
-            market = cur.fetchone()
-            if not market:
-                raise HTTPException(404, f"Symbol {req.symbol} not found in market_data")
-
-            # Fetch client profile
-            cur.execute(
-                "SELECT cpty_id, client_name, urgency_factor, price_sensitivity, execution_model "
-                "FROM client_profiles WHERE cpty_id = %s",
-                (req.cpty_id,),
-            )
-            client = cur.fetchone()
-            if not client:
-                raise HTTPException(404, f"Client {req.cpty_id} not found in client_profiles")
+    return _prefill_result(req, *_prefill_context(req))
 
-        # Decimal → float for all numeric fields
-        for k in ("ltp", "bid", "ask", "volatility_pct"):
-            market[k] = float(market[k])
-        client["urgency_factor"] = float(client["urgency_factor"])
 
-        # Run the AUO engine
-        result = run_prefill(req, market, client)
-        return result
+@async_route(app.post("/api/prefill"))
+async def prefill_async(req: PrefillRequest):
+    return _prefill_result(req, *await _prefill_context_async(req))
 
-    finally:
-        conn.close()
+
+# ---------- basket prefill ----------
+
+PREFILL_BATCH_MAX = int(os.getenv("PREFILL_BATCH_MAX", 1000))
+
+
+def _check_prefill_batch(batch: BatchPrefillRequest) -> None:
+    if not 1 <= len(batch.orders) <= PREFILL_BATCH_MAX:
+        raise HTTPException(422, f"orders must hold 1-{PREFILL_BATCH_MAX} orders")
+
+
+def _prefill_batch_result(batch: BatchPrefillRequest, markets: dict, clients: dict) -> dict:
+    errors = []
+    for i, req in enumerate(batch.orders):
+        if req.symbol not in markets:
+            errors.append({"index": i, "error": f"Symbol {req.symbol} not found in market_data"})
+        elif req.cpty_id not in clients:
+            errors.append({"index": i, "error": f"Client {req.cpty_id} not found in client_profiles"})
+    if errors:
+        raise HTTPException(404, {"message": "Basket not prefilled", "errors": errors})
+
+    results = run_prefill_batch([(req, markets[req.symbol].row, clients[req.cpty_id])
+                                 for req in batch.orders])
+    return {
+        "count": len(results),
+        "results": [_annotate_prefill(req, markets[req.symbol], result)
+                    for req, result in zip(batch.orders, results)],
+    }
+
+
+@sync_route(app.post("/api/prefill/batch"))
+def prefill_batch(batch: BatchPrefillRequest):
+    """
+    Prefill a basket in one call. Results are in request order and match
+    /api/prefill order for order; cache and registry misses are loaded with
+    one IN (...) query per table.
+    """
+    _check_prefill_batch(batch)
+    markets = market_cache.get_many([o.symbol for o in batch.orders], _fetch_markets)
+    clients = _client_profiles([o.cpty_id for o in batch.orders])
+    return _prefill_batch_result(batch, markets, clients)
+
+
+@async_route(app.post("/api/prefill/batch"))
+async def prefill_batch_async(batch: BatchPrefillRequest):
+    _check_prefill_batch(batch)
+    markets, clients = await asyncio.gather(
+        market_cache.get_many_async([o.symbol for o in batch.orders], _fetch_markets_async),
+        _client_profiles_async([o.cpty_id for o in batch.orders]),
+    )
+    return _prefill_batch_result(batch, markets, clients)
+
+
+# ---------- prefill sessions ----------
+
+def _open_session(req: PrefillRequest, market: MarketEntry, client) -> dict:
+    session = start_prefill_session(req, market.row, client)
+    token = secrets.token_urlsafe(16)
+    prefill_sessions.put(token, session)
+    # Annotate a copy: session.result stays the base of the first diff
+    result = _annotate_prefill(req, market, dict(session.result,
+                                                 metadata=dict(session.result["metadata"])))
+    result["session"] = {"token": token, "ttl_s": PREFILL_SESSION_TTL}
+    return result
+
+
+@sync_route(app.post("/api/prefill/session"))
+def prefill_session(req: PrefillRequest):
+    return _open_session(req, *_prefill_context(req))
+
+
+@async_route(app.post("/api/prefill/session"))
+async def prefill_session_async(req: PrefillRequest):
+    return _open_session(req, *await _prefill_context_async(req))
+
+
+@app.post("/api/prefill/session/{token}/ttc")
+def prefill_session_ttc(token: str, ttc: int):
+    """Re-prefill at a new TTC; `diff` patches the previous response's result"""
+    if ttc < 0:
+        raise HTTPException(422, "ttc must be >= 0")
+    session = prefill_sessions.get(token)
+    if session is None:
+        raise HTTPException(404, "Prefill session not found or expired")
+    diff = reprefill_ttc(session, ttc)
+    prefill_sessions.put(token, session)        # restart the expiry clock
+    return {"token": token, "time_to_close": ttc, "diff": diff}
+
+
+# ---------- what-if sweep ----------
+
+PREFILL_SWEEP_MAX_POINTS = int(os.getenv("PREFILL_SWEEP_MAX_POINTS", 20000))
+
+
+def _sweep_axis(name: str, r: Optional[SweepRange], integer: bool, minimum: float) -> Optional[list]:
+    if r is None:
+        return None
+    if r.step <= 0 or r.stop < r.start or r.start < minimum:
+        raise HTTPException(422, f"{name}: need {minimum} <= start <= stop and step > 0")
+    n = int((r.stop - r.start) / r.step + 1e-9) + 1
+    if n > PREFILL_SWEEP_MAX_POINTS:
+        raise HTTPException(422, f"{name}: more than {PREFILL_SWEEP_MAX_POINTS} points")
+    values = r.start + r.step * np.arange(n)
+    # Integer axes snap to whole numbers; factors drop float noise (0.1 * 3)
+    values = np.unique(np.rint(values).astype(np.int64)) if integer else np.round(values, 6)
+    return values.tolist()
+
+
+def _sweep_axes(sweep: PrefillSweepRequest) -> tuple:
+    axes = (
+        _sweep_axis("time_to_close", sweep.time_to_close, True, 0),
+        _sweep_axis("size", sweep.size, True, 1),
+        _sweep_axis("urgency_factor", sweep.urgency_factor, False, 0),
+    )
+    points = 1
+    for values in axes:
+        points *= len(values) if values else 1
+    if points > PREFILL_SWEEP_MAX_POINTS:
+        raise HTTPException(422, f"Sweep has {points} points, max {PREFILL_SWEEP_MAX_POINTS}")
+    return axes
+
+
+def _sweep_result(sweep: PrefillSweepRequest, axes: tuple, market: MarketEntry, client: dict) -> dict:
+    t0 = _time.perf_counter()
+    result = run_prefill_sweep(sweep.order, market.row, client, *axes)
+    result["metadata"] = {
+        "processing_time_ms": round((_time.perf_counter() - t0) * 1000),
+        "market_snapshot": market_cache.describe(market),
+    }
+    return result
+
+
+@sync_route(app.post("/api/prefill/sweep"))
+def prefill_sweep(sweep: PrefillSweepRequest):
+    """
+    What-if grid for one order over time_to_close, size and/or urgency_factor
+    ranges ({start, stop, step}, stop inclusive), returned column-wise so
+    the TTC slider can run client-side from one response.
+    """
+    axes = _sweep_axes(sweep)
+    return _sweep_result(sweep, axes, *_prefill_context(sweep.order))
+
+
+@async_route(app.post("/api/prefill/sweep"))
+async def prefill_sweep_async(sweep: PrefillSweepRequest):
+    axes = _sweep_axes(sweep)
+    return _sweep_result(sweep, axes, *await _prefill_context_async(sweep.order))
 
 
 # ---------- submit order ----------
 
-@app.post("/api/orders/submit")
+@sync_route(app.post("/api/orders/submit"))
 def submit_order(req: SubmitRequest):
-    conn = get_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO order_data "
-                "(symbol, cpty_id, side, size, order_notes, arrival_time, "
-                " prefill_result, submitted_params, trader_overrides, "
-                " submission_status, submitted_at) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'Submitted', %s)",
-                (
-                    req.symbol,
-                    req.cpty_id,
-                    req.side,
-                    req.size,
-                    req.order_notes,
-                    datetime.utcnow(),
-                    json.dumps(req.prefilled_params),
-                    json.dumps(req.prefilled_params),
-                    json.dumps(req.trader_overrides),
-                    datetime.utcnow(),
-                ),
-            )
-            order_id = cur.lastrowid
-        return {
-            "order_id": order_id,
-            "status": "submitted",
-            "submission_time": datetime.utcnow().isoformat() + "Z",
-            "validation_status": "PASSED",
-        }
-    finally:
-        conn.close()
+    _check_order(req, _client_profiles([req.cpty_id]))
+    now = datetime.utcnow()
+    params = _submit_params(req, now)
+    if ORDER_WRITE_BEHIND:
+        order_id = _journal_submit(params)
+    else:
+        with db_pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SUBMIT_SQL, params)
+                order_id = cur.lastrowid
+    _record_submit(req, order_id, now)
+    return _submit_response(order_id)
+
+
+@async_route(app.post("/api/orders/submit"))
+async def submit_order_async(req: SubmitRequest):
+    _check_order(req, await _client_profiles_async([req.cpty_id]))
+    now = datetime.utcnow()
+    params = _submit_params(req, now)
+    if ORDER_WRITE_BEHIND:
+        # The journal fsync blocks; keep it off the event loop
+        order_id = await asyncio.get_running_loop().run_in_executor(None, _journal_submit, params)
+    else:
+        order_id = await aio_db.execute(SUBMIT_SQL, params)
+    _record_submit(req, order_id, now)
+    return _submit_response(order_id)
+
+
+# ---------- submit basket ----------
+
+ORDER_BATCH_MAX = int(os.getenv("ORDER_BATCH_MAX", 1000))
+BATCH_MODES = ("all_or_nothing", "best_effort")
+# Row-level failures; anything else (lost connection, ...) fails the basket
+BATCH_ROW_ERRORS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+_SUBMIT_HEAD, _SUBMIT_ROW = SUBMIT_SQL.split("VALUES ")
+
+
+def _order_problem(req: SubmitRequest, clients: dict) -> Optional[str]:
+    """
+    Checks that would otherwise fail the whole multi-row INSERT. `clients`
+    comes from _client_profiles, so a client added since the last registry
+    refresh is found in the database.
+    """
+    if not req.symbol or len(req.symbol) > 20:
+        return "symbol must be 1-20 characters"
+    if req.size <= 0:
+        return "size must be positive"
+    if req.side not in (None, "Buy", "Sell"):
+        return "side must be 'Buy' or 'Sell'"
+    if req.cpty_id not in clients:
+        return f"Client {req.cpty_id} not found in client_profiles"
+    return None
+
+
+def _check_order(req: SubmitRequest, clients: dict) -> None:
+    # order_data has no foreign key on cpty_id since it was partitioned
+    problem = _order_problem(req, clients)
+    if problem:
+        raise HTTPException(422, problem)
+
+
+def _check_batch(batch: BatchSubmitRequest) -> None:
+    if batch.mode not in BATCH_MODES:
+        raise HTTPException(422, f"mode must be one of {', '.join(BATCH_MODES)}")
+    if not 1 <= len(batch.orders) <= ORDER_BATCH_MAX:
+        raise HTTPException(422, f"orders must hold 1-{ORDER_BATCH_MAX} orders")
+
+
+def _plan_batch(batch: BatchSubmitRequest, clients: dict) -> tuple:
+    """Validate every order up front; returns (results, accepted indexes)"""
+    results, accepted = [None] * len(batch.orders), []
+    for i, req in enumerate(batch.orders):
+        problem = _order_problem(req, clients)
+        if problem:
+            results[i] = {"index": i, "status": "rejected", "error": problem}
+        else:
+            accepted.append(i)
+    if batch.mode == "all_or_nothing" and len(accepted) < len(batch.orders):
+        raise HTTPException(422, {"message": "Basket rejected, nothing submitted",
+                                  "results": [r for r in results if r]})
+    return results, accepted
+
+
+def _batch_insert_sql(n: int) -> str:
+    return _SUBMIT_HEAD + "VALUES " + ", ".join([_SUBMIT_ROW] * n)
+
+
+def _journal_batch(accepted: list, rows: list) -> dict:
+    ids = order_ids.next_ids(len(rows))
+    order_journal.append_many(list(zip(ids, rows)))
+    return dict(zip(accepted, ids))
+
+
+def _insert_batch(accepted: list, rows: list, mode: str) -> dict:
+    """index -> order_id, or -> error message for rows rejected by MySQL"""
+    with db_pool.connection() as conn:
+        conn.begin()
+        try:
+            with conn.cursor() as cur:
+                try:
+                    cur.execute(_batch_insert_sql(len(rows)), [p for row in rows for p in row])
+                    # A multi-row INSERT gets consecutive ids; lastrowid is the first
+                    outcomes = dict(zip(accepted, range(cur.lastrowid, cur.lastrowid + len(rows))))
+                except BATCH_ROW_ERRORS as e:
+                    if mode == "all_or_nothing":
+                        raise HTTPException(422, f"Basket rejected, nothing submitted: {e}") from None
+                    # Only the failed statement was rolled back; go row by row
+                    outcomes = {}
+                    for i, row in zip(accepted, rows):
+                        try:
+                            cur.execute(SUBMIT_SQL, row)
+                            outcomes[i] = cur.lastrowid
+                        except BATCH_ROW_ERRORS as row_error:
+                            outcomes[i] = str(row_error)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return outcomes
+
+
+async def _insert_batch_async(accepted: list, rows: list, mode: str) -> dict:
+    async with aio_db.connection() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                try:
+                    await cur.execute(_batch_insert_sql(len(rows)), [p for row in rows for p in row])
+                    outcomes = dict(zip(accepted, range(cur.lastrowid, cur.lastrowid + len(rows))))
+                except BATCH_ROW_ERRORS as e:
+                    if mode == "all_or_nothing":
+                        raise HTTPException(422, f"Basket rejected, nothing submitted: {e}") from None
+                    outcomes = {}
+                    for i, row in zip(accepted, rows):
+                        try:
+                            await cur.execute(SUBMIT_SQL, row)
+                            outcomes[i] = cur.lastrowid
+                        except BATCH_ROW_ERRORS as row_error:
+                            outcomes[i] = str(row_error)
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+    return outcomes
+
+
+def _batch_response(batch: BatchSubmitRequest, results: list, outcomes: dict,
+                    now: datetime) -> dict:
+    for i, outcome in outcomes.items():
+        if isinstance(outcome, int):
+            _record_submit(batch.orders[i], outcome, now)
+            results[i] = {"index": i, "order_id": outcome, "status": "submitted"}
+        else:
+            results[i] = {"index": i, "status": "rejected", "error": outcome}
+    submitted = sum(r["status"] == "submitted" for r in results)
+    return {
+        "mode": batch.mode,
+        "submitted": submitted,
+        "rejected": len(results) - submitted,
+        "submission_time": datetime.utcnow().isoformat() + "Z",
+        "results": results,
+    }
+
+
+@sync_route(app.post("/api/orders/submit/batch"))
+def submit_batch(batch: BatchSubmitRequest):
+    """
+    Submit a basket in one transaction and one multi-row INSERT.
+    all_or_nothing: any invalid order rejects the basket (422).
+    best_effort: invalid orders are reported, the rest are submitted.
+    """
+    _check_batch(batch)
+    results, accepted = _plan_batch(batch, _client_profiles(r.cpty_id for r in batch.orders))
+    now = datetime.utcnow()
+    rows = [_submit_params(batch.orders[i], now) for i in accepted]
+    if not rows:
+        outcomes = {}
+    elif ORDER_WRITE_BEHIND:
+        outcomes = _journal_batch(accepted, rows)
+    else:
+        outcomes = _insert_batch(accepted, rows, batch.mode)
+    return _batch_response(batch, results, outcomes, now)
+
+
+@async_route(app.post("/api/orders/submit/batch"))
+async def submit_batch_async(batch: BatchSubmitRequest):
+    _check_batch(batch)
+    clients = await _client_profiles_async(r.cpty_id for r in batch.orders)
+    results, accepted = _plan_batch(batch, clients)
+    now = datetime.utcnow()
+    rows = [_submit_params(batch.orders[i], now) for i in accepted]
+    if not rows:
+        outcomes = {}
+    elif ORDER_WRITE_BEHIND:
+        outcomes = await asyncio.get_running_loop().run_in_executor(None, _journal_batch, accepted, rows)
+    else:
+        outcomes = await _insert_batch_async(accepted, rows, batch.mode)
+    return _batch_response(batch, results, outcomes, now)
 
 
 # ---------- get order ----------
 
-@app.get("/api/orders/{order_id}")
+ORDER_BY_ID_SQL = "SELECT * FROM {table} WHERE order_id = %s"
+
+
+@sync_route(app.get("/api/orders/{order_id:int}"))
 def get_order(order_id: int):
-    conn = get_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM order_data WHERE order_id = %s", (order_id,))
-            row = cur.fetchone()
-        if not row:
-            raise HTTPException(404, f"Order {order_id} not found")
-        # Serialize datetimes
-        for k, v in row.items():
-            if isinstance(v, datetime):
-                row[k] = v.isoformat()
-        return row
-    finally:
-        conn.close()
+    row = _db_fetchone(ORDER_BY_ID_SQL.format(table="order_data"), (order_id,))
+    if not row and order_archiver.horizon is not None:
+        row = _db_fetchone(ORDER_BY_ID_SQL.format(table="order_data_archive"), (order_id,))
+    if not row:
+        raise HTTPException(404, f"Order {order_id} not found")
+    return _order_row(row)
+
+
+@async_route(app.get("/api/orders/{order_id:int}"))
+async def get_order_async(order_id: int):
+    row = await aio_db.fetchone(ORDER_BY_ID_SQL.format(table="order_data"), (order_id,))
+    if not row and order_archiver.horizon is not None:
+        row = await aio_db.fetchone(ORDER_BY_ID_SQL.format(table="order_data_archive"), (order_id,))
+    if not row:
+        raise HTTPException(404, f"Order {order_id} not found")
+    return _order_row(row)
 
 
 # ---------- update market TTC (for demo slider) ----------
 
-@app.put("/api/market/{symbol}/ttc")
+@sync_route(app.put("/api/market/{symbol}/ttc"))
 def update_ttc(symbol: str, ttc: int):
     """Let the frontend slider update time_to_close for demo purposes."""
-    conn = get_db()
-    try:
+    with db_pool.connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE market_data SET time_to_close = %s WHERE symbol = %s",
-                (ttc, symbol),
-            )
-        return {"symbol": symbol, "time_to_close": ttc, "updated": True}
-    finally:
-        conn.close()
+            cur.execute(UPDATE_TTC_SQL, (ttc, symbol))
+    market_cache.invalidate(symbol)
+    return {"symbol": symbol, "time_to_close": ttc, "updated": True}
+
+
+@async_route(app.put("/api/market/{symbol}/ttc"))
+async def update_ttc_async(symbol: str, ttc: int):
+    await aio_db.execute(UPDATE_TTC_SQL, (ttc, symbol))
+    market_cache.invalidate(symbol)
+    return {"symbol": symbol, "time_to_close": ttc, "updated": True}
 
 # ============================================================
 # NEW: BLOTTER ENDPOINTS
 # ============================================================
 
+# Columns the blotter table and its expanded row need. The urgency and
+# routing fields are plain columns written at submit time, so the list path
+# never reads or decodes the JSON blobs.
+ORDER_LIST_COLUMNS = (
+    "order_id, symbol, cpty_id, side, size, order_notes, arrival_time, "
+    "submission_status, submitted_at, urgency_score, urgency_class, "
+    "order_type, tif, executor AS algo"
+)
+ORDER_LIST_MAX_LIMIT = 1000
+ORDER_EXPORT_BLOBS = "prefill_result, submitted_params, trader_overrides, prefill_blob, params_diff"
+ORDER_EXPORT_CHUNK = int(os.getenv("ORDER_EXPORT_CHUNK", 500))
+ORDER_EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+ORDER_SORTS = ("order_id", "urgency_score")
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(422, f"{name} must be YYYY-MM-DD, got {value!r}") from None
+
+
+def _order_filters(symbol: Optional[str] = None, cpty_id: Optional[str] = None,
+                   side: Optional[str] = None, status: Optional[str] = None,
+                   date_from: Optional[str] = None, date_to: Optional[str] = None,
+                   urgency_min: Optional[int] = None, urgency_max: Optional[int] = None,
+                   urgency_class: Optional[str] = None):
+    """
+    WHERE clauses + params for the blotter filters. Every predicate is
+    sargable: symbol is a prefix match and dates are half-open ranges on
+    arrival_time, so the (symbol|cpty_id, arrival_time) indexes apply.
+    """
+    where, params = [], []
+    if symbol:
+        escaped = symbol.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("symbol LIKE %s")
+        params.append(escaped + "%")
+    if cpty_id:
+        where.append("cpty_id = %s")
+        params.append(cpty_id)
+    if side:
+        where.append("side = %s")
+        params.append(side)
+    if status:
+        where.append("submission_status = %s")
+        params.append(status)
+    if date_from:
+        where.append("arrival_time >= %s")
+        params.append(_parse_date(date_from, "date_from"))
+    if date_to:
+        where.append("arrival_time < %s")
+        params.append(_parse_date(date_to, "date_to") + timedelta(days=1))
+    if urgency_min is not None:
+        where.append("urgency_score >= %s")
+        params.append(urgency_min)
+    if urgency_max is not None:
+        where.append("urgency_score <= %s")
+        params.append(urgency_max)
+    if urgency_class:
+        where.append("urgency_class = %s")
+        params.append(urgency_class.upper())
+    return where, params
+
+
+def _order_sources(date_from: Optional[str], date_to: Optional[str]) -> list:
+    """
+    (table, extra where, params) for each table a blotter query must read.
+    The archive is only read when the date range reaches before the horizon.
+    """
+    horizon = order_archiver.horizon
+    if horizon is None:
+        return [("order_data", [], [])]
+    lo = _parse_date(date_from, "date_from") if date_from else None
+    hi = _parse_date(date_to, "date_to") if date_to else None
+    sources = []
+    if hi is None or hi >= horizon:
+        sources.append(("order_data", ["arrival_time >= %s"], [horizon]))
+    if lo is None or lo < horizon:
+        sources.append(("order_data_archive", ["arrival_time < %s"], [horizon]))
+    return sources or [("order_data", [], [])]
+
+
+def _order_select(columns: str, where: list, params: list, order_by: str,
+                  limit: Optional[int], sources: list) -> tuple:
+    """SELECT over one table, or UNION ALL of hot and archive with the limit pushed into each"""
+    branches, args = [], []
+    for table, extra, extra_params in sources:
+        sql = f"SELECT {columns} FROM {table}"
+        if where or extra:
+            sql += " WHERE " + " AND ".join(where + extra)
+        args += params + extra_params
+        if len(sources) > 1:
+            sql += f" ORDER BY {order_by}"
+            if limit:
+                sql += " LIMIT %s"
+                args.append(limit)
+            sql = f"({sql})"
+        branches.append(sql)
+    sql = " UNION ALL ".join(branches) + f" ORDER BY {order_by}"
+    if limit:
+        sql += " LIMIT %s"
+        args.append(limit)
+    return sql, tuple(args)
+
+
+def _keyset(sort: str, descending: bool, cursor: str):
+    """
+    Predicate resuming after `cursor` ("<order_id>" or "<score|null>:<order_id>").
+    MySQL sorts NULL scores last in DESC and first in ASC order.
+    """
+    op = "<" if descending else ">"
+    try:
+        if sort == "order_id":
+            return f"order_id {op} %s", [int(cursor)]
+        score, order_id = cursor.split(":")
+        order_id = int(order_id)
+        if score == "null":
+            after_nulls = "" if descending else " OR urgency_score IS NOT NULL"
+            return f"((urgency_score IS NULL AND order_id {op} %s){after_nulls})", [order_id]
+        score = int(score)
+    except ValueError:
+        raise HTTPException(422, f"Invalid cursor {cursor!r}") from None
+    nulls = " OR urgency_score IS NULL" if descending else ""
+    return (f"(urgency_score {op} %s OR (urgency_score = %s AND order_id {op} %s){nulls})",
+            [score, score, order_id])
+
+
+def _cursor_of(sort: str, row: dict) -> str:
+    if sort == "order_id":
+        return str(row["order_id"])
+    score = row["urgency_score"]
+    return f"{'null' if score is None else score}:{row['order_id']}"
+
+
 @app.get("/api/orders")
 def list_orders(
     symbol: Optional[str] = None,
@@ -899,102 +2490,197 @@ def list_orders(
     status: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    limit: int = 200
+    urgency_min: Optional[int] = None,
+    urgency_max: Optional[int] = None,
+    urgency_class: Optional[str] = None,
+    sort: str = "order_id",
+    order: str = "desc",
+    limit: int = 200,
+    cursor: Optional[str] = None,
 ):
-    conn = get_db()
+    """
+    One page of orders sorted by order_id or urgency_score (ties broken by
+    order_id). Pass the returned next_cursor as `cursor` to fetch the
+    following page (keyset pagination, no OFFSET scans).
+    """
+    if sort not in ORDER_SORTS:
+        raise HTTPException(422, f"sort must be one of {', '.join(ORDER_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(422, "order must be 'asc' or 'desc'")
+    descending = order == "desc"
+    limit = max(1, min(limit, ORDER_LIST_MAX_LIMIT))
+
+    where, params = _order_filters(symbol, cpty_id, side, status, date_from, date_to,
+                                   urgency_min, urgency_max, urgency_class)
+    if cursor:
+        clause, args = _keyset(sort, descending, cursor)
+        where.append(clause)
+        params.extend(args)
+
+    direction = "DESC" if descending else "ASC"
+    if sort == "order_id":
+        order_by = f"order_id {direction}"
+    else:
+        order_by = f"urgency_score {direction}, order_id {direction}"
+    # One extra row tells us whether another page exists
+    sql, args = _order_select(ORDER_LIST_COLUMNS, where, params, order_by, limit + 1,
+                              _order_sources(date_from, date_to))
+    rows = _db_fetchall(sql, args)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _cursor_of(sort, rows[-1])
+
+    for r in rows:
+        client = client_registry.get(r["cpty_id"])
+        r["client_name"] = client["client_name"] if client else None
+        # Handle datetime serialization
+        for k, v in r.items():
+            if isinstance(v, (datetime, date)):
+                r[k] = v.isoformat()
+
+    return {"orders": rows, "total": len(rows), "next_cursor": next_cursor}
+
+def _export_chunks(sql: str, params: tuple, fmt: str, include_blobs: bool):
+    """
+    Encoded export chunks, read through an unbuffered server-side cursor so
+    memory stays at one chunk of rows. The first chunk (CSV header, or b""
+    for NDJSON) is produced once the query is running.
+    """
+    conn = db_pool.acquire()
+    cur = conn.cursor(pymysql.cursors.SSDictCursor)
+    finished = False
     try:
-        with conn.cursor() as cur:
-            # Build query dynamically
-            sql = "SELECT * FROM order_data WHERE 1=1"
-            params = []
-            
-            if symbol:
-                sql += " AND symbol LIKE %s"
-                params.append(f"%{symbol}%")
-            if cpty_id:
-                sql += " AND cpty_id = %s"
-                params.append(cpty_id)
-            if side:
-                sql += " AND side = %s"
-                params.append(side)
-            if status:
-                sql += " AND submission_status = %s"
-                params.append(status)
-            if date_from:
-                sql += " AND DATE(arrival_time) >= %s"
-                params.append(date_from)
-            if date_to:
-                sql += " AND DATE(arrival_time) <= %s"
-                params.append(date_to)
-                
-            sql += " ORDER BY order_id DESC LIMIT %s"
-            params.append(limit)
-            
-            cur.execute(sql, tuple(params))
-            rows = cur.fetchall()
-            
-            # Format JSON fields and Dates
+        cur.execute(sql, params)
+        columns = [d[0] for d in cur.description if d[0] not in BLOB_COLUMNS] + ["client_name"]
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        yield buf.getvalue().encode("utf-8")
+        while True:
+            rows = cur.fetchmany(ORDER_EXPORT_CHUNK)
+            if not rows:
+                break
+            buf.seek(0)
+            buf.truncate()
             for r in rows:
-                if isinstance(r.get("prefill_result"), str):
-                    r["prefill_result"] = json.loads(r["prefill_result"])
-                if isinstance(r.get("submitted_params"), str):
-                    r["submitted_params"] = json.loads(r["submitted_params"])
-                # Extract specific fields for the table
-                submitted = r.get("submitted_params") or {}
-                r["urgency_score"] = submitted.get("urgency_score")
-                r["urgency_class"] = submitted.get("urgency_classification")
-                # Handle datetime serialization
+                if include_blobs:
+                    expand_row(r, parse=writer is None)
+                client = client_registry.get(r["cpty_id"])
+                r["client_name"] = client["client_name"] if client else None
                 for k, v in r.items():
                     if isinstance(v, (datetime, date)):
                         r[k] = v.isoformat()
-
-            return {"orders": rows, "total": len(rows)}
+                if writer:
+                    writer.writerow([r[c] for c in columns])
+                else:
+                    buf.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+            yield buf.getvalue().encode("utf-8")
+        cur.close()
+        finished = True
     finally:
-        conn.close()
+        if not finished:
+            # An abandoned stream leaves unread rows on the wire, and closing
+            # the cursor would read them all: close the socket instead and
+            # never touch the cursor again
+            conn.close()
+        db_pool.release(conn, broken=not finished)
+
+
+@app.get("/api/orders/export")
+def export_orders(
+    format: str = "ndjson",
+    symbol: Optional[str] = None,
+    cpty_id: Optional[str] = None,
+    side: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    urgency_min: Optional[int] = None,
+    urgency_max: Optional[int] = None,
+    urgency_class: Optional[str] = None,
+    order: str = "asc",
+    include_blobs: bool = False,
+):
+    """
+    Every matching order, streamed as NDJSON or CSV in order_id order.
+    Takes the same filters as /api/orders; memory use does not grow with
+    the size of the result.
+    """
+    if format not in ORDER_EXPORT_FORMATS:
+        raise HTTPException(422, f"format must be one of {', '.join(ORDER_EXPORT_FORMATS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(422, "order must be 'asc' or 'desc'")
+    where, params = _order_filters(symbol, cpty_id, side, status, date_from, date_to,
+                                   urgency_min, urgency_max, urgency_class)
+    columns = ORDER_LIST_COLUMNS + (", " + ORDER_EXPORT_BLOBS if include_blobs else "")
+    sql, args = _order_select(columns, where, params, f"order_id {order.upper()}", None,
+                              _order_sources(date_from, date_to))
+
+    chunks = _export_chunks(sql, args, format, include_blobs)
+    # Start the query here so pool timeouts and SQL errors still get a
+    # proper status code instead of a truncated 200
+    first = next(chunks)
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=ORDER_EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
 
 @app.get("/api/orders/stats")
-def get_order_stats():
-    conn = get_db()
-    try:
+def get_order_stats(consistent: bool = False, breakdown: Optional[str] = None):
+    """
+    Blotter counters from memory (O(1)). consistent=true runs one fresh
+    aggregate query instead; breakdown=day|client adds per-day or
+    per-client counters.
+    """
+    if breakdown not in (None, "day", "client"):
+        raise HTTPException(422, "breakdown must be 'day' or 'client'")
+    if consistent:
+        return order_stats.fresh(breakdown)
+    if not order_stats.loaded:
+        order_stats.reconcile()
+    return order_stats.snapshot(breakdown)
+
+
+def _find_order(order_id: int, columns: str) -> tuple:
+    """(table, row) for an order, read through the horizon split like blotter reads"""
+    for table, extra, extra_params in _order_sources(None, None):
+        row = _db_fetchone(f"SELECT {columns} FROM {table} WHERE "
+                           + " AND ".join(["order_id = %s"] + extra), (order_id, *extra_params))
+        if row:
+            return table, row
+    return None, None
+
+
+@app.post("/api/orders/{order_id:int}/cancel")
+def cancel_order(order_id: int):
+    if ORDER_WRITE_BEHIND and order_journal.holds(order_id):
+        raise HTTPException(409, f"Order {order_id} is still being written from the submit journal; retry shortly")
+    table, order = _find_order(order_id, "cpty_id, arrival_time, submission_status")
+    if not order:
+        raise HTTPException(404, f"Order {order_id} not found")
+    old = order["submission_status"]
+    if old == "Cancelled":
+        raise HTTPException(409, f"Order {order_id} is already cancelled")
+    with db_pool.connection() as conn:
         with conn.cursor() as cur:
-            stats = {}
-            
-            # 1. Total Orders
-            cur.execute("SELECT COUNT(*) as c FROM order_data")
-            stats["total_orders"] = cur.fetchone()["c"]
-            
-            # 2. Submitted
-            cur.execute("SELECT COUNT(*) as c FROM order_data WHERE submission_status='Submitted'")
-            stats["submitted"] = cur.fetchone()["c"]
-            
-            # 3. Cancelled (assuming you might have this status later)
-            cur.execute("SELECT COUNT(*) as c FROM order_data WHERE submission_status='Cancelled'")
-            stats["cancelled"] = cur.fetchone()["c"]
-
-            # 4. Drafts (Not stored in DB usually, but for completeness)
-            stats["drafts"] = 0 
-            
-            # 5. Buy/Sell Counts
-            cur.execute("SELECT side, COUNT(*) as c FROM order_data GROUP BY side")
-            rows = cur.fetchall()
-            stats["buy_count"] = next((r["c"] for r in rows if r["side"] == "Buy"), 0)
-            stats["sell_count"] = next((r["c"] for r in rows if r["side"] == "Sell"), 0)
-            
-            # 6. Total Volume
-            cur.execute("SELECT SUM(size) as v FROM order_data")
-            stats["total_volume"] = cur.fetchone()["v"] or 0
-            
-            # 7. Unique Symbols
-            cur.execute("SELECT COUNT(DISTINCT symbol) as c FROM order_data")
-            stats["unique_symbols"] = cur.fetchone()["c"]
-            
-            # 8. Unique Clients
-            cur.execute("SELECT COUNT(DISTINCT cpty_id) as c FROM order_data")
-            stats["unique_clients"] = cur.fetchone()["c"]
-            
-            return stats
-    finally:
-        conn.close()
+            # Guard on the status we read so the stats move is exact; the
+            # arrival_time predicate prunes the UPDATE to one daily partition
+            changed = cur.execute(
+                f"UPDATE {table} SET submission_status = 'Cancelled' "
+                "WHERE order_id = %s AND arrival_time = %s AND submission_status = %s",
+                (order_id, order["arrival_time"], old),
+            )
+    if not changed:
+        raise HTTPException(409, f"Order {order_id} changed concurrently; retry")
+    if table == "order_data_archive":
+        _archived_groups["horizon"] = None     # cached archive aggregates are stale now
+    order_stats.on_status_change(order["arrival_time"].date(), order["cpty_id"], old, "Cancelled")
+    return {"order_id": order_id, "status": "cancelled", "previous_status": old}
+
 # ============================================================
 # ENTRYPOINT
 # ============================================================
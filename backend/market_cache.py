@@ -0,0 +1,247 @@
+"""
+market_cache.py
+===============
+In-memory latest market snapshot per symbol.
+
+Loaded in full at startup, then kept current by refresh(), which polls for
+rows past a watermark column: snapshot_id for an append-only source, or
+updated_at for market_latest, so in-place TTC edits made by other server
+processes are picked up too. update_ttc invalidates the symbol it touched
+in this process. Every entry carries a version so a prefill can report
+exactly which snapshot it priced.
+
+An entry counts as fresh while it was loaded or confirmed by a successful
+poll within `max_age` seconds. get() reloads stale or missing symbols from
+the database; get_async() does the same through a coroutine loader,
+get_many() loads all the misses of a basket in one query, and peek() never
+touches the database.
+"""
+
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+
+NUMERIC_COLUMNS = ("ltp", "bid", "ask", "volatility_pct")
+
+
+class MarketEntry(NamedTuple):
+    row: dict            # symbol, ltp, bid, ask, time_to_close, volatility_pct, avg_trade_size
+    snapshot_id: int
+    version: int         # bumps every time any entry is (re)installed
+    loaded_at: float
+
+
+def _convert(raw: dict, watermark: str) -> dict:
+    """Decimal → float for the numeric columns; drops snapshot_id and the watermark"""
+    row = {k: v for k, v in raw.items() if k != "snapshot_id" and k != watermark}
+    for k in NUMERIC_COLUMNS:
+        row[k] = float(row[k])
+    return row
+
+
+class MarketCache:
+    """
+    fetch_latest(symbol) -> row | None     latest snapshot for one symbol
+    fetch_all_latest()   -> rows           latest snapshot for every symbol
+    fetch_since(mark)    -> rows           rows whose `watermark` column is past mark
+
+    Rows must include snapshot_id (and the watermark column) alongside the
+    columns served to clients.
+    """
+
+    def __init__(self, fetch_latest: Callable[[str], Optional[dict]],
+                 fetch_all_latest: Callable[[], Iterable[dict]],
+                 fetch_since: Callable[[int], Iterable[dict]],
+                 max_age: float = 5.0, watermark: str = "snapshot_id",
+                 clock: Callable[[], float] = time.monotonic):
+        self._fetch_latest = fetch_latest
+        self._fetch_all_latest = fetch_all_latest
+        self._fetch_since = fetch_since
+        self.max_age = max_age
+        self.watermark = watermark
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, MarketEntry] = {}
+        self._version = 0
+        self._epoch = 0                # bumps on every invalidate()
+        self._high_water = None        # highest watermark value seen
+        self._verified_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.stale_reloads = 0
+        self.invalidations = 0
+        self.refreshes = 0
+
+    # ---------- reads ----------
+
+    def peek(self, symbol: str) -> Optional[MarketEntry]:
+        """Fresh cached entry, or None; never touches the database"""
+        entry = self._entries.get(symbol)
+        if entry is not None and self._is_fresh(entry):
+            self.hits += 1
+            return entry
+        return None
+
+    def get(self, symbol: str) -> Optional[MarketEntry]:
+        entry = self.peek(symbol)
+        if entry is not None:
+            return entry
+        epoch = self._miss(symbol)
+        raw = self._fetch_latest(symbol)
+        return self.put(raw, epoch) if raw else None
+
+    async def get_async(self, symbol: str,
+                        fetch_latest: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[MarketEntry]:
+        """get() for the async path, loading misses with a coroutine"""
+        entry = self.peek(symbol)
+        if entry is not None:
+            return entry
+        epoch = self._miss(symbol)
+        raw = await fetch_latest(symbol)
+        return self.put(raw, epoch) if raw else None
+
+    def get_many(self, symbols: Iterable[str],
+                 fetch_many: Callable[[List[str]], Iterable[dict]]) -> Dict[str, MarketEntry]:
+        """
+        Entries for several symbols; all misses load in one fetch_many(symbols)
+        call. Unknown symbols are left out of the result.
+        """
+        found, missing, epoch = self._peek_many(symbols)
+        if missing:
+            self._put_many(found, fetch_many(missing), epoch)
+        return found
+
+    async def get_many_async(self, symbols: Iterable[str],
+                             fetch_many: Callable[[List[str]], Awaitable[Iterable[dict]]]
+                             ) -> Dict[str, MarketEntry]:
+        found, missing, epoch = self._peek_many(symbols)
+        if missing:
+            self._put_many(found, await fetch_many(missing), epoch)
+        return found
+
+    def _peek_many(self, symbols: Iterable[str]) -> tuple:
+        found, missing, epoch = {}, [], None
+        for symbol in dict.fromkeys(symbols):
+            entry = self.peek(symbol)
+            if entry is not None:
+                found[symbol] = entry
+            else:
+                missing.append(symbol)
+                epoch = self._miss(symbol)
+        return found, missing, epoch
+
+    def _put_many(self, found: dict, rows: Iterable[dict], epoch: int) -> None:
+        for raw in rows:
+            found[raw["symbol"]] = self.put(raw, epoch)
+
+    def is_current(self, entry: MarketEntry) -> bool:
+        """True if `entry` is the one cached for its symbol (not superseded or uncached)"""
+        return self._entries.get(entry.row["symbol"]) is entry
+
+    def _miss(self, symbol: str) -> int:
+        if symbol in self._entries:
+            self.stale_reloads += 1
+        self.misses += 1
+        return self._epoch
+
+    def _is_fresh(self, entry: MarketEntry) -> bool:
+        return self._clock() - max(entry.loaded_at, self._verified_at) <= self.max_age
+
+    def describe(self, entry: MarketEntry) -> dict:
+        """Which snapshot a response was priced from, for response metadata"""
+        return {
+            "symbol": entry.row["symbol"],
+            "snapshot_id": entry.snapshot_id,
+            "version": entry.version,
+            "age_ms": round((self._clock() - entry.loaded_at) * 1000, 1),
+        }
+
+    # ---------- writes ----------
+
+    def put(self, raw: dict, epoch: Optional[int] = None) -> MarketEntry:
+        """
+        Install a freshly loaded row (must include snapshot_id). Pass the
+        epoch read before the load started: if an invalidation happened in
+        between, the row may predate it and is returned without caching.
+        """
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return MarketEntry(_convert(raw, self.watermark), raw["snapshot_id"],
+                                   self._version, self._clock())
+            return self._install(raw)
+
+    def _install(self, raw: dict) -> MarketEntry:
+        symbol = raw["symbol"]
+        current = self._entries.get(symbol)
+        # Never let an older snapshot replace a newer one
+        if current is not None and raw["snapshot_id"] < current.snapshot_id:
+            return current
+        row = _convert(raw, self.watermark)
+        # Re-polled but unchanged: keep the version stable
+        if current is not None and raw["snapshot_id"] == current.snapshot_id and row == current.row:
+            return current
+        self._version += 1
+        entry = MarketEntry(row, raw["snapshot_id"], self._version, self._clock())
+        self._entries[symbol] = entry
+        return entry
+
+    def _advance(self, raw: dict) -> None:
+        # Only full loads and polls move the watermark: a single-symbol load
+        # must not skip rows of other symbols the poll has not seen yet
+        mark = raw[self.watermark]
+        if self._high_water is None or mark > self._high_water:
+            self._high_water = mark
+
+    def invalidate(self, symbol: str) -> None:
+        """Drop one symbol (its snapshot row was updated in place)"""
+        with self._lock:
+            self._epoch += 1
+            if self._entries.pop(symbol, None) is not None:
+                self.invalidations += 1
+
+    def load_all(self) -> int:
+        """Replace the cache with the latest snapshot of every symbol"""
+        rows = list(self._fetch_all_latest())
+        with self._lock:
+            self._entries = {}
+            self._high_water = None
+            for raw in rows:
+                self._install(raw)
+                self._advance(raw)
+            self._verified_at = self._clock()
+        return len(rows)
+
+    def refresh(self) -> int:
+        """Install rows changed since the last poll; returns how many came back"""
+        with self._lock:
+            since = self._high_water
+        if since is None:
+            return self.load_all()
+        started = self._clock()
+        rows = list(self._fetch_since(since))
+        with self._lock:
+            for raw in rows:
+                self._install(raw)
+                self._advance(raw)
+            self._verified_at = started
+            self.refreshes += 1
+        return len(rows)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "symbols": len(self._entries),
+            "version": self._version,
+            "watermark": self.watermark,
+            "high_water": str(self._high_water) if self._high_water is not None else None,
+            "max_age_s": self.max_age,
+            "last_verified_age_s": (round(self._clock() - self._verified_at, 2)
+                                    if self._verified_at > float("-inf") else None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_reloads": self.stale_reloads,
+            "invalidations": self.invalidations,
+            "refreshes": self.refreshes,
+        }
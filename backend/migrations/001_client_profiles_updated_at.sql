@@ -0,0 +1,11 @@
+-- ========================================
+-- 001: client_profiles.updated_at
+-- ========================================
+-- Lets the in-memory client registry detect changes with one cheap
+-- version query (COUNT(*), MAX(updated_at)) instead of re-reading the table.
+
+USE auo_hackathon;
+
+ALTER TABLE client_profiles
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
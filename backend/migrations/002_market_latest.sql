@@ -0,0 +1,52 @@
+-- ========================================
+-- 002: market_latest + (symbol, snapshot_id) index
+-- ========================================
+-- "Latest snapshot per symbol" used to sort every snapshot of the symbol,
+-- and the TTC slider rewrote every historical row. market_latest keeps one
+-- row per symbol, maintained by an insert trigger; reads and TTC updates
+-- touch only that row.
+
+USE auo_hackathon;
+
+ALTER TABLE market_data
+    ADD INDEX idx_symbol_snapshot (symbol, snapshot_id),
+    DROP INDEX idx_symbol;
+
+CREATE TABLE IF NOT EXISTS market_latest (
+    symbol VARCHAR(20) PRIMARY KEY,
+    snapshot_id INT NOT NULL,
+    snapshot_time DATETIME(6) NOT NULL,
+    time_to_close INT NOT NULL,
+    bid DECIMAL(18,4) NOT NULL,
+    ask DECIMAL(18,4) NOT NULL,
+    ltp DECIMAL(18,4) NOT NULL,
+    volatility_pct DECIMAL(8,4) NOT NULL,
+    avg_trade_size INT NOT NULL,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    INDEX idx_updated_at (updated_at)
+);
+
+DROP TRIGGER IF EXISTS trg_market_latest;
+
+CREATE TRIGGER trg_market_latest AFTER INSERT ON market_data
+FOR EACH ROW
+    INSERT INTO market_latest
+        (symbol, snapshot_id, snapshot_time, time_to_close, bid, ask, ltp, volatility_pct, avg_trade_size)
+    VALUES
+        (NEW.symbol, NEW.snapshot_id, NEW.snapshot_time, NEW.time_to_close, NEW.bid, NEW.ask,
+         NEW.ltp, NEW.volatility_pct, NEW.avg_trade_size)
+    ON DUPLICATE KEY UPDATE
+        snapshot_time = NEW.snapshot_time, time_to_close = NEW.time_to_close,
+        bid = NEW.bid, ask = NEW.ask, ltp = NEW.ltp,
+        volatility_pct = NEW.volatility_pct, avg_trade_size = NEW.avg_trade_size,
+        snapshot_id = NEW.snapshot_id;
+
+-- Backfill from existing snapshots (after the trigger, so nothing inserted
+-- in between is lost; REPLACE keeps whichever row is newest)
+REPLACE INTO market_latest
+    (symbol, snapshot_id, snapshot_time, time_to_close, bid, ask, ltp, volatility_pct, avg_trade_size)
+SELECT m.symbol, m.snapshot_id, m.snapshot_time, m.time_to_close, m.bid, m.ask,
+       m.ltp, m.volatility_pct, m.avg_trade_size
+FROM market_data m
+JOIN (SELECT symbol, MAX(snapshot_id) AS snapshot_id FROM market_data GROUP BY symbol) latest
+    USING (symbol, snapshot_id);
@@ -0,0 +1,14 @@
+-- ========================================
+-- 003: blotter indexes on order_data
+-- ========================================
+-- Serve /api/orders filters (client, symbol prefix, status) together with
+-- the arrival_time range and newest-first keyset paging on order_id.
+-- idx_cpty_arrival also covers the cpty_id foreign key.
+
+USE auo_hackathon;
+
+ALTER TABLE order_data
+    ADD INDEX idx_cpty_arrival (cpty_id, arrival_time),
+    ADD INDEX idx_symbol_arrival (symbol, arrival_time),
+    ADD INDEX idx_status_order (submission_status, order_id),
+    ALGORITHM=INPLACE, LOCK=NONE;
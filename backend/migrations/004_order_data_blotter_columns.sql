@@ -0,0 +1,33 @@
+-- ========================================
+-- 004: blotter columns on order_data
+-- ========================================
+-- urgency_score, urgency_class, executor, order_type and tif used to be
+-- pulled out of the JSON blobs for every listed row. They are now written
+-- at submit time as plain indexed columns (not generated columns, so they
+-- do not depend on the blob encoding). Existing rows are backfilled from
+-- submitted_params, falling back to prefill_result.
+
+USE auo_hackathon;
+
+ALTER TABLE order_data
+    ADD COLUMN urgency_score TINYINT UNSIGNED NULL,
+    ADD COLUMN urgency_class VARCHAR(10) NULL,
+    ADD COLUMN executor VARCHAR(20) NULL,
+    ADD COLUMN order_type VARCHAR(20) NULL,
+    ADD COLUMN tif VARCHAR(10) NULL;
+
+UPDATE order_data SET
+    urgency_score = CAST(COALESCE(
+        JSON_EXTRACT(submitted_params, '$.urgency_score'),
+        JSON_EXTRACT(prefill_result, '$.urgency_score')) AS UNSIGNED),
+    urgency_class = JSON_UNQUOTE(COALESCE(
+        JSON_EXTRACT(submitted_params, '$.urgency_classification'),
+        JSON_EXTRACT(prefill_result, '$.urgency_classification'))),
+    executor = JSON_UNQUOTE(JSON_EXTRACT(submitted_params, '$.executor.value')),
+    order_type = JSON_UNQUOTE(JSON_EXTRACT(submitted_params, '$.order_type.value')),
+    tif = JSON_UNQUOTE(JSON_EXTRACT(submitted_params, '$.tif.value'))
+WHERE submitted_params IS NOT NULL OR prefill_result IS NOT NULL;
+
+ALTER TABLE order_data
+    ADD INDEX idx_urgency_order (urgency_score, order_id),
+    ADD INDEX idx_urgency_class_order (urgency_class, order_id);
@@ -0,0 +1,17 @@
+-- ========================================
+-- 005: order ID sequence for write-behind submits
+-- ========================================
+-- With ORDER_WRITE_BEHIND=1 a submit is acknowledged with its order_id
+-- before the row reaches order_data, so IDs are reserved up front in
+-- blocks. The reservation takes GREATEST(next_id, MAX(order_id) + 1), so
+-- the sequence cannot fall behind rows written through AUTO_INCREMENT.
+
+USE auo_hackathon;
+
+CREATE TABLE order_id_seq (
+    name VARCHAR(30) PRIMARY KEY,
+    next_id INT NOT NULL
+);
+
+INSERT INTO order_id_seq (name, next_id)
+SELECT 'order_data', COALESCE(MAX(order_id), 0) + 1 FROM order_data;
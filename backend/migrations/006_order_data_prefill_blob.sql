@@ -0,0 +1,15 @@
+-- ========================================
+-- 006: compact prefill storage on order_data
+-- ========================================
+-- Submits stored the same prefilled_params JSON in both prefill_result and
+-- submitted_params. New rows store it once in prefill_blob, deflated with
+-- the preset dictionary in blob_codec.py, and the submitted params as a
+-- compressed diff in params_diff (NULL when unchanged). prefill_result and
+-- submitted_params stay NULL for those rows; existing rows keep their JSON
+-- columns and are read as before.
+
+USE auo_hackathon;
+
+ALTER TABLE order_data
+    ADD COLUMN prefill_blob BLOB NULL AFTER submitted_at,
+    ADD COLUMN params_diff BLOB NULL AFTER prefill_blob;
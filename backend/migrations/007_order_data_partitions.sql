@@ -0,0 +1,41 @@
+-- ========================================
+-- 007: daily partitions + archive tier for order_data
+-- ========================================
+-- order_data becomes RANGE-partitioned on TO_DAYS(arrival_time). MySQL
+-- requires the partition column in every unique key and does not support
+-- foreign keys on partitioned tables, so the primary key becomes
+-- (order_id, arrival_time) and the cpty_id foreign key is dropped (submits
+-- already validate cpty_id against the client registry).
+--
+-- Everything before today lands in p_history; the server's archive job
+-- (order_archive.py) splits daily partitions off pmax from there on and
+-- moves partitions older than ORDER_RETENTION_DAYS to order_data_archive.
+--
+-- Rebuilds order_data: run in a maintenance window.
+
+USE auo_hackathon;
+
+-- Default name of the unnamed FOREIGN KEY in schema.sql
+ALTER TABLE order_data DROP FOREIGN KEY order_data_ibfk_1;
+
+ALTER TABLE order_data
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (order_id, arrival_time);
+
+-- Created before partitioning so it starts out as a plain table
+CREATE TABLE order_data_archive LIKE order_data;
+ALTER TABLE order_data_archive ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+SET @ddl = CONCAT(
+    'ALTER TABLE order_data PARTITION BY RANGE (TO_DAYS(arrival_time)) (',
+    'PARTITION p_history VALUES LESS THAN (', TO_DAYS(CURDATE()), '), ',
+    'PARTITION pmax VALUES LESS THAN MAXVALUE)');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+CREATE TABLE order_archive_state (
+    name VARCHAR(30) PRIMARY KEY,
+    horizon DATE NULL
+);
+INSERT INTO order_archive_state (name, horizon) VALUES ('order_data', NULL);
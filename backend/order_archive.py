@@ -0,0 +1,156 @@
+"""
+order_archive.py
+================
+Daily partition maintenance and archival for order_data.
+
+order_data is RANGE-partitioned on TO_DAYS(arrival_time), one partition per
+day plus a MAXVALUE catch-all (pmax). run() keeps `days_ahead` empty daily
+partitions split off pmax, then moves every partition that ends on or
+before today - retention_days into order_data_archive (compressed, not
+partitioned) and drops it.
+
+The archive horizon, the day before which rows live only in the archive,
+is kept in order_archive_state. It moves after a partition is copied and
+before it is dropped, so a reader that splits a query at the horizon sees
+each order exactly once.
+
+Several server processes may run maintenance: run() takes the `lock`
+callable's context first (main.py uses a MySQL GET_LOCK) and only
+refreshes the horizon when another process holds it.
+"""
+
+from contextlib import nullcontext
+from datetime import date, timedelta
+from typing import Callable, ContextManager, List, NamedTuple, Optional
+
+
+PARTITIONS_SQL = (
+    "SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound "
+    "FROM INFORMATION_SCHEMA.PARTITIONS "
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'order_data' AND PARTITION_NAME IS NOT NULL "
+    "ORDER BY PARTITION_ORDINAL_POSITION"
+)
+HORIZON_SQL = "SELECT horizon FROM order_archive_state WHERE name = 'order_data'"
+SET_HORIZON_SQL = "UPDATE order_archive_state SET horizon = %s WHERE name = 'order_data'"
+
+
+class Partition(NamedTuple):
+    name: str
+    bound: Optional[date]      # exclusive upper bound; None for MAXVALUE
+
+
+def to_days(day: date) -> int:
+    """MySQL TO_DAYS()"""
+    return day.toordinal() + 365
+
+
+def from_days(n: int) -> date:
+    return date.fromordinal(n - 365)
+
+
+def _partition_name(day: date) -> str:
+    return "p" + day.strftime("%Y%m%d")
+
+
+class OrderArchiver:
+    """
+    fetchall(sql, args) -> rows
+    execute(sql, args)  -> None     DDL / writes, autocommit
+    lock()              -> context manager yielding True if this process
+                           may run a maintenance pass now
+
+    maintain=False only tracks the horizon (for server processes that never
+    run maintenance).
+    """
+
+    def __init__(self, fetchall: Callable, execute: Callable, retention_days: int = 90,
+                 days_ahead: int = 7, maintain: bool = True,
+                 today: Callable[[], date] = date.today,
+                 lock: Callable[[], ContextManager[bool]] = lambda: nullcontext(True)):
+        self._fetchall = fetchall
+        self._execute = execute
+        self._lock = lock
+        self.retention_days = retention_days
+        self.days_ahead = days_ahead
+        self.maintain = maintain
+        self._today = today
+        self.horizon: Optional[date] = None
+        self.partitions_added = 0
+        self.partitions_archived = 0
+        self.passes_skipped = 0
+
+    def partitions(self) -> List[Partition]:
+        out = []
+        for r in self._fetchall(PARTITIONS_SQL, None):
+            bound = None if r["bound"] == "MAXVALUE" else from_days(int(r["bound"]))
+            out.append(Partition(r["name"], bound))
+        return out
+
+    def load_horizon(self) -> Optional[date]:
+        rows = self._fetchall(HORIZON_SQL, None)
+        self.horizon = rows[0]["horizon"] if rows else None
+        return self.horizon
+
+    def ensure_partitions(self) -> int:
+        """Split daily partitions off pmax through today + days_ahead"""
+        parts = self.partitions()
+        if not parts or parts[-1].bound is not None:
+            return 0                     # not partitioned (yet), or no pmax
+        bounded = [p.bound for p in parts if p.bound is not None]
+        day = max(bounded) if bounded else self._today()
+        last = self._today() + timedelta(days=self.days_ahead)
+        new = []
+        while day <= last:
+            new.append(f"PARTITION {_partition_name(day)} "
+                       f"VALUES LESS THAN ({to_days(day + timedelta(days=1))})")
+            day += timedelta(days=1)
+        if not new:
+            return 0
+        self._execute(
+            f"ALTER TABLE order_data REORGANIZE PARTITION {parts[-1].name} INTO "
+            f"({', '.join(new)}, PARTITION {parts[-1].name} VALUES LESS THAN MAXVALUE)", None)
+        self.partitions_added += len(new)
+        return len(new)
+
+    def archive(self) -> int:
+        """Move partitions older than the retention window; returns how many"""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = self._today() - timedelta(days=self.retention_days)
+        moved = 0
+        for p in self.partitions():
+            if p.bound is None or p.bound > cutoff:
+                break
+            # INSERT IGNORE: a rerun after a crash mid-move is harmless
+            self._execute(f"INSERT IGNORE INTO order_data_archive "
+                          f"SELECT * FROM order_data PARTITION ({p.name})", None)
+            self._execute(SET_HORIZON_SQL, (p.bound,))
+            self.horizon = p.bound
+            self._execute(f"ALTER TABLE order_data DROP PARTITION {p.name}", None)
+            moved += 1
+        self.partitions_archived += moved
+        return moved
+
+    def run(self) -> int:
+        """One maintenance pass (or just a horizon refresh if not maintaining)"""
+        moved = 0
+        if self.maintain:
+            with self._lock() as held:
+                if held:
+                    self.ensure_partitions()
+                    moved = self.archive()
+                else:
+                    self.passes_skipped += 1
+        self.load_horizon()
+        return moved
+
+    def stats(self) -> dict:
+        return {
+            "horizon": self.horizon.isoformat() if self.horizon else None,
+            "retention_days": self.retention_days,
+            "days_ahead": self.days_ahead,
+            "maintain": self.maintain,
+            "partitions_added": self.partitions_added,
+            "partitions_archived": self.partitions_archived,
+            "passes_skipped": self.passes_skipped,
+        }
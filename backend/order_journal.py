@@ -0,0 +1,324 @@
+"""
+order_journal.py
+================
+Write-behind journal for order submits (ORDER_WRITE_BEHIND=1).
+
+A submit takes an order_id from an IdAllocator, appends the INSERT
+parameters to a local append-only journal and returns once the journal is
+fsynced. Concurrent submits share one fsync (group commit). A background
+writer drains the journal into order_data in multi-row INSERTs, one
+transaction per batch, then appends a "flushed" marker.
+
+On startup recover() replays every entry past the last marker. The writer
+inserts on the explicit order_id with ON DUPLICATE KEY UPDATE as a no-op,
+so replaying a batch that did reach the database before a crash is
+harmless.
+
+A batch failing with one of the `reject` errors (bad data rather than a
+database outage) is retried one entry at a time, and entries that still
+fail go to a dead-letter file (`<path>.rejected`) instead of blocking the
+journal. Any other error retries the whole batch.
+
+Journal lines are JSON: {"seq": n, "order_id": id, "params": [...]} for a
+submit and {"flushed": n} once every entry up to seq n is in the database.
+Binary parameters (the compressed prefill blobs) are written as
+{"$b64": "..."}. A torn final line left by a crash is ignored.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class JournalEntry(NamedTuple):
+    seq: int
+    order_id: int
+    params: Sequence
+
+
+def _encode_param(value):
+    # Compressed blobs as base64; datetimes become 'YYYY-MM-DD HH:MM:SS[.ffffff]',
+    # which MySQL accepts as is
+    if isinstance(value, bytes):
+        return {"$b64": base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+
+def _decode_param(value):
+    if isinstance(value, dict) and "$b64" in value:
+        return base64.b64decode(value["$b64"])
+    return value
+
+
+def _entry_line(entry: JournalEntry) -> str:
+    return json.dumps({"seq": entry.seq, "order_id": entry.order_id, "params": list(entry.params)},
+                      default=_encode_param, separators=(",", ":")) + "\n"
+
+
+class IdAllocator:
+    """
+    Hands out order IDs from blocks reserved in the database, so IDs are
+    known before the row is written and never reused across restarts.
+
+    reserve(n) -> first id of a freshly reserved block of n consecutive ids
+    """
+
+    def __init__(self, reserve: Callable[[int], int], block_size: int = 1000):
+        self._reserve = reserve
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0              # exclusive
+        self.blocks = 0
+
+    def next_id(self) -> int:
+        return self.next_ids(1)[0]
+
+    def next_ids(self, n: int) -> List[int]:
+        """n ascending ids; consecutive unless they straddle two blocks"""
+        ids = []
+        with self._lock:
+            while len(ids) < n:
+                if self._next >= self._end:
+                    self._next = self._reserve(self.block_size)
+                    self._end = self._next + self.block_size
+                    self.blocks += 1
+                take = min(n - len(ids), self._end - self._next)
+                ids.extend(range(self._next, self._next + take))
+                self._next += take
+        return ids
+
+
+class OrderJournal:
+    """
+    flush(entries) writes the entries to order_data in one transaction and
+    raises if it did not commit; failed batches are retried. Entries whose
+    own flush raises one of `reject` are dead-lettered instead.
+    """
+
+    def __init__(self, path: str, flush: Callable[[List[JournalEntry]], None],
+                 batch_size: int = 500, flush_interval: float = 0.05,
+                 compact_bytes: int = 16 * 1024 * 1024,
+                 reject: Tuple[type, ...] = ()):
+        self.path = path
+        self.rejected_path = path + ".rejected"
+        self._flush = flush
+        self.reject = reject
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+
+        self._lock = threading.Lock()                # file writes + queue
+        self._sync_lock = threading.Lock()           # one fsync at a time
+        self._wake = threading.Condition(self._lock)
+        self._queue: Deque[JournalEntry] = deque()
+        self._file = None
+        self._seq = 0
+        self._written = 0          # highest seq written to the file
+        self._synced = 0           # highest seq known to be on disk
+        self._flushing: List[JournalEntry] = []   # taken by the writer, not yet flushed
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.appended = 0
+        self.fsyncs = 0
+        self.flushed = 0
+        self.batches = 0
+        self.replayed = 0
+        self.flush_errors = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    # ---------- lifecycle ----------
+
+    def recover(self) -> int:
+        """Queue entries the writer never flushed; returns how many"""
+        entries, last_flushed = [], 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break              # torn tail from a crash mid-append
+                    if "flushed" in rec:
+                        last_flushed = max(last_flushed, rec["flushed"])
+                    else:
+                        entries.append(JournalEntry(rec["seq"], rec["order_id"],
+                                                    [_decode_param(p) for p in rec["params"]]))
+        pending = [e for e in entries if e.seq > last_flushed]
+        with self._lock:
+            self._seq = max([last_flushed] + [e.seq for e in entries])
+            self._written = self._synced = self._seq
+            self._queue.extend(pending)
+            self._rewrite(pending)
+        self.replayed += len(pending)
+        return len(pending)
+
+    def start(self) -> None:
+        if self._file is None:
+            self.recover()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="order-journal", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after draining what is queued (best effort)"""
+        self._stop.set()
+        with self._lock:
+            self._wake.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---------- submit path ----------
+
+    def append(self, order_id: int, params: Sequence) -> None:
+        """Durably journal one submit; returns after fsync"""
+        self.append_many([(order_id, params)])
+
+    def append_many(self, orders: Sequence[Tuple[int, Sequence]]) -> None:
+        """Journal (order_id, params) pairs with a single write and fsync"""
+        with self._lock:
+            entries = [JournalEntry(self._seq + i, order_id, params)
+                       for i, (order_id, params) in enumerate(orders, 1)]
+            self._file.write("".join(_entry_line(e) for e in entries))
+            self._seq += len(entries)
+            seq = self._written = self._seq
+            self._queue.extend(entries)
+            self.appended += len(entries)
+        self._sync(seq)
+        with self._lock:
+            self._wake.notify()
+
+    def holds(self, order_id: int) -> bool:
+        """True while an acknowledged order is not yet in the database"""
+        with self._lock:
+            return any(e.order_id == order_id for e in (*self._flushing, *self._queue))
+
+    def _sync(self, seq: int) -> None:
+        # Group commit: whoever holds the sync lock fsyncs everything written
+        # so far, and callers whose entry it covered return without another
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._lock:
+                target = self._written
+                self._file.flush()
+                fd = self._file.fileno()
+            os.fsync(fd)
+            self._synced = target
+            self.fsyncs += 1
+
+    # ---------- writer ----------
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queue:
+                    if self._stop.is_set():
+                        return
+                    self._wake.wait(self.flush_interval)
+                    continue
+                # Only flush entries that are already durable in the journal
+                batch = []
+                while self._queue and len(batch) < self.batch_size and self._queue[0].seq <= self._synced:
+                    batch.append(self._queue.popleft())
+                self._flushing = batch
+            if not batch:
+                time.sleep(0.001)
+                continue
+            done, e = self._flush_batch(batch)
+            if e is not None:
+                # Requeue what did not make it; the rest is in the database
+                with self._lock:
+                    self._queue.extendleft(reversed(batch[done:]))
+                    self._flushing = []
+                self.flush_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                if done:
+                    self._mark_flushed(batch[done - 1].seq)
+                    self.flushed += done
+                if self._stop.wait(self.flush_interval):
+                    return             # leave the rest to recover() on next start
+                continue
+            self._mark_flushed(batch[-1].seq)
+            self.flushed += len(batch)
+            self.batches += 1
+
+    def _flush_batch(self, batch: List[JournalEntry]) -> Tuple[int, Optional[Exception]]:
+        """(entries written or dead-lettered, error that stopped the rest)"""
+        try:
+            self._flush(batch)
+            return len(batch), None
+        except self.reject:
+            pass
+        except Exception as e:
+            return 0, e
+        # Some row is bad: write them one by one to find it
+        for i, entry in enumerate(batch):
+            try:
+                self._flush([entry])
+            except self.reject as e:
+                self._dead_letter(entry, e)
+            except Exception as e:
+                return i, e
+        return len(batch), None
+
+    def _dead_letter(self, entry: JournalEntry, error: Exception) -> None:
+        line = json.loads(_entry_line(entry))
+        line["error"] = f"{type(error).__name__}: {error}"
+        with open(self.rejected_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected += 1
+        self.last_error = line["error"]
+
+    def _mark_flushed(self, seq: int) -> None:
+        with self._lock:
+            self._flushing = []
+            self._file.write(json.dumps({"flushed": seq}) + "\n")
+            self._file.flush()
+            # Nothing outstanding: start the journal over so it stays small
+            if (not self._queue and self._written == self._synced
+                    and self._file.tell() >= self.compact_bytes):
+                self._rewrite([])
+
+    def _rewrite(self, pending: List[JournalEntry]) -> None:
+        """Replace the journal with just `pending` (caller holds _lock)"""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"flushed": pending[0].seq - 1 if pending else self._seq}) + "\n")
+            for e in pending:
+                f.write(_entry_line(e))
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "pending": len(self._queue) + len(self._flushing),
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "entries_per_fsync": round(self.appended / self.fsyncs, 2) if self.fsyncs else 0.0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "replayed": self.replayed,
+            "flush_errors": self.flush_errors,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
@@ -2,25 +2,128 @@
 order_parser.py
 ===============
 Advanced order intent parser for extracting structured data from trader notes.
+
+Bulk backfills can run the parser as a CLI (one note per input line,
+one NDJSON intent per output line):
+
+    python order_parser.py notes.txt --workers 8 > intents.ndjson
+    cat notes.txt | python order_parser.py - --chunksize 1000
 """
 
+import argparse
+import json
+import os
 import re
-from typing import Dict, Optional, List
-from dataclasses import dataclass
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum, IntFlag
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, Iterator, NamedTuple, Optional, List, Set, Tuple
+
+
+class Urgency(IntEnum):
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+    CRITICAL = 3
+
+
+class Algo(IntEnum):
+    VWAP = 1
+    TWAP = 2
+    POV = 3
+    ICEBERG = 4
+
+
+class ExecutionStyle(IntEnum):
+    PASSIVE = 0
+    NEUTRAL = 1
+    AGGRESSIVE = 2
+
+
+class Session(IntEnum):
+    CAS = 1
+    OPENING = 2
+    CLOSING = 3
+
 
+class PriceSensitivity(IntEnum):
+    MINIMIZE_IMPACT = 0
+    STANDARD = 1
+    URGENT_FILL = 2
 
-@dataclass
-class OrderIntent:
-    """Structured representation of parsed order intent"""
-    urgency_level: str  # LOW, MEDIUM, HIGH, CRITICAL
-    algo_strategy: Optional[str]  # VWAP, TWAP, POV, ICEBERG, None
-    execution_style: str  # PASSIVE, NEUTRAL, AGGRESSIVE
-    session_target: Optional[str]  # CAS, OPENING, CLOSING, None
+
+class Instruction(IntFlag):
+    """Explicit trader instruction tags (same order as INSTRUCTION_PATTERNS)"""
+    NO_CROSS_SPREAD = 1
+    LIMIT_ONLY = 2
+    NO_MARKET = 4
+    BENCHMARK = 8
+    WORK_ORDER = 16
+    PARTICIPATE = 32
+    DISCRETION = 64
+
+
+def _name(value) -> Optional[str]:
+    return None if value is None else value.name
+
+
+class OrderIntent(NamedTuple):
+    """
+    Structured representation of parsed order intent.
+    
+    A plain tuple: immutable, no per-instance __dict__, safe to share and
+    cache. Categorical fields are small int enums and explicit instructions
+    a bitmask; as_dict() converts to the string/list shape for responses.
+    """
+    urgency_level: Urgency
+    algo_strategy: Optional[Algo]
+    execution_style: ExecutionStyle
+    session_target: Optional[Session]
     deadline_time: Optional[str]  # HH:MM format
     must_complete: bool
-    price_sensitivity: str  # MINIMIZE_IMPACT, STANDARD, URGENT_FILL
-    explicit_instructions: List[str]
+    price_sensitivity: PriceSensitivity
+    instructions: Instruction
     confidence_score: float  # 0.0 to 1.0
+    
+    @property
+    def explicit_instructions(self) -> Tuple[str, ...]:
+        return tuple(tag.name for tag in Instruction if tag & self.instructions)
+    
+    def as_dict(self) -> dict:
+        """Response-boundary view with enum names and a list of instruction tags"""
+        return {
+            'urgency_level': self.urgency_level.name,
+            'algo_strategy': _name(self.algo_strategy),
+            'execution_style': self.execution_style.name,
+            'session_target': _name(self.session_target),
+            'deadline_time': self.deadline_time,
+            'must_complete': self.must_complete,
+            'price_sensitivity': self.price_sensitivity.name,
+            'explicit_instructions': list(self.explicit_instructions),
+            'confidence_score': self.confidence_score,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'OrderIntent':
+        """Inverse of as_dict() (also accepts legacy dataclass fields)"""
+        mask = 0
+        for tag in data.get('explicit_instructions') or ():
+            mask |= Instruction[tag]
+        algo = data.get('algo_strategy')
+        session = data.get('session_target')
+        return cls(
+            urgency_level=Urgency[data['urgency_level']],
+            algo_strategy=Algo[algo] if algo else None,
+            execution_style=ExecutionStyle[data['execution_style']],
+            session_target=Session[session] if session else None,
+            deadline_time=data.get('deadline_time'),
+            must_complete=bool(data.get('must_complete')),
+            price_sensitivity=PriceSensitivity[data['price_sensitivity']],
+            instructions=Instruction(mask),
+            confidence_score=data['confidence_score'],
+        )
 
 
 class OrderIntentParser:
@@ -87,89 +190,131 @@ class OrderIntentParser:
         r'\bno\s*special\s*instructions\b', r'\bregular\b'
     ]
     
+    # Minimize/avoid impact phrasing (drives ICEBERG and MINIMIZE_IMPACT)
+    IMPACT_PATTERNS = [r'\b(minimize|avoid)\s*(market\s*)?impact\b']
+    
+    # Urgent wording that maps to URGENT_FILL price sensitivity
+    URGENT_FILL_PATTERNS = [r'\b(urgent|asap|immediate|critical)\b']
+    
+    # Explicit trader instructions, emitted as tags in this order
+    INSTRUCTION_PATTERNS = {
+        'NO_CROSS_SPREAD': [r'\bdo\s*not\s*cross\b'],
+        'LIMIT_ONLY': [r'\blimit\s*only\b'],
+        'NO_MARKET': [r'\bno\s*market\s*orders?\b'],
+        'BENCHMARK': [r'\bbenchmark\b'],
+        'WORK_ORDER': [r'\bwork\s*(the\s*)?order\b'],
+        'PARTICIPATE': [r'\bparticipate\b'],
+        'DISCRETION': [r'\buse\s*discretion\b']
+    }
+    
+    # Deadline extraction needs capture groups, so it stays outside the matcher
+    DEADLINE_AMPM = re.compile(r'by\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)')
+    DEADLINE_24H = re.compile(r'(?:by|until)\s*(\d{1,2}):(\d{2})')
+    
+    # Pattern tables the matcher is compiled from; frozen on compile so they
+    # can only be changed by rebinding, which pattern_version() detects
+    TABLE_NAMES = (
+        'URGENCY_PATTERNS', 'ALGO_PATTERNS', 'EXECUTION_STYLE_PATTERNS',
+        'SESSION_PATTERNS', 'COMPLETION_PATTERNS', 'NEUTRAL_PATTERNS',
+        'IMPACT_PATTERNS', 'URGENT_FILL_PATTERNS', 'INSTRUCTION_PATTERNS'
+    )
+    
+    # Compiled single-pass matcher, built once at import (see _compile_matcher)
+    _MATCHER = None
+    _COMPILED_FROM: tuple = ()
+    _PATTERN_VERSION = 0
+    _PROBES: Dict[str, tuple] = {}
+    _DEFAULT_PROBE: tuple = ()
+    
     @classmethod
     def parse(cls, notes: str) -> OrderIntent:
         """
         Main parsing method - extracts all dimensions from notes
         """
         if not notes:
-            return cls._create_default_intent()
+            return DEFAULT_INTENT
         
+        cls.pattern_version()
         notes_lower = notes.lower().strip()
         
+        # One left-to-right scan finds every category hit in the note
+        hits = cls._scan(notes_lower)
+        
         # Check if it's a neutral/standard order first
-        is_standard = cls._match_any_pattern(notes_lower, cls.NEUTRAL_PATTERNS)
+        is_standard = ('NEUTRAL',) in hits
+        session_target = cls._extract_session_target(hits)
         
         return OrderIntent(
-            urgency_level=cls._extract_urgency(notes_lower, is_standard),
-            algo_strategy=cls._extract_algo(notes_lower, is_standard),
-            execution_style=cls._extract_execution_style(notes_lower, is_standard),
-            session_target=cls._extract_session_target(notes_lower),
+            urgency_level=cls._extract_urgency(hits, is_standard),
+            algo_strategy=cls._extract_algo(hits, is_standard),
+            execution_style=cls._extract_execution_style(hits, is_standard),
+            session_target=session_target,
             deadline_time=cls._extract_deadline(notes_lower),
-            must_complete=cls._extract_must_complete(notes_lower),
-            price_sensitivity=cls._extract_price_sensitivity(notes_lower, is_standard),
-            explicit_instructions=cls._extract_explicit_instructions(notes_lower),
-            confidence_score=cls._calculate_confidence(notes_lower, is_standard)
+            must_complete=cls._extract_must_complete(hits),
+            price_sensitivity=cls._extract_price_sensitivity(hits, is_standard),
+            instructions=cls._extract_explicit_instructions(hits),
+            confidence_score=cls._calculate_confidence(notes_lower, hits, is_standard,
+                                                       session_target)
         )
     
     @classmethod
-    def _extract_urgency(cls, notes: str, is_standard: bool) -> str:
+    def _extract_urgency(cls, hits: Set[tuple], is_standard: bool) -> Urgency:
         """Extract urgency level with conflict resolution"""
         if is_standard:
-            return 'MEDIUM'
+            return Urgency.MEDIUM
         
         # Check from highest to lowest priority
         for level in ['CRITICAL', 'HIGH', 'LOW']:
-            if cls._match_any_pattern(notes, cls.URGENCY_PATTERNS.get(level, [])):
-                return level
+            if ('URGENCY', level) in hits:
+                return Urgency[level]
         
-        return 'MEDIUM'
+        return Urgency.MEDIUM
     
     @classmethod
-    def _extract_algo(cls, notes: str, is_standard: bool) -> Optional[str]:
+    def _extract_algo(cls, hits: Set[tuple], is_standard: bool) -> Optional[Algo]:
         """Extract algo strategy"""
         if is_standard:
             return None
         
         # First check for minimize/avoid impact (maps to ICEBERG)
-        if re.search(r'\b(minimize|avoid)\s*(market\s*)?impact\b', notes):
+        if ('IMPACT',) in hits:
             # Unless VWAP is explicitly mentioned
-            if not cls._match_any_pattern(notes, cls.ALGO_PATTERNS['VWAP']):
-                return 'ICEBERG'
+            if ('ALGO', 'VWAP') not in hits:
+                return Algo.ICEBERG
         
         # Check explicit algo mentions
-        for algo, patterns in cls.ALGO_PATTERNS.items():
-            if cls._match_any_pattern(notes, patterns):
-                return algo
+        for algo in cls.ALGO_PATTERNS:
+            if ('ALGO', algo) in hits:
+                return Algo[algo]
         
         return None
     
     @classmethod
-    def _extract_execution_style(cls, notes: str, is_standard: bool) -> str:
+    def _extract_execution_style(cls, hits: Set[tuple], is_standard: bool) -> ExecutionStyle:
         """Extract execution style"""
         if is_standard:
-            return 'NEUTRAL'
+            return ExecutionStyle.NEUTRAL
         
-        if cls._match_any_pattern(notes, cls.EXECUTION_STYLE_PATTERNS['PASSIVE']):
-            return 'PASSIVE'
-        elif cls._match_any_pattern(notes, cls.EXECUTION_STYLE_PATTERNS['AGGRESSIVE']):
-            return 'AGGRESSIVE'
+        if ('STYLE', 'PASSIVE') in hits:
+            return ExecutionStyle.PASSIVE
+        elif ('STYLE', 'AGGRESSIVE') in hits:
+            return ExecutionStyle.AGGRESSIVE
         
-        return 'NEUTRAL'
+        return ExecutionStyle.NEUTRAL
     
     @classmethod
-    def _extract_session_target(cls, notes: str) -> Optional[str]:
+    def _extract_session_target(cls, hits: Set[tuple]) -> Optional[Session]:
         """Extract session target"""
-        for session, patterns in cls.SESSION_PATTERNS.items():
-            if cls._match_any_pattern(notes, patterns):
-                return session
+        for session in cls.SESSION_PATTERNS:
+            if ('SESSION', session) in hits:
+                return Session[session]
         return None
     
     @classmethod
     def _extract_deadline(cls, notes: str) -> Optional[str]:
         """Extract deadline time from patterns like 'by 2 pm', 'vwap by 14:00'"""
         # Pattern 1: "by X pm/am"
-        match = re.search(r'by\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)', notes)
+        match = cls.DEADLINE_AMPM.search(notes)
         if match:
             hour = int(match.group(1))
             minute = match.group(2) or '00'
@@ -183,7 +328,7 @@ class OrderIntentParser:
             return f"{hour:02d}:{minute}"
         
         # Pattern 2: "by HH:MM" or "until HH:MM"
-        match = re.search(r'(?:by|until)\s*(\d{1,2}):(\d{2})', notes)
+        match = cls.DEADLINE_24H.search(notes)
         if match:
             hour = int(match.group(1))
             minute = match.group(2)
@@ -192,47 +337,35 @@ class OrderIntentParser:
         return None
     
     @classmethod
-    def _extract_must_complete(cls, notes: str) -> bool:
+    def _extract_must_complete(cls, hits: Set[tuple]) -> bool:
         """Check if order must be completed"""
-        return cls._match_any_pattern(notes, cls.COMPLETION_PATTERNS)
+        return ('COMPLETION',) in hits
     
     @classmethod
-    def _extract_price_sensitivity(cls, notes: str, is_standard: bool) -> str:
+    def _extract_price_sensitivity(cls, hits: Set[tuple], is_standard: bool) -> PriceSensitivity:
         """Determine price sensitivity level"""
         if is_standard:
-            return 'STANDARD'
+            return PriceSensitivity.STANDARD
         
-        if re.search(r'\b(minimize|avoid)\s*(market\s*)?impact\b', notes):
-            return 'MINIMIZE_IMPACT'
-        elif re.search(r'\b(urgent|asap|immediate|critical)\b', notes):
-            return 'URGENT_FILL'
+        if ('IMPACT',) in hits:
+            return PriceSensitivity.MINIMIZE_IMPACT
+        elif ('URGENT_FILL',) in hits:
+            return PriceSensitivity.URGENT_FILL
         
-        return 'STANDARD'
+        return PriceSensitivity.STANDARD
     
     @classmethod
-    def _extract_explicit_instructions(cls, notes: str) -> List[str]:
-        """Extract explicit trader instructions as tags"""
-        instructions = []
-        
-        # Check for common explicit instructions
-        patterns = {
-            'NO_CROSS_SPREAD': r'\bdo\s*not\s*cross\b',
-            'LIMIT_ONLY': r'\blimit\s*only\b',
-            'NO_MARKET': r'\bno\s*market\s*orders?\b',
-            'BENCHMARK': r'\bbenchmark\b',
-            'WORK_ORDER': r'\bwork\s*(the\s*)?order\b',
-            'PARTICIPATE': r'\bparticipate\b',
-            'DISCRETION': r'\buse\s*discretion\b'
-        }
-        
-        for tag, pattern in patterns.items():
-            if re.search(pattern, notes):
-                instructions.append(tag)
-        
-        return instructions
+    def _extract_explicit_instructions(cls, hits: Set[tuple]) -> Instruction:
+        """Extract explicit trader instructions as a bitmask of tags"""
+        mask = 0
+        for tag in cls.INSTRUCTION_PATTERNS:
+            if ('INSTRUCTION', tag) in hits:
+                mask |= Instruction[tag]
+        return Instruction(mask)
     
     @classmethod
-    def _calculate_confidence(cls, notes: str, is_standard: bool) -> float:
+    def _calculate_confidence(cls, notes: str, hits: Set[tuple], is_standard: bool,
+                              session_target: Optional[str]) -> float:
         """
         Calculate confidence score based on clarity of instructions
         """
@@ -245,42 +378,256 @@ class OrderIntentParser:
         confidence = 0.5  # Base confidence
         
         # Boost for explicit algo mentions
-        if cls._match_any_pattern(notes, 
-            cls.ALGO_PATTERNS['VWAP'] + cls.ALGO_PATTERNS['TWAP']):
+        if ('ALGO', 'VWAP') in hits or ('ALGO', 'TWAP') in hits:
             confidence += 0.2
         
         # Boost for clear urgency
-        if cls._match_any_pattern(notes, 
-            cls.URGENCY_PATTERNS['CRITICAL'] + cls.URGENCY_PATTERNS['HIGH']):
+        if ('URGENCY', 'CRITICAL') in hits or ('URGENCY', 'HIGH') in hits:
             confidence += 0.15
         
         # Boost for session targets
-        if cls._extract_session_target(notes):
+        if session_target:
             confidence += 0.15
         
         # Reduce for conflicting signals
-        if (cls._match_any_pattern(notes, cls.URGENCY_PATTERNS['CRITICAL']) and
-            cls._match_any_pattern(notes, cls.URGENCY_PATTERNS['LOW'])):
+        if ('URGENCY', 'CRITICAL') in hits and ('URGENCY', 'LOW') in hits:
             confidence -= 0.2
         
         return min(max(confidence, 0.0), 1.0)
     
     @classmethod
-    def _match_any_pattern(cls, text: str, patterns: List[str]) -> bool:
-        """Check if text matches any of the regex patterns"""
-        return any(re.search(pattern, text) for pattern in patterns)
+    def pattern_version(cls) -> int:
+        """
+        Version of the pattern tables currently compiled into the matcher.
+        
+        Rebinding any table (e.g. OrderIntentParser.ALGO_PATTERNS = {...})
+        recompiles the matcher and bumps the version, so callers caching
+        parse results can key on it.
+        """
+        current = tuple(getattr(cls, name) for name in cls.TABLE_NAMES)
+        if any(a is not b for a, b in zip(current, cls._COMPILED_FROM)):
+            cls._compile_matcher()
+        return cls._PATTERN_VERSION
+    
+    @classmethod
+    def _freeze_tables(cls) -> None:
+        """Replace every pattern table with a read-only copy"""
+        for name in cls.TABLE_NAMES:
+            table = getattr(cls, name)
+            if isinstance(table, (dict, MappingProxyType)):
+                frozen = MappingProxyType({key: tuple(patterns) for key, patterns in table.items()})
+            else:
+                frozen = tuple(table)
+            setattr(cls, name, frozen)
+        cls._COMPILED_FROM = tuple(getattr(cls, name) for name in cls.TABLE_NAMES)
+    
+    @classmethod
+    def _pattern_table(cls) -> Dict[str, List[Tuple[str, ...]]]:
+        """Map every distinct pattern to the category tags it signals"""
+        table: Dict[str, List[Tuple[str, ...]]] = {}
+        
+        def add(patterns, tag):
+            for pattern in patterns:
+                table.setdefault(pattern, []).append(tag)
+        
+        # Every table key must have an enum member to decode into
+        keyed_tables = (
+            (Urgency, cls.URGENCY_PATTERNS), (Algo, cls.ALGO_PATTERNS),
+            (ExecutionStyle, cls.EXECUTION_STYLE_PATTERNS),
+            (Session, cls.SESSION_PATTERNS), (Instruction, cls.INSTRUCTION_PATTERNS)
+        )
+        for enum, keyed in keyed_tables:
+            unknown = set(keyed) - set(enum.__members__)
+            if unknown:
+                raise ValueError(f"{enum.__name__} has no member for {sorted(unknown)}")
+        
+        for level, patterns in cls.URGENCY_PATTERNS.items():
+            add(patterns, ('URGENCY', level))
+        for algo, patterns in cls.ALGO_PATTERNS.items():
+            add(patterns, ('ALGO', algo))
+        for style, patterns in cls.EXECUTION_STYLE_PATTERNS.items():
+            add(patterns, ('STYLE', style))
+        for session, patterns in cls.SESSION_PATTERNS.items():
+            add(patterns, ('SESSION', session))
+        for tag, patterns in cls.INSTRUCTION_PATTERNS.items():
+            add(patterns, ('INSTRUCTION', tag))
+        add(cls.COMPLETION_PATTERNS, ('COMPLETION',))
+        add(cls.NEUTRAL_PATTERNS, ('NEUTRAL',))
+        add(cls.IMPACT_PATTERNS, ('IMPACT',))
+        add(cls.URGENT_FILL_PATTERNS, ('URGENT_FILL',))
+        return table
+    
+    @classmethod
+    def _compile_matcher(cls) -> None:
+        """
+        Combine every pattern category into one compiled matcher.
+        
+        A single trigger regex (one alternation of every pattern, wrapped in
+        a lookahead) walks the note left to right and stops only where at
+        least one pattern starts. At each stop, a probe regex holding the
+        patterns that can begin with that character tests each of them with
+        an optional lookahead, so overlapping hits (e.g. "no rush" and
+        "rush") are all reported, exactly as separate re.search calls would.
+        """
+        cls._freeze_tables()
+        table = cls._pattern_table()
+        
+        by_char: Dict[str, List[str]] = {}
+        anywhere: List[str] = []
+        for pattern in table:
+            chars = cls._first_chars(pattern)
+            if chars is None:
+                anywhere.append(pattern)
+                continue
+            for char in chars:
+                by_char.setdefault(char, []).append(pattern)
+        
+        def probe(patterns):
+            patterns = patterns + anywhere
+            body = ''.join(f'(?=(?P<p{i}>{p}))?' for i, p in enumerate(patterns))
+            compiled = re.compile(body)
+            # (index into match.groups(), tags) for each probe group
+            slots = tuple((compiled.groupindex[f'p{i}'] - 1, tuple(table[p]))
+                          for i, p in enumerate(patterns))
+            return compiled, slots
+        
+        any_pattern = '|'.join(f'(?:{pattern})' for pattern in table)
+        cls._MATCHER = re.compile(f'(?=(?:{any_pattern}))')
+        cls._PROBES = {char: probe(patterns) for char, patterns in by_char.items()}
+        cls._DEFAULT_PROBE = probe([])
+        cls._PATTERN_VERSION += 1
+    
+    @staticmethod
+    def _first_chars(pattern: str) -> Optional[FrozenSet[str]]:
+        """
+        Characters a pattern can start matching on, or None if unknown.
+        
+        Understands the shapes used in the tables: a leading \\b followed by
+        either a literal word or a group of literal alternatives.
+        """
+        body = pattern[2:] if pattern.startswith(r'\b') else pattern
+        if body[:1].isalnum():
+            return frozenset(body[0])
+        if body.startswith('('):
+            group = body[1:body.find(')')]
+            if group.startswith('?:'):
+                group = group[2:]
+            options = group.split('|')
+            if all(option[:1].isalnum() for option in options):
+                return frozenset(option[0] for option in options)
+        return None
+    
+    @classmethod
+    def _scan(cls, text: str) -> Set[tuple]:
+        """Single pass over text returning the set of category tags hit"""
+        probes = cls._PROBES
+        default = cls._DEFAULT_PROBE
+        hits = set()
+        for trigger in cls._MATCHER.finditer(text):
+            pos = trigger.start()
+            probe, slots = probes.get(text[pos], default)
+            groups = probe.match(text, pos).groups()
+            for index, tags in slots:
+                if groups[index] is not None:
+                    hits.update(tags)
+        return hits
     
     @classmethod
     def _create_default_intent(cls) -> OrderIntent:
-        """Create default intent for empty notes"""
-        return OrderIntent(
-            urgency_level='MEDIUM',
-            algo_strategy=None,
-            execution_style='NEUTRAL',
-            session_target=None,
-            deadline_time=None,
-            must_complete=False,
-            price_sensitivity='STANDARD',
-            explicit_instructions=[],
-            confidence_score=0.5
-        )
\ No newline at end of file
+        """Default intent for empty notes (one shared instance)"""
+        return DEFAULT_INTENT
+
+
+# Canonical intent for empty notes; every empty parse returns this instance
+DEFAULT_INTENT = OrderIntent(
+    urgency_level=Urgency.MEDIUM,
+    algo_strategy=None,
+    execution_style=ExecutionStyle.NEUTRAL,
+    session_target=None,
+    deadline_time=None,
+    must_complete=False,
+    price_sensitivity=PriceSensitivity.STANDARD,
+    instructions=Instruction(0),
+    confidence_score=0.5
+)
+
+OrderIntentParser._compile_matcher()
+
+
+# ============================================================
+# BULK PARSING
+# ============================================================
+
+def _parse_chunk(chunk: List[str]) -> List[OrderIntent]:
+    """Worker entry point: parse one chunk of notes"""
+    return [OrderIntentParser.parse(notes) for notes in chunk]
+
+
+def _chunks(notes: Iterable[str], chunksize: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in notes:
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_many(notes: Iterable[str], workers: Optional[int] = None,
+               chunksize: int = 256) -> Iterator[OrderIntent]:
+    """
+    Parse an iterable of notes, yielding intents in input order.
+    
+    Chunks of `chunksize` notes are fanned out to a pool of `workers`
+    processes (default: every core). Only a bounded window of chunks is in
+    flight at a time, so arbitrarily long inputs stream through in constant
+    memory. workers=1 parses in-process.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be >= 1")
+    workers = workers or os.cpu_count() or 1
+    
+    if workers == 1:
+        for chunk in _chunks(notes, chunksize):
+            yield from _parse_chunk(chunk)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(notes, chunksize):
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """CLI: read notes (one per line) and write NDJSON intents in the same order"""
+    ap = argparse.ArgumentParser(description="Parse trader notes into NDJSON order intents")
+    ap.add_argument("input", nargs="?", default="-",
+                    help="file with one note per line ('-' for stdin)")
+    ap.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    ap.add_argument("-w", "--workers", type=int, default=None,
+                    help="worker processes (default: all cores)")
+    ap.add_argument("-c", "--chunksize", type=int, default=256,
+                    help="notes per worker task")
+    args = ap.parse_args(argv)
+    
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        notes = (line.rstrip("\r\n") for line in src)
+        for intent in parse_many(notes, workers=args.workers, chunksize=args.chunksize):
+            dst.write(json.dumps(intent.as_dict()))
+            dst.write("\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+order_stats.py
+==============
+Blotter statistics kept in memory and updated as orders are submitted or
+cancelled, so /api/orders/stats answers in O(1) however large order_data
+grows.
+
+The counters are rebuilt from one GROUP BY query at startup and on every
+reconciliation. Reconciliation bounds the query by the highest order_id at
+its start and replays inserts recorded after that, so submits landing
+mid-query are neither lost nor double counted. A status change racing a
+reconciliation is corrected by the next one.
+"""
+
+import threading
+from collections import Counter
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Single-pass aggregate; every counter below derives from these groups
+AGGREGATE_SQL = (
+    "SELECT DATE(arrival_time) AS day, cpty_id, symbol, side, submission_status AS status, "
+    "COUNT(*) AS n, COALESCE(SUM(size), 0) AS volume "
+    "FROM {table} {where}"
+    "GROUP BY DATE(arrival_time), cpty_id, symbol, side, submission_status"
+)
+
+
+class _Bucket:
+    __slots__ = ("orders", "submitted", "cancelled", "buy", "sell", "volume")
+
+    def __init__(self):
+        self.orders = self.submitted = self.cancelled = 0
+        self.buy = self.sell = self.volume = 0
+
+    def add(self, side: Optional[str], status: str, n: int, volume: int) -> None:
+        self.orders += n
+        self.volume += volume
+        if side == "Buy":
+            self.buy += n
+        elif side == "Sell":
+            self.sell += n
+        self.move(None, status, n)
+
+    def move(self, old: Optional[str], new: Optional[str], n: int = 1) -> None:
+        for status, sign in ((old, -n), (new, n)):
+            if status == "Submitted":
+                self.submitted += sign
+            elif status == "Cancelled":
+                self.cancelled += sign
+
+    def as_dict(self) -> dict:
+        return {
+            "orders": self.orders,
+            "submitted": self.submitted,
+            "cancelled": self.cancelled,
+            "buy_count": self.buy,
+            "sell_count": self.sell,
+            "volume": self.volume,
+        }
+
+
+class _Counters:
+    def __init__(self):
+        self.total = _Bucket()
+        self.by_day: Dict[str, _Bucket] = {}
+        self.by_client: Dict[str, _Bucket] = {}
+        self.symbols: Counter = Counter()    # symbol -> orders, for unique_symbols
+
+    def add(self, day: str, cpty_id: str, symbol: str, side: Optional[str],
+            status: str, n: int, volume: int) -> None:
+        for bucket in (self.total, self._day(day), self._client(cpty_id)):
+            bucket.add(side, status, n, volume)
+        self.symbols[symbol] += n
+
+    def move(self, day: str, cpty_id: str, old: str, new: str) -> None:
+        for bucket in (self.total, self._day(day), self._client(cpty_id)):
+            bucket.move(old, new)
+
+    def _day(self, day: str) -> _Bucket:
+        bucket = self.by_day.get(day)
+        if bucket is None:
+            bucket = self.by_day[day] = _Bucket()
+        return bucket
+
+    def _client(self, cpty_id: str) -> _Bucket:
+        bucket = self.by_client.get(cpty_id)
+        if bucket is None:
+            bucket = self.by_client[cpty_id] = _Bucket()
+        return bucket
+
+    def summary(self) -> dict:
+        t = self.total
+        return {
+            "total_orders": t.orders,
+            "submitted": t.submitted,
+            "cancelled": t.cancelled,
+            "drafts": 0,
+            "buy_count": t.buy,
+            "sell_count": t.sell,
+            "total_volume": t.volume,
+            "unique_symbols": len(self.symbols),
+            "unique_clients": sum(1 for b in self.by_client.values() if b.orders),
+        }
+
+    def breakdown(self, by: str) -> Dict[str, dict]:
+        buckets = self.by_day if by == "day" else self.by_client
+        return {k: b.as_dict() for k, b in sorted(buckets.items())}
+
+
+def _day_key(day) -> str:
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+def build_counters(groups: Iterable[dict]) -> _Counters:
+    counters = _Counters()
+    for g in groups:
+        counters.add(_day_key(g["day"]), g["cpty_id"], g["symbol"], g["side"],
+                     g["status"], int(g["n"]), int(g["volume"]))
+    return counters
+
+
+class OrderStats:
+    """
+    fetch_groups(max_order_id) -> rows of AGGREGATE_SQL (bounded by order_id
+                                  when max_order_id is not None)
+    fetch_max_order_id()       -> highest order_id, or None when empty
+    """
+
+    def __init__(self, fetch_groups: Callable[[Optional[int]], Iterable[dict]],
+                 fetch_max_order_id: Callable[[], Optional[int]]):
+        self._fetch_groups = fetch_groups
+        self._fetch_max_order_id = fetch_max_order_id
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+        self.loaded = False
+        # Inserts seen while a reconciliation query is running
+        self._pending: Optional[List[Tuple]] = None
+        self.reconciliations = 0
+        self.drift_corrections = 0
+        self.last_drift: Optional[dict] = None
+
+    # ---------- write path ----------
+
+    def on_insert(self, order_id: int, day, cpty_id: str, symbol: str,
+                  side: Optional[str], size: int, status: str) -> None:
+        event = (order_id, _day_key(day), cpty_id, symbol, side, status, 1, size)
+        with self._lock:
+            self._counters.add(*event[1:])
+            if self._pending is not None:
+                self._pending.append(event)
+
+    def on_status_change(self, day, cpty_id: str, old: str, new: str) -> None:
+        with self._lock:
+            self._counters.move(_day_key(day), cpty_id, old, new)
+
+    # ---------- read path ----------
+
+    def snapshot(self, breakdown: Optional[str] = None) -> dict:
+        with self._lock:
+            result = self._counters.summary()
+            if breakdown:
+                result[f"by_{breakdown}"] = self._counters.breakdown(breakdown)
+        return result
+
+    def fresh(self, breakdown: Optional[str] = None) -> dict:
+        """Straight from the database (consistent=true); memory is untouched"""
+        counters = build_counters(self._fetch_groups(None))
+        result = counters.summary()
+        if breakdown:
+            result[f"by_{breakdown}"] = counters.breakdown(breakdown)
+        return result
+
+    # ---------- reconciliation ----------
+
+    def reconcile(self) -> bool:
+        """Rebuild from the database; True if the in-memory totals had drifted"""
+        with self._lock:
+            self._pending = []
+        try:
+            high = self._fetch_max_order_id() or 0
+            counters = build_counters(self._fetch_groups(high))
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for order_id, *event in self._pending:
+                if order_id > high:
+                    counters.add(*event)
+            self._pending = None
+            before = self._counters.summary() if self.loaded else None
+            after = counters.summary()
+            drift = before is not None and before != after
+            if drift:
+                self.drift_corrections += 1
+                self.last_drift = {k: after[k] - before[k] for k in after if after[k] != before[k]}
+            self._counters = counters
+            self.loaded = True
+            self.reconciliations += 1
+        return drift
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "reconciliations": self.reconciliations,
+            "drift_corrections": self.drift_corrections,
+            "last_drift": self.last_drift,
+        }
@@ -0,0 +1,217 @@
+"""
+parser_backends.py
+==================
+Registry of interchangeable order-intent parser backends plus a shadow
+runner for comparing a candidate backend against the primary on live
+traffic.
+
+Every backend returns order_parser.OrderIntent so the prefill engine does
+not care which implementation produced it.
+"""
+
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+import enhanced_order_intent_parser
+from order_parser import OrderIntentParser, OrderIntent
+
+
+# ============================================================
+# REGISTRY
+# ============================================================
+
+class ParserBackend:
+    """A named parse function; pattern_version() feeds IntentCache invalidation"""
+
+    def __init__(self, name: str, parse: Callable[[str], OrderIntent],
+                 pattern_version: Callable[[], int] = lambda: 0):
+        self.name = name
+        self.parse = parse
+        self.pattern_version = pattern_version
+
+    def __repr__(self):
+        return f"ParserBackend({self.name!r})"
+
+
+_BACKENDS: Dict[str, ParserBackend] = {}
+
+
+def register_backend(backend: ParserBackend) -> ParserBackend:
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str) -> ParserBackend:
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser backend '{name}' (available: {', '.join(sorted(_BACKENDS))})"
+        ) from None
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def _parse_legacy(notes: str) -> OrderIntent:
+    """Original re.search-per-pattern parser, converted to the compact intent"""
+    return OrderIntent.from_dict(asdict(enhanced_order_intent_parser.OrderIntentParser.parse(notes)))
+
+
+register_backend(ParserBackend("compiled", OrderIntentParser.parse, OrderIntentParser.pattern_version))
+register_backend(ParserBackend("legacy", _parse_legacy))
+
+
+# ============================================================
+# SHADOW MODE
+# ============================================================
+
+# Latency bucket upper bounds in microseconds (last bucket is open-ended)
+LATENCY_BUCKETS_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are bucket upper bounds"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_US):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = seconds * 1e6
+        self.counts[bisect_left(self.bounds, us)] += 1
+        self.total_us += us
+        self.max_us = max(self.max_us, us)
+
+    def percentile(self, q: float) -> Optional[float]:
+        n = sum(self.counts)
+        if not n:
+            return None
+        rank = q * n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max_us
+        return self.max_us
+
+    def snapshot(self) -> dict:
+        n = sum(self.counts)
+        labels = [f"<={b}us" for b in self.bounds] + [f">{self.bounds[-1]}us"]
+        return {
+            "count": n,
+            "mean_us": round(self.total_us / n, 1) if n else None,
+            "p50_us": self.percentile(0.50),
+            "p90_us": self.percentile(0.90),
+            "p99_us": self.percentile(0.99),
+            "max_us": round(self.max_us, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class ShadowRunner:
+    """
+    Re-parses a sampled fraction of notes with the primary and a candidate
+    backend on a background thread, recording per-backend latency and
+    field-level disagreements. offer() never blocks the caller: when the
+    queue is full the sample is dropped and counted.
+    """
+
+    def __init__(self, primary: ParserBackend, candidate: ParserBackend,
+                 sample_rate: float = 0.01, max_queue: int = 1000,
+                 max_examples: int = 20):
+        self.primary = primary
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.latency = {primary.name: LatencyHistogram(), candidate.name: LatencyHistogram()}
+        self.disagreements: Dict[str, int] = {}
+        self.examples = deque(maxlen=max_examples)
+        self.offered = 0
+        self.sampled = 0
+        self.compared = 0
+        self.mismatched = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, notes: str) -> None:
+        self.offered += 1
+        if random.random() >= self.sample_rate:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(notes or "")
+            self.sampled += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self) -> None:
+        """Block until every queued sample has been compared"""
+        self._queue.join()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="parser-shadow", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            notes = self._queue.get()
+            try:
+                self._compare(notes)
+            except Exception:
+                self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def _timed(self, backend: ParserBackend, notes: str) -> OrderIntent:
+        t0 = time.perf_counter()
+        intent = backend.parse(notes)
+        self.latency[backend.name].record(time.perf_counter() - t0)
+        return intent
+
+    def _compare(self, notes: str) -> None:
+        expected = self._timed(self.primary, notes).as_dict()
+        actual = self._timed(self.candidate, notes).as_dict()
+        diff = [k for k in expected if expected[k] != actual[k]]
+        with self._lock:
+            self.compared += 1
+            if diff:
+                self.mismatched += 1
+                for field in diff:
+                    self.disagreements[field] = self.disagreements.get(field, 0) + 1
+                self.examples.append({
+                    "notes": notes[:200],
+                    "fields": {k: {"primary": expected[k], "candidate": actual[k]} for k in diff},
+                })
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "primary": self.primary.name,
+                "candidate": self.candidate.name,
+                "sample_rate": self.sample_rate,
+                "offered": self.offered,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "compared": self.compared,
+                "mismatched": self.mismatched,
+                "field_disagreements": dict(self.disagreements),
+                "latency": {name: h.snapshot() for name, h in self.latency.items()},
+                "recent_mismatches": list(self.examples),
+            }
@@ -0,0 +1,73 @@
+"""
+prefill_cache.py
+================
+Result cache in front of run_prefill.
+
+Traders toggle between tabs and re-request the exact same prefill, so
+results are kept in an LRU keyed on a hash of the PrefillRequest fields
+plus the versions of everything else the result depends on: the market
+snapshot entry, the client registry snapshot (and, from main.py, the
+parser pattern version and today's date). A new snapshot or client reload
+changes the key, so a stale result is never served; it just ages out.
+
+Every lookup returns a copy whose metadata dict is the caller's to extend.
+With refresh_metadata on, a hit gets a new timestamp and the lookup's own
+processing_time_ms; with it off the stored values are returned as they are.
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Callable, Hashable, Optional, Tuple
+
+from lru_cache import LRUCache
+
+
+def _result_footprint(key: tuple, result: dict) -> int:
+    """Approximate bytes held by one entry (serialized size of the result)"""
+    return len(key[0]) + len(json.dumps(result, default=str))
+
+
+def _detach(result: dict) -> dict:
+    """Copy deep enough that callers may add metadata without touching the cache"""
+    out = dict(result)
+    out["metadata"] = dict(result["metadata"])
+    return out
+
+
+class PrefillCache:
+    """Caches run_prefill results per (request fields, input versions)"""
+
+    def __init__(self, maxsize: int = 2048, ttl: Optional[float] = None,
+                 refresh_metadata: bool = True):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl, sizeof=_result_footprint)
+        self.refresh_metadata = refresh_metadata
+
+    @staticmethod
+    def key(fields: dict, *versions: Hashable) -> tuple:
+        digest = hashlib.blake2b(json.dumps(fields, sort_keys=True, default=str).encode("utf-8"),
+                                 digest_size=16).digest()
+        return (digest,) + versions
+
+    def lookup(self, key: Optional[tuple], compute: Callable[[], dict]) -> Tuple[dict, bool]:
+        """(result, hit); a None key always computes and caches nothing"""
+        t0 = time.perf_counter()
+        if key is None:
+            return compute(), False
+        cached = self._cache.get(key)
+        if cached is None:
+            result = compute()
+            self._cache.put(key, result)
+            return _detach(result), False
+        result = _detach(cached)
+        if self.refresh_metadata:
+            result["metadata"]["processing_time_ms"] = round((time.perf_counter() - t0) * 1000)
+            result["metadata"]["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        return result, True
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "refresh_metadata": self.refresh_metadata}
@@ -0,0 +1,56 @@
+"""
+refresher.py
+============
+Daemon thread that calls a function every `interval` seconds. Used to keep
+the in-process reference-data caches in step with the database.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class PeriodicRefresher:
+    def __init__(self, name: str, fn: Callable[[], object], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_run_ms: Optional[float] = None
+
+    def start(self) -> None:
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            t0 = time.perf_counter()
+            try:
+                self.fn()
+                self.runs += 1
+            except Exception as e:
+                # Keep polling; the caches fall back to their staleness bound
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.last_run_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval,
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_run_ms": self.last_run_ms,
+        }
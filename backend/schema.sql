@@ -7,7 +7,11 @@ CREATE DATABASE IF NOT EXISTS auo_hackathon;
 USE auo_hackathon;
 
 DROP TABLE IF EXISTS order_data;
+DROP TABLE IF EXISTS order_data_archive;
+DROP TABLE IF EXISTS order_archive_state;
+DROP TABLE IF EXISTS order_id_seq;
 DROP TABLE IF EXISTS client_profiles;
+DROP TABLE IF EXISTS market_latest;
 DROP TABLE IF EXISTS market_data;
 
 -- ========================================
@@ -23,9 +27,39 @@ CREATE TABLE market_data (
     ltp DECIMAL(18,4) NOT NULL,
     volatility_pct DECIMAL(8,4) NOT NULL,
     avg_trade_size INT NOT NULL,
-    INDEX idx_symbol (symbol)
+    INDEX idx_symbol_snapshot (symbol, snapshot_id)
 );
 
+-- Latest snapshot per symbol, maintained by trg_market_latest on insert.
+-- Prefill reads and the TTC slider touch only this one row per symbol;
+-- updated_at is the watermark the in-process market cache polls.
+CREATE TABLE market_latest (
+    symbol VARCHAR(20) PRIMARY KEY,
+    snapshot_id INT NOT NULL,
+    snapshot_time DATETIME(6) NOT NULL,
+    time_to_close INT NOT NULL,
+    bid DECIMAL(18,4) NOT NULL,
+    ask DECIMAL(18,4) NOT NULL,
+    ltp DECIMAL(18,4) NOT NULL,
+    volatility_pct DECIMAL(8,4) NOT NULL,
+    avg_trade_size INT NOT NULL,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    INDEX idx_updated_at (updated_at)
+);
+
+CREATE TRIGGER trg_market_latest AFTER INSERT ON market_data
+FOR EACH ROW
+    INSERT INTO market_latest
+        (symbol, snapshot_id, snapshot_time, time_to_close, bid, ask, ltp, volatility_pct, avg_trade_size)
+    VALUES
+        (NEW.symbol, NEW.snapshot_id, NEW.snapshot_time, NEW.time_to_close, NEW.bid, NEW.ask,
+         NEW.ltp, NEW.volatility_pct, NEW.avg_trade_size)
+    ON DUPLICATE KEY UPDATE
+        snapshot_time = NEW.snapshot_time, time_to_close = NEW.time_to_close,
+        bid = NEW.bid, ask = NEW.ask, ltp = NEW.ltp,
+        volatility_pct = NEW.volatility_pct, avg_trade_size = NEW.avg_trade_size,
+        snapshot_id = NEW.snapshot_id;
+
 -- ========================================
 -- TABLE 2: CLIENT PROFILES
 -- ========================================
@@ -34,27 +68,72 @@ CREATE TABLE client_profiles (
     client_name VARCHAR(100),
     urgency_factor DECIMAL(4,2) NOT NULL DEFAULT 0.50,
     price_sensitivity ENUM('High', 'Low') DEFAULT 'Low',
-    execution_model ENUM('Agency', 'Principal') DEFAULT 'Principal'
+    execution_model ENUM('Agency', 'Principal') DEFAULT 'Principal',
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
 );
 
 -- ========================================
 -- TABLE 3: ORDER DATA (with JSON blobs)
 -- ========================================
+-- Partitioned by day on arrival_time (order_archive.py adds daily
+-- partitions off pmax and archives old ones). MySQL requires the partition
+-- column in the primary key and does not allow foreign keys on partitioned
+-- tables; cpty_id is validated against the client registry on submit.
 CREATE TABLE order_data (
-    order_id INT PRIMARY KEY AUTO_INCREMENT,
+    order_id INT NOT NULL AUTO_INCREMENT,
     symbol VARCHAR(20) NOT NULL,
     cpty_id VARCHAR(50) NOT NULL,
     side ENUM('Buy', 'Sell'),
     size INT NOT NULL,
     order_notes TEXT,
     arrival_time DATETIME(6) NOT NULL,
+    -- Legacy layout; new rows use prefill_blob/params_diff (see blob_codec.py)
     prefill_result JSON,
     submitted_params JSON,
     trader_overrides JSON,
     submission_status ENUM('Draft', 'Submitted', 'Cancelled') DEFAULT 'Draft',
     submitted_at DATETIME(6),
-    FOREIGN KEY (cpty_id) REFERENCES client_profiles(cpty_id)
+    -- prefilled_params deflated once, submitted params as a diff against it
+    prefill_blob BLOB NULL,
+    params_diff BLOB NULL,
+    -- Written at submit time so the blotter can filter/sort without JSON
+    urgency_score TINYINT UNSIGNED NULL,
+    urgency_class VARCHAR(10) NULL,
+    executor VARCHAR(20) NULL,
+    order_type VARCHAR(20) NULL,
+    tif VARCHAR(10) NULL,
+    INDEX idx_cpty_arrival (cpty_id, arrival_time),
+    INDEX idx_symbol_arrival (symbol, arrival_time),
+    INDEX idx_status_order (submission_status, order_id),
+    INDEX idx_urgency_order (urgency_score, order_id),
+    INDEX idx_urgency_class_order (urgency_class, order_id),
+    PRIMARY KEY (order_id, arrival_time)
+)
+PARTITION BY RANGE (TO_DAYS(arrival_time)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2026-01-01')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Orders older than ORDER_RETENTION_DAYS, moved here a day at a time.
+-- Same columns as order_data (archival copies with SELECT *): keep the two
+-- in step when altering either.
+CREATE TABLE order_data_archive LIKE order_data;
+ALTER TABLE order_data_archive REMOVE PARTITIONING;
+ALTER TABLE order_data_archive ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- Rows with arrival_time before horizon live only in order_data_archive
+CREATE TABLE order_archive_state (
+    name VARCHAR(30) PRIMARY KEY,
+    horizon DATE NULL
+);
+INSERT INTO order_archive_state (name, horizon) VALUES ('order_data', NULL);
+
+-- Order IDs reserved in blocks by the write-behind journal (ORDER_WRITE_BEHIND=1)
+CREATE TABLE order_id_seq (
+    name VARCHAR(30) PRIMARY KEY,
+    next_id INT NOT NULL
 );
+INSERT INTO order_id_seq (name, next_id) VALUES ('order_data', 1);
 
 -- ========================================
 -- INSERTS: CLIENT PROFILES (50 Clients - Realistic Global Firms)
@@ -0,0 +1,65 @@
+"""
+test_aio_db.py — Unit tests for the async DB pool's lazy start
+==============================================================
+Patches aiomysql.create_pool with a fake, so no MySQL server is needed.
+
+Run:  python3 test_aio_db.py
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiomysql")
+
+import aio_db
+from aio_db import AsyncDB
+from db_pool import PoolTimeout
+
+
+class FakePool:
+    size = freesize = 1
+
+    async def acquire(self):
+        return "conn"
+
+    def release(self, conn):
+        pass
+
+
+def test_pool_is_created_on_first_use_after_a_failed_start():
+    calls = []
+
+    async def create_pool(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise aio_db.pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+        return FakePool()
+
+    db = AsyncDB({"host": "db", "database": "auo"})
+
+    async def scenario():
+        with pytest.raises(PoolTimeout, match="Can't connect"):
+            async with db.connection():
+                pass
+        assert db.stats()["size"] == 0
+
+        async def borrow():
+            async with db.connection() as conn:
+                return conn
+
+        assert await asyncio.gather(borrow(), borrow(), borrow()) == ["conn"] * 3
+
+    real, aio_db.aiomysql.create_pool = aio_db.aiomysql.create_pool, create_pool
+    try:
+        asyncio.run(scenario())
+    finally:
+        aio_db.aiomysql.create_pool = real
+    # One failed attempt, then a single pool shared by the concurrent borrowers
+    assert len(calls) == 2 and calls[1]["db"] == "auo"
+    assert db.acquired == 3
+
+
+if __name__ == "__main__":
+    test_pool_is_created_on_first_use_after_a_failed_start()
+    print("✅ Async DB pool recovers from a failed start")
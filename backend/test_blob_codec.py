@@ -0,0 +1,90 @@
+"""
+test_blob_codec.py — Unit tests for the compact prefill blob storage
+===================================================================
+Run:  python3 test_blob_codec.py
+"""
+
+import json
+
+import pytest
+
+from blob_codec import apply_diff, compress_json, decompress_json, encode_params, expand_row, json_diff
+
+
+PREFILL = {
+    "instrument": {"value": "TCS T+1", "confidence": "HIGH", "rationale": "Auto-populated from symbol"},
+    "side": {"value": "Buy", "confidence": "HIGH", "rationale": "User-specified side"},
+    "quantity": {"value": 25000, "confidence": "HIGH", "rationale": "Quantity from client mandate"},
+    "order_type": {"value": "Limit", "confidence": "HIGH",
+                   "rationale": "Standard limit order for price protection"},
+    "tif": {"value": "DAY", "confidence": "HIGH",
+            "rationale": "Standard day order: Valid until market close"},
+    "executor": {"value": "VWAP", "confidence": "HIGH", "rationale": "Algo engine"},
+    "use_algo": True,
+    "iwould_price": {"value": None, "confidence": "MEDIUM", "rationale": "Not applicable"},
+    "closing_pct": {"value": 30, "confidence": "MEDIUM", "rationale": "Max 30% in closing auction"},
+}
+
+
+def test_round_trip_and_dictionary_helps():
+    blob = compress_json(PREFILL)
+    assert decompress_json(blob) == PREFILL
+    raw = json.dumps(PREFILL, separators=(",", ":")).encode()
+    assert len(blob) * 4 < len(raw)
+
+
+def test_diff_round_trip():
+    edited = json.loads(json.dumps(PREFILL))
+    edited["tif"]["value"] = "IOC"
+    edited["use_algo"] = 1                  # same in Python, different in JSON
+    edited["trader_note"] = "per PM"
+    del edited["iwould_price"]
+    patch = json_diff(PREFILL, edited)
+    assert patch["sub"] == {"tif": {"set": {"value": "IOC"}}}
+    assert patch["del"] == ["iwould_price"]
+    restored = apply_diff(PREFILL, patch)
+    assert restored == edited and restored["use_algo"] is not True
+    assert json_diff(PREFILL, PREFILL) == {}
+
+
+def test_expand_row_rebuilds_both_layouts():
+    edited = dict(PREFILL, side={"value": "Sell", "confidence": "HIGH", "rationale": "User-specified side"})
+    blob, diff = encode_params(PREFILL, edited)
+    assert encode_params(PREFILL, PREFILL)[1] is None
+
+    row = expand_row({"order_id": 1, "prefill_result": None, "submitted_params": None,
+                      "trader_overrides": "{}", "prefill_blob": blob, "params_diff": diff})
+    assert "prefill_blob" not in row and "params_diff" not in row
+    assert json.loads(row["prefill_result"]) == PREFILL
+    assert json.loads(row["submitted_params"])["side"]["value"] == "Sell"
+
+    legacy = expand_row({"order_id": 2, "prefill_result": json.dumps(PREFILL),
+                         "submitted_params": json.dumps(PREFILL), "trader_overrides": "{}",
+                         "prefill_blob": None, "params_diff": None}, parse=True)
+    assert legacy["submitted_params"] == PREFILL and legacy["trader_overrides"] == {}
+
+
+def test_trader_overrides_are_stored_as_the_diff():
+    pytest.importorskip("fastapi")
+    from main import apply_overrides
+
+    overrides = {"Side": "Sell", "Close %": 10, "Layering": "Manual"}
+    submitted = apply_overrides(PREFILL, overrides)
+    assert submitted["side"] == dict(PREFILL["side"], value="Sell")
+    assert submitted["closing_pct"]["value"] == 10 and "layering" not in submitted
+    assert PREFILL["side"]["value"] == "Buy"
+
+    blob, diff = encode_params(PREFILL, submitted)
+    assert decompress_json(diff) == {"sub": {"side": {"set": {"value": "Sell"}},
+                                             "closing_pct": {"set": {"value": 10}}}}
+    row = expand_row({"prefill_blob": blob, "params_diff": diff}, parse=True)
+    assert row["submitted_params"] == submitted
+    assert encode_params(PREFILL, apply_overrides(PREFILL, {"Side": "Buy"}))[1] is None
+
+
+if __name__ == "__main__":
+    test_round_trip_and_dictionary_helps()
+    test_diff_round_trip()
+    test_expand_row_rebuilds_both_layouts()
+    test_trader_overrides_are_stored_as_the_diff()
+    print("✅ Prefill blobs round-trip")
@@ -0,0 +1,78 @@
+"""
+test_client_registry.py — Unit tests for the client profile registry
+===================================================================
+Run:  python3 test_client_registry.py
+"""
+
+import json
+from decimal import Decimal
+
+from client_registry import ClientRegistry
+
+
+class FakeClientProfiles:
+    def __init__(self):
+        self.rows = [
+            {"cpty_id": "JPM_LON_002", "client_name": "JP Morgan", "urgency_factor": Decimal("0.92"),
+             "price_sensitivity": "Low", "execution_model": "Principal"},
+            {"cpty_id": "GS_NY_001", "client_name": "Goldman Sachs", "urgency_factor": Decimal("0.95"),
+             "price_sensitivity": "Low", "execution_model": "Principal"},
+        ]
+        self.updated = 1
+        self.full_reads = 0
+
+    def fetch_all(self):
+        self.full_reads += 1
+        return [dict(r) for r in self.rows]
+
+    def fetch_version(self):
+        return (len(self.rows), self.updated)
+
+
+def test_profiles_are_converted_and_read_only():
+    db = FakeClientProfiles()
+    registry = ClientRegistry(db.fetch_all, db.fetch_version)
+    registry.load()
+    profile = registry.get("GS_NY_001")
+    assert profile["urgency_factor"] == 0.95 and isinstance(profile["urgency_factor"], float)
+    try:
+        profile["urgency_factor"] = 0.1
+        assert False, "profile should be read-only"
+    except TypeError:
+        pass
+    assert registry.get("NOPE") is None
+
+
+def test_payload_is_sorted_json_with_stable_etag():
+    db = FakeClientProfiles()
+    registry = ClientRegistry(db.fetch_all, db.fetch_version)
+    snap = registry.snapshot
+    rows = json.loads(snap.payload)
+    assert [r["cpty_id"] for r in rows] == ["GS_NY_001", "JPM_LON_002"]
+    assert rows[0]["urgency_factor"] == 0.95
+    registry.load()
+    assert registry.snapshot.etag == snap.etag
+
+
+def test_refresh_reloads_only_on_version_change():
+    db = FakeClientProfiles()
+    registry = ClientRegistry(db.fetch_all, db.fetch_version)
+    registry.load()
+    old = registry.snapshot
+    assert registry.refresh() is False
+    assert db.full_reads == 1
+
+    db.rows[0]["urgency_factor"] = Decimal("0.50")
+    db.updated += 1
+    assert registry.refresh() is True
+    assert registry.get("JPM_LON_002")["urgency_factor"] == 0.5
+    assert registry.snapshot.etag != old.etag
+    # Readers holding the old snapshot keep a consistent view
+    assert old.profiles["JPM_LON_002"]["urgency_factor"] == 0.92
+
+
+if __name__ == "__main__":
+    test_profiles_are_converted_and_read_only()
+    test_payload_is_sorted_json_with_stable_etag()
+    test_refresh_reloads_only_on_version_change()
+    print("✅ Client registry behaves")
@@ -0,0 +1,160 @@
+"""
+test_db_pool.py — Unit tests for the DB connection pool
+=======================================================
+Uses fake connections and a fake clock, so no MySQL server is needed.
+
+Run:  python3 test_db_pool.py
+"""
+
+import threading
+import time
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.open = True
+        self.healthy = True
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.healthy:
+            raise ConnectionError("server has gone away")
+
+    def close(self):
+        self.open = False
+
+
+def _pool(**kw):
+    made = []
+
+    def connect():
+        made.append(FakeConn(len(made)))
+        return made[-1]
+
+    kw.setdefault("clock", FakeClock())
+    return ConnectionPool(connect, **kw), made
+
+
+def test_connections_are_reused():
+    pool, made = _pool(min_size=0, max_size=4)
+    for _ in range(10):
+        with pool.connection() as conn:
+            assert conn is made[0]
+    assert len(made) == 1
+    assert pool.stats()["acquired"] == 10
+
+
+def test_warm_opens_min_size():
+    pool, made = _pool(min_size=3, max_size=5)
+    pool.warm()
+    assert len(made) == 3
+    assert pool.stats()["idle"] == 3
+
+
+def test_acquire_times_out_when_exhausted():
+    pool, made = _pool(min_size=0, max_size=2, acquire_timeout=0.05,
+                     clock=time.monotonic)
+    a, b = pool.acquire(), pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "expected PoolTimeout"
+    except PoolTimeout:
+        pass
+    assert pool.stats()["timeouts"] == 1
+    pool.release(a)
+    assert pool.acquire() is a
+    pool.release(a)
+    pool.release(b)
+
+
+def test_waiter_gets_released_connection():
+    pool, made = _pool(min_size=0, max_size=1, acquire_timeout=5, clock=time.monotonic)
+    conn = pool.acquire()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    pool.release(conn)
+    t.join(2)
+    assert got == [conn]
+    assert pool.stats()["waits"] == 1
+
+
+def test_idle_connection_validated_on_checkout():
+    clock = FakeClock()
+    pool, made = _pool(min_size=0, max_size=2, validate_after=30, max_idle=300, clock=clock)
+    with pool.connection():
+        pass
+    made[0].healthy = False
+    clock.now += 60
+    with pool.connection() as conn:
+        assert conn is made[1]
+    assert made[0].pings == 1 and not made[0].open
+    assert pool.stats()["validation_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_stale_connections_are_recycled():
+    clock = FakeClock()
+    pool, made = _pool(min_size=1, max_size=4, max_idle=300, max_lifetime=3600, clock=clock)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    clock.now += 400
+    pool.release(b)     # reaps `a`: idle too long and above min_size
+    assert not a.open and b.open
+    assert pool.stats()["size"] == 1
+
+    clock.now += 4000   # `b` now exceeds max_lifetime
+    with pool.connection() as conn:
+        assert conn is not b
+    assert not b.open
+
+
+def test_broken_connection_is_discarded():
+    pool, made = _pool(min_size=0, max_size=2, broken_errors=(ConnectionError,))
+    try:
+        with pool.connection():
+            raise ConnectionError("lost")
+    except ConnectionError:
+        pass
+    assert not made[0].open
+    assert pool.stats()["size"] == 0
+    with pool.connection() as conn:
+        assert conn is made[1]
+
+
+def test_close_shuts_idle_and_rejects_checkout():
+    pool, made = _pool(min_size=2, max_size=2)
+    pool.warm()
+    busy = pool.acquire()
+    pool.close()
+    pool.release(busy)
+    assert not any(c.open for c in made)
+    try:
+        pool.acquire()
+        assert False, "expected PoolTimeout"
+    except PoolTimeout:
+        pass
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_warm_opens_min_size()
+    test_acquire_times_out_when_exhausted()
+    test_waiter_gets_released_connection()
+    test_idle_connection_validated_on_checkout()
+    test_stale_connections_are_recycled()
+    test_broken_connection_is_discarded()
+    test_close_shuts_idle_and_rejects_checkout()
+    print("✅ Connection pool behaves")
@@ -0,0 +1,428 @@
+"""
+test_decision_engine.py — Rule table compiler, and the shipped table vs the old branches
+=======================================================================================
+The first tests build small tables by hand. The differential tests carry
+the if/elif chains decision_rules.json replaced (copied from main.py as it
+was) and check every decision against them over every threshold boundary
+and enum combination.
+
+Run:  python3 -m pytest test_decision_engine.py
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from decision_engine import DecisionEngine, DecisionTable, RuleError
+
+
+INPUTS = {"urgency": "number", "cas": "flag", "side": "label", "note": "label"}
+FIELDS = {"tif": {"inputs": ("urgency", "cas", "side"), "outputs": {"tif": None, "slice": (int, float)}}}
+
+
+def _table(rules, fields=FIELDS):
+    return DecisionTable({"fields": {"tif": rules}}, INPUTS, fields)
+
+
+TIF_RULES = [
+    {"id": "cas", "when": {"cas": True}, "then": {"tif": ["CAS", "HIGH", "auction"], "slice": 0}},
+    {"id": "critical", "when": {"urgency": ">=80", "side": ["Buy", None]},
+     "then": {"tif": ["IOC", "MEDIUM", "urgency {urgency}"], "slice": 1}},
+    {"id": "sell", "when": {"urgency": ">80", "side": {"not": ["Buy", None]}},
+     "then": {"tif": ["IOC", "MEDIUM", "sell {side}"], "slice": 2}},
+    {"id": "slow", "when": {"urgency": "<=20"}, "then": {"tif": ["GTC", "LOW", "patient"], "slice": 3}},
+    {"id": "day", "when": {}, "then": {"tif": ["GFD", "HIGH", "day"], "slice": 4.5}},
+]
+
+
+def _expected(urgency, cas, side):
+    if cas:
+        return "cas"
+    if urgency >= 80 and side in ("Buy", None):
+        return "critical"
+    if urgency > 80 and side not in ("Buy", None):
+        return "sell"
+    return "slow" if urgency <= 20 else "day"
+
+
+def test_first_matching_rule_wins_at_every_boundary():
+    table = _table(TIF_RULES)
+    for urgency, cas, side in itertools.product([0, 20, 20.5, 79.9, 80, 80.5, 81, 100],
+                                                [False, True], [None, "Buy", "Sell", "buy"]):
+        ctx = {"urgency": urgency, "cas": cas, "side": side}
+        assert table.rule("tif", ctx).id == _expected(urgency, cas, side), ctx
+    out = table.decide("tif", {"urgency": 85, "cas": False, "side": "Sell"})
+    assert out == {"tif": {"value": "IOC", "confidence": "MEDIUM", "rationale": "sell Sell"}, "slice": 2}
+    # urgency cut at 20, 80 (>=) and 80 (>), cas 2, side Buy/None/other
+    assert table.summary()["tif"] == {"rules": 5, "cells": 24, "inputs": {"cas": 2, "side": 3, "urgency": 4}}
+
+
+def test_select_matches_rule_over_arrays():
+    table = _table(TIF_RULES)
+    urgency = np.array([0, 20, 21, 80, 81, 80, 100, 50])
+    cas = np.array([False, False, False, False, False, True, False, False])
+    for side in (None, "Buy", "Sell"):
+        got = table.select("tif", {"urgency": urgency, "cas": cas, "side": side})
+        ids = [table.rules("tif")[i].id for i in got.tolist()]
+        assert ids == [_expected(u, c, side) for u, c in zip(urgency.tolist(), cas.tolist())]
+    sides = np.array(["Buy", None, "Sell"], dtype=object)
+    got = table.select("tif", {"urgency": 90, "cas": False, "side": sides})
+    assert [table.rules("tif")[i].id for i in got.tolist()] == ["critical", "critical", "sell"]
+
+
+@pytest.mark.parametrize("rules, message", [
+    (TIF_RULES[:-1], "no rule matches"),
+    (TIF_RULES[:-1] + [{"id": "x", "when": {"note": "a"}, "then": TIF_RULES[-1]["then"]}], "unknown inputs"),
+    ([{"id": "x", "when": {"urgency": "80"}, "then": TIF_RULES[-1]["then"]}], "comparison"),
+    ([{"id": "x", "when": {"cas": "yes"}, "then": TIF_RULES[-1]["then"]}], "true/false"),
+    ([{"id": "x", "when": {}, "then": {"tif": ["GFD", "HIGH", "day"]}}], "outputs must be exactly"),
+    ([{"id": "x", "when": {}, "then": {"tif": ["GFD", "HIGH", "day"], "slice": "4"}}], "must be a number"),
+    ([{"id": "x", "when": {}, "then": {"tif": ["GFD", "HIGH", "{note}"], "slice": 4}}], "unknown input 'note'"),
+    ([TIF_RULES[-1], TIF_RULES[-1]], "duplicate rule id"),
+])
+def test_bad_tables_are_rejected(rules, message):
+    with pytest.raises(RuleError, match=message):
+        _table(rules)
+
+
+def test_engine_swaps_tables_and_keeps_the_old_one_on_error(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"fields": {"tif": [{"id": "day", "when": {}, '
+                    '"then": {"tif": ["GFD", "HIGH", "day"], "slice": 1}}]}}')
+    engine = DecisionEngine(INPUTS, FIELDS, str(path))
+    first = engine.table
+    assert first.rule("tif", {}).id == "day"
+
+    engine.install({"fields": {"tif": TIF_RULES}})
+    assert engine.table.version != first.version and engine.swaps == 1
+    with pytest.raises(RuleError):
+        engine.install({"fields": {"tif": TIF_RULES[:2]}})
+    assert engine.table.rule("tif", {"urgency": 90, "cas": False, "side": None}).id == "critical"
+
+    engine.reload()
+    assert engine.table.version == first.version and engine.stats()["origin"] == str(path)
+
+
+# ---------- the shipped table vs the branches it replaced ----------
+
+def _main():
+    pytest.importorskip("fastapi")
+    import main
+    return main
+
+
+def _f(value, confidence, rationale):
+    return {"value": value, "confidence": confidence, "rationale": rationale}
+
+
+def ref_classification(score):
+    return "CRITICAL" if score >= 80 else "HIGH" if score >= 60 else "MEDIUM" if score >= 40 else "LOW"
+
+
+def ref_order_type(urgency, cas_active, urgency_factor, volatility):
+    if cas_active:
+        r = "CAS window detected. Limit order required for auction participation within ±3% band."
+        return _f("Limit", "HIGH", r), _f("Limit", "HIGH", "Limit pricing")
+    if urgency > 80 and urgency_factor > 0.7:
+        r = "High urgency + low price sensitivity → Market order for guaranteed fill"
+        return _f("Market", "HIGH", r), _f("Market", "HIGH", "Market pricing")
+    if volatility > 2.5:
+        r = f"High volatility ({volatility}%) → Limit order to avoid adverse selection"
+        return _f("Limit", "HIGH", r), _f("Limit", "HIGH", "Limit pricing")
+    return (_f("Limit", "MEDIUM", "Standard limit order for price protection"),
+            _f("Limit", "MEDIUM", "Limit pricing"))
+
+
+def ref_limit_price(side, urgency, cas, ltp, bid, ask):
+    if side is None:
+        side = "Buy"
+    if cas["cas_active"]:
+        ref, ub, lb = cas["reference_price"], cas["upper_band"], cas["lower_band"]
+        if side == "Buy":
+            lim = min(round(ref * (1.008 if urgency > 80 else 1.005), 1), ub)
+            pct = "+0.8%" if urgency > 80 else "+0.5%"
+        else:
+            lim = max(round(ref * (0.992 if urgency > 80 else 0.995), 1), lb)
+            pct = "-0.8%" if urgency > 80 else "-0.5%"
+        return _f(lim, "HIGH", f"CAS: Aggressive limit at {pct} for high fill probability (Band: {lb} - {ub})")
+    mid = round((bid + ask) / 2, 1)
+    if side == "Buy":
+        if urgency > 70:
+            return _f(ask, "HIGH", "High urgency: Limit at ask price for immediate execution")
+        if urgency > 40:
+            return _f(mid, "HIGH", "Medium urgency: Mid-price balances cost and fill probability")
+        return _f(round(bid + 0.1, 1), "HIGH", "Low urgency: Patient limit near bid for better price")
+    if urgency > 70:
+        return _f(bid, "HIGH", "High urgency: Limit at bid price for immediate execution")
+    if urgency > 40:
+        return _f(mid, "HIGH", "Medium urgency: Mid-price balances cost and fill probability")
+    return _f(round(ask - 0.1, 1), "HIGH", "Low urgency: Patient limit near ask for better price")
+
+
+def ref_style_limit(style, cas_active, side, lp, bid, ask):
+    if style == "PASSIVE" and not cas_active:
+        if side == "Buy":
+            return _f(round(min(lp["value"], bid + 0.05), 1), "HIGH", "Passive execution: Limit near bid for better price")
+        if side == "Sell":
+            return _f(round(max(lp["value"], ask - 0.05), 1), "HIGH", "Passive execution: Limit near ask for better price")
+    elif style == "AGGRESSIVE":
+        if side == "Buy":
+            return _f(ask, "HIGH", "Aggressive execution: Limit at ask for immediate fill")
+        if side == "Sell":
+            return _f(bid, "HIGH", "Aggressive execution: Limit at bid for immediate fill")
+    return lp
+
+
+def ref_tif(score, cas_active, must_complete):
+    if cas_active:
+        return _f("CAS", "HIGH", "CAS window: Order valid only for closing auction")
+    if must_complete or score > 90:
+        return _f("IOC", "MEDIUM", "Critical urgency: IOC ensures immediate execution attempt")
+    return _f("GFD", "HIGH", "Standard day order: Valid until market close")
+
+
+def ref_executor(score, cas_active, algo, minimize_impact, size_ratio):
+    use_algo, executor, exec_conf, exec_rat, service = False, None, "MEDIUM", "Standard execution", "Market"
+    if cas_active:
+        exec_conf, exec_rat = "HIGH", "CAS window: Direct limit order to closing auction"
+    elif algo:
+        use_algo, executor, service, exec_conf = True, algo, "BlueBox 2", "HIGH"
+        exec_rat = {
+            "VWAP": "Client explicitly requested VWAP benchmark execution",
+            "TWAP": "Client explicitly requested TWAP execution",
+            "POV": "Client requested POV (Percentage of Volume) execution",
+            "ICEBERG": "Client requested minimal market impact (Iceberg display strategy)",
+        }[algo]
+    elif minimize_impact and size_ratio > 2:
+        use_algo, executor, service, exec_conf = True, "ICEBERG", "BlueBox 2", "HIGH"
+        exec_rat = "Large order with minimize impact instruction → Iceberg strategy"
+    elif size_ratio > 10:
+        use_algo, executor, service, exec_conf = True, "VWAP", "BlueBox 2", "MEDIUM"
+        exec_rat = f"Very large order (Size Ratio: {size_ratio:.1f}x) → VWAP recommended"
+    elif size_ratio > 3 and score > 70:
+        use_algo, executor, service, exec_conf = True, "POV", "BlueBox 2", "HIGH"
+        exec_rat = "Large urgent order requires aggressive participation (POV)"
+    return {"service": _f(service, "HIGH", "Algo engine" if use_algo else "Direct market execution"),
+            "executor": _f(executor, exec_conf, exec_rat), "use_algo": use_algo}
+
+
+def ref_vwap(urgency, notes_must_complete, ttc, volatility, style, session, deadline, must_complete):
+    if urgency > 70:
+        pricing = _f("Adaptive", "HIGH", "High urgency: Adaptive pricing crosses spread when necessary")
+    elif volatility > 2.5:
+        pricing = _f("Passive", "HIGH", "High volatility: Passive pricing avoids adverse selection")
+    else:
+        pricing = _f("Adaptive", "HIGH", "Standard adaptive pricing balances aggression and patience")
+    if urgency > 80:
+        urg = _f("High", "HIGH", f"Urgency score: {urgency}/100 → High")
+    elif urgency > 50:
+        urg = _f("Auto", "HIGH", "Auto urgency adapts to market conditions")
+    else:
+        urg = _f("Low", "HIGH", "Low urgency allows patient accumulation")
+    gd = urgency > 75 or notes_must_complete
+    op, cp = ttc > 300, ttc < 60
+    cp_pct = (30 if urgency > 80 else 20) if cp else 0
+    vwap = {
+        "pricing": pricing,
+        "layering": _f("Auto", "HIGH", "Auto-layering optimizes order book placement dynamically"),
+        "urgency_setting": urg,
+        "get_done": _f("True" if gd else "False", "HIGH",
+                       "Force completion by end time" if gd else "Allow unfilled quantity to remain"),
+        "opening_print": _f("True" if op else "False", "HIGH",
+                            "Participate in opening auction for early liquidity" if op else "Order entered after open"),
+        "opening_pct": _f(10 if op else 0, "MEDIUM", "Max % in opening auction"),
+        "closing_print": _f("True" if cp else "False", "HIGH",
+                            "Approaching close - participate in closing auction" if cp else "Sufficient time remaining"),
+        "closing_pct": _f(cp_pct, "MEDIUM", f"Max {cp_pct}% in closing auction"),
+    }
+    if deadline:
+        vwap["get_done"] = _f("True", "HIGH", f"Must complete by {deadline}")
+    if must_complete:
+        vwap["get_done"] = _f("True", "HIGH", "Trader explicitly requires completion")
+    if style == "PASSIVE":
+        vwap["pricing"] = _f("Passive", "HIGH", "Passive pricing per trader instruction")
+        vwap["urgency_setting"] = _f("Low", "HIGH", "Low urgency for passive execution")
+    elif style == "AGGRESSIVE":
+        vwap["pricing"] = _f("Aggressive", "HIGH", "Aggressive pricing crosses spread when necessary")
+        vwap["urgency_setting"] = _f("High", "HIGH", "High urgency for aggressive execution")
+    if session in ("CLOSING", "CAS"):
+        vwap["closing_print"] = _f("True", "HIGH", "Trader targeted closing session")
+        vwap["closing_pct"] = _f(30 if urgency > 80 else 25, "HIGH", "Increased closing participation per instruction")
+    return vwap
+
+
+def ref_limit_adjustment(urgency, side):
+    if urgency >= 80:
+        opt = "Primary Best Bid" if (side or "Buy") == "Buy" else "Primary Best Ask"
+        return {"limit_option": _f(opt, "MEDIUM", "Peg to best price for aggressive fill"),
+                "limit_offset": _f(1, "HIGH", "1 tick offset"),
+                "offset_unit": _f("Tick", "HIGH", "Standard tick-based offset")}
+    return {"limit_option": _f("Order Limit", "HIGH", "Static limit price from order"),
+            "limit_offset": _f(0, "HIGH", "No offset"),
+            "offset_unit": _f("Tick", "HIGH", "Standard tick-based offset")}
+
+
+SCORES = range(0, 101)
+SIDES = (None, "Buy", "Sell", "buy")
+STYLES = ("PASSIVE", "NEUTRAL", "AGGRESSIVE")
+SESSIONS = (None, "CAS", "OPENING", "CLOSING")
+ALGOS = (None, "VWAP", "TWAP", "POV", "ICEBERG")
+
+
+def test_classification_order_type_and_hold():
+    main = _main()
+    rules = main.decision_rules.table
+    for score in SCORES:
+        assert main.classify_urgency(score) == ref_classification(score)
+        hold = "High urgency - release immediately" if score > 70 else "Standard immediate release"
+        assert rules.decide("hold", {"urgency": score})["hold"] == _f("No", "HIGH", hold)
+        for cas, uf, vol in itertools.product([False, True], [0.5, 0.7, 0.71], [1.2, 2.5, 2.51]):
+            assert main.select_order_type(score, cas, uf, vol) == ref_order_type(score, cas, uf, vol)
+
+
+def test_limit_price_and_style_adjustment():
+    main = _main()
+    rules = main.decision_rules.table
+    for ltp, bid, ask in [(3890.5, 3890.2, 3891.0), (812.35, 812.25, 812.45), (10.05, 10.0, 10.1)]:
+        for ttc, score, side in itertools.product([0, 25, 26, 200], SCORES, SIDES):
+            cas = main.detect_cas(ttc, ltp)
+            lp = main.calc_limit_price(side, score, cas, ltp, bid, ask)
+            assert lp == ref_limit_price(side, score, cas, ltp, bid, ask), (ltp, ttc, score, side)
+            for style in STYLES:
+                ctx = {"style": style, "cas": cas["cas_active"], "side": side, "urgency": score}
+                assert (main._style_limit(rules, ctx, lp, bid, ask)
+                        == ref_style_limit(style, cas["cas_active"], side, lp, bid, ask))
+
+
+def test_tif_and_executor():
+    main = _main()
+    rules = main.decision_rules.table
+    for score, cas in itertools.product(SCORES, [False, True]):
+        for must in (False, True):
+            ctx = {"urgency": score, "cas": cas, "must_complete": must}
+            assert rules.decide("tif", ctx)["tif"] == ref_tif(score, cas, must)
+        for algo, impact, ratio in itertools.product(ALGOS, [False, True],
+                                                     [0.5, 2, 2.01, 3, 3.01, 10, 10.01, 222.2222]):
+            ctx = {"urgency": score, "cas": cas, "algo": algo, "minimize_impact": impact, "size_ratio": ratio}
+            assert rules.decide("executor", ctx) == ref_executor(score, cas, algo, impact, ratio), ctx
+
+
+# select_tif / select_algo as they were, verbatim
+
+def base_select_tif(urgency, cas_active, order_notes):
+    if cas_active:
+        return _f("CAS", "HIGH", "CAS session: Order valid only for closing auction window")
+    nl = order_notes.lower()
+    if urgency > 90 and "immediate" in nl:
+        return _f("IOC", "MEDIUM", "Critical urgency: IOC ensures immediate execution attempt")
+    return _f("GFD", "HIGH", "Standard day order: Valid until market close")
+
+
+def base_select_algo(urgency, cas_active, order_notes, size_ratio):
+    nl = order_notes.lower()
+    if cas_active:
+        return {"value": None, "use_algo": False, "service": "Market",
+                "confidence": "HIGH",
+                "rationale": "CAS window: Direct limit order to closing auction (no algo needed)"}
+    if "vwap" in nl:
+        return {"value": "VWAP", "use_algo": True, "service": "BlueBox 2",
+                "confidence": "HIGH",
+                "rationale": "Client explicitly requires VWAP benchmark execution"}
+    if "twap" in nl:
+        return {"value": "TWAP", "use_algo": True, "service": "BlueBox 2",
+                "confidence": "HIGH",
+                "rationale": "Client explicitly requires TWAP execution"}
+    if urgency > 70 and size_ratio > 3:
+        return {"value": "POV", "use_algo": True, "service": "BlueBox 2",
+                "confidence": "HIGH",
+                "rationale": "High urgency with large order requires aggressive participation (POV)"}
+    if size_ratio > 2:
+        return {"value": "VWAP", "use_algo": True, "service": "BlueBox 2",
+                "confidence": "MEDIUM",
+                "rationale": "Standard VWAP execution balances cost and completion"}
+    return {"value": None, "use_algo": False, "service": "Market",
+            "confidence": "HIGH",
+            "rationale": "Small order - direct market execution sufficient"}
+
+
+HELPER_NOTES = ["", "Immediate fill needed", "IMMEDIATELY please", "must complete by close",
+                "VWAP benchmark", "twap it", "vwap or twap", "use POV", "minimize market impact, iceberg"]
+
+
+def test_select_tif_and_algo_match_the_original_helpers():
+    main = _main()
+    for text, score, cas in itertools.product(HELPER_NOTES, SCORES, [False, True]):
+        assert main.select_tif(score, cas, text) == base_select_tif(score, cas, text), (text, score, cas)
+        for ratio in (0.5, 2, 2.01, 3, 3.01, 10.01):
+            got, want = main.select_algo(score, cas, text, ratio), base_select_algo(score, cas, text, ratio)
+            assert got == want and list(got) == list(want), (text, score, cas, ratio)
+
+
+def test_select_tif_follows_a_swapped_table():
+    main = _main()
+    engine = main.decision_rules
+    rules = dict(engine.table.source, fields=dict(engine.table.source["fields"]))
+    rules["fields"]["tif_helper"] = [{"id": "tif_helper.always_fok", "when": {},
+                                      "then": {"tif": ["FOK", "LOW", "Desk override"]}}]
+    try:
+        engine.install(rules)
+        assert main.select_tif(50, True, "")["value"] == "FOK"
+    finally:
+        engine.reload()
+    assert main.select_tif(50, True, "")["value"] == "CAS"
+
+
+def test_vwap_params_and_limit_adjustment():
+    main = _main()
+    rules = main.decision_rules.table
+    combos = itertools.product([0, 59, 60, 300, 301], [1.2, 2.5, 2.51], [False, True], STYLES,
+                               SESSIONS, [None, "15:15"], [False, True])
+    for ttc, vol, notes_must, style, session, deadline, must in combos:
+        for score in SCORES:
+            ctx = {"urgency": score, "volatility": vol, "ttc": ttc, "notes_must_complete": notes_must,
+                   "style": style, "session": session, "deadline": deadline,
+                   "has_deadline": bool(deadline), "must_complete": must}
+            assert main._vwap_params(rules, ctx) == ref_vwap(score, notes_must, ttc, vol, style,
+                                                             session, deadline, must)
+    for score, side in itertools.product(SCORES, SIDES):
+        assert main.build_limit_adjustment(score, side) == ref_limit_adjustment(score, side)
+
+
+def test_rule_swap_reaches_prefill_and_cache_key():
+    main = _main()
+    engine = main.decision_rules
+    req = main.PrefillRequest(symbol="TCS.NS", cpty_id="C", size=1000, order_notes="")
+    market = {"symbol": "TCS.NS", "ltp": 3890.5, "bid": 3890.2, "ask": 3891.0, "time_to_close": 200,
+              "volatility_pct": 1.2, "avg_trade_size": 1800}
+    before = main.run_prefill(req, market, {"urgency_factor": 0.5})
+    assert before["prefilled_params"]["tif"]["value"] == "GFD"
+
+    rules = dict(engine.table.source, fields=dict(engine.table.source["fields"]))
+    rules["fields"]["tif"] = [{"id": "tif.always_ioc", "when": {},
+                               "then": {"tif": ["IOC", "LOW", "Desk override"]}}]
+    version = engine.table.version
+    try:
+        engine.install(rules)
+        after = main.run_prefill(req, market, {"urgency_factor": 0.5})
+        assert after["prefilled_params"]["tif"] == _f("IOC", "LOW", "Desk override")
+        assert engine.table.version != version
+        assert engine.table.trace(main._decision_context(
+            main._prefill_inputs(req, market, {"urgency_factor": 0.5}), 30,
+            main.detect_cas(200, 3890.5)))["tif"] == "tif.always_ioc"
+    finally:
+        engine.reload()
+    assert engine.table.version == version
+
+
+if __name__ == "__main__":
+    test_first_matching_rule_wins_at_every_boundary()
+    test_select_matches_rule_over_arrays()
+    test_classification_order_type_and_hold()
+    test_limit_price_and_style_adjustment()
+    test_tif_and_executor()
+    test_select_tif_and_algo_match_the_original_helpers()
+    test_select_tif_follows_a_swapped_table()
+    test_vwap_params_and_limit_adjustment()
+    test_rule_swap_reaches_prefill_and_cache_key()
+    print("✅ Compiled decision rules match the original branches")
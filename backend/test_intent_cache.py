@@ -0,0 +1,88 @@
+"""
+test_intent_cache.py — LRU/TTL behaviour of the intent cache
+============================================================
+Run:  python3 test_intent_cache.py
+"""
+
+from lru_cache import LRUCache
+from intent_cache import IntentCache
+from order_parser import ExecutionStyle, OrderIntentParser
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["size"] == 2 and stats["memory_bytes"] > 0
+
+
+def test_lru_expires_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=8, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 10
+    assert cache.get("a") == 1
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["memory_bytes"] == 0
+
+
+def test_intent_cache_keys_on_normalized_notes():
+    cache = IntentCache(maxsize=16)
+    first = cache.parse("VWAP benchmark - standard execution")
+    second = cache.parse("  vwap BENCHMARK - standard execution ")
+    assert second is first
+    assert first == OrderIntentParser.parse("vwap benchmark - standard execution")
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_intent_cache_invalidated_when_patterns_change():
+    cache = IntentCache(maxsize=16)
+    before = cache.parse("sweep the book")
+    assert before.execution_style == ExecutionStyle.NEUTRAL
+
+    original = OrderIntentParser.EXECUTION_STYLE_PATTERNS
+    try:
+        OrderIntentParser.EXECUTION_STYLE_PATTERNS = {
+            **original, "AGGRESSIVE": original["AGGRESSIVE"] + (r"\bsweep\b",)
+        }
+        after = cache.parse("sweep the book")
+        assert after.execution_style == ExecutionStyle.AGGRESSIVE
+        assert cache.stats()["invalidations"] == 1
+    finally:
+        OrderIntentParser.EXECUTION_STYLE_PATTERNS = original
+        OrderIntentParser.pattern_version()
+
+
+def test_pattern_tables_are_read_only():
+    try:
+        OrderIntentParser.URGENCY_PATTERNS["HIGH"] += (r"\bnow\b",)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("pattern tables should be frozen")
+
+
+if __name__ == "__main__":
+    test_lru_evicts_least_recently_used()
+    test_lru_expires_after_ttl()
+    test_intent_cache_keys_on_normalized_notes()
+    test_intent_cache_invalidated_when_patterns_change()
+    test_pattern_tables_are_read_only()
+    print("✅ Intent cache behaves as expected")
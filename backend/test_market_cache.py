@@ -0,0 +1,195 @@
+"""
+test_market_cache.py — Unit tests for the market snapshot cache
+===============================================================
+Backs MarketCache with an in-memory list of snapshots and a fake clock.
+
+Run:  python3 test_market_cache.py
+"""
+
+import asyncio
+from decimal import Decimal
+
+from market_cache import MarketCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMarketData:
+    """Append-only market_data table"""
+
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+
+    def insert(self, symbol, ttc, ltp="100.0"):
+        self.rows.append({
+            "snapshot_id": len(self.rows) + 1, "symbol": symbol, "ltp": Decimal(ltp),
+            "bid": Decimal("99.9"), "ask": Decimal("100.1"), "time_to_close": ttc,
+            "volatility_pct": Decimal("1.5"), "avg_trade_size": 1000,
+        })
+
+    def latest(self, symbol):
+        self.queries += 1
+        matches = [r for r in self.rows if r["symbol"] == symbol]
+        return dict(matches[-1]) if matches else None
+
+    def all_latest(self):
+        self.queries += 1
+        return [self.latest(s) for s in {r["symbol"] for r in self.rows}]
+
+    def since(self, snapshot_id):
+        self.queries += 1
+        return [dict(r) for r in self.rows if r["snapshot_id"] > snapshot_id]
+
+
+def _cache(db, clock, max_age=5.0):
+    return MarketCache(db.latest, db.all_latest, db.since, max_age=max_age, clock=clock)
+
+
+def test_steady_state_reads_skip_database():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    db.insert("INFY.NS", 60)
+    cache = _cache(db, clock)
+    cache.load_all()
+    before = db.queries
+    for _ in range(100):
+        entry = cache.get("TCS.NS")
+    assert db.queries == before
+    assert entry.row["ltp"] == 100.0 and isinstance(entry.row["ltp"], float)
+    assert "snapshot_id" not in entry.row
+
+
+def test_refresh_installs_new_snapshots_with_new_version():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock)
+    cache.load_all()
+    first = cache.get("TCS.NS")
+    db.insert("TCS.NS", 55, ltp="101.5")
+    assert cache.refresh() == 1
+    second = cache.get("TCS.NS")
+    assert second.snapshot_id == 2 and second.row["ltp"] == 101.5
+    assert second.version > first.version
+
+
+def test_stale_entries_reload_after_max_age():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock, max_age=5.0)
+    cache.load_all()
+    clock.now += 4
+    cache.refresh()            # a successful poll keeps entries fresh
+    clock.now += 4
+    before = db.queries
+    cache.get("TCS.NS")
+    assert db.queries == before
+    clock.now += 10            # poller stalled past the bound
+    cache.get("TCS.NS")
+    assert db.queries == before + 1
+    assert cache.stats()["stale_reloads"] == 1
+
+
+def test_invalidate_forces_reload():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock)
+    cache.load_all()
+    db.rows[0]["time_to_close"] = 20   # update_ttc rewrites the row in place
+    cache.invalidate("TCS.NS")
+    assert cache.get("TCS.NS").row["time_to_close"] == 20
+
+
+def test_load_racing_invalidation_is_not_cached():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock)
+    stale = db.latest("TCS.NS")
+    epoch = cache._epoch
+    cache.invalidate("TCS.NS")
+    racing = cache.put(stale, epoch)
+    assert cache.peek("TCS.NS") is None
+    assert not cache.is_current(racing)
+    assert cache.is_current(cache.get("TCS.NS"))
+
+
+def test_single_symbol_load_does_not_skip_unpolled_rows():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock)
+    cache.load_all()
+    db.insert("INFY.NS", 60)       # snapshot 2, not polled yet
+    db.insert("TCS.NS", 50)        # snapshot 3
+    cache.invalidate("TCS.NS")
+    assert cache.get("TCS.NS").snapshot_id == 3
+    cache.refresh()
+    assert cache.peek("INFY.NS").snapshot_id == 2
+
+
+def test_updated_at_watermark_sees_in_place_updates():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    db.rows[0]["updated_at"] = 1
+    since = lambda mark: [dict(r) for r in db.rows if r["updated_at"] >= mark]
+    cache = MarketCache(db.latest, db.all_latest, since, watermark="updated_at", clock=clock)
+    cache.load_all()
+    first = cache.get("TCS.NS")
+    assert "updated_at" not in first.row
+    cache.refresh()                # same row re-polled: version unchanged
+    assert cache.get("TCS.NS") is first
+
+    db.rows[0].update(time_to_close=20, updated_at=2)   # TTC edit from another process
+    cache.refresh()
+    entry = cache.get("TCS.NS")
+    assert entry.row["time_to_close"] == 20 and entry.version > first.version
+
+
+def test_unknown_symbol_and_async_loader():
+    db, clock = FakeMarketData(), FakeClock()
+    db.insert("TCS.NS", 60)
+    cache = _cache(db, clock)
+
+    async def fetch(symbol):
+        return db.latest(symbol)
+
+    assert asyncio.run(cache.get_async("NOPE.NS", fetch)) is None
+    assert asyncio.run(cache.get_async("TCS.NS", fetch)).snapshot_id == 1
+    assert cache.peek("TCS.NS") is not None
+
+
+def test_get_many_loads_misses_in_one_query():
+    db, clock = FakeMarketData(), FakeClock()
+    for symbol in ("TCS.NS", "INFY.NS", "SBIN.NS"):
+        db.insert(symbol, 60)
+    cache = _cache(db, clock)
+    cache.get("TCS.NS")
+    calls = []
+
+    def fetch_many(symbols):
+        calls.append(list(symbols))
+        return [db.latest(s) for s in symbols if db.latest(s)]
+
+    found = cache.get_many(["TCS.NS", "INFY.NS", "SBIN.NS", "INFY.NS", "NOPE.NS"], fetch_many)
+    assert calls == [["INFY.NS", "SBIN.NS", "NOPE.NS"]]
+    assert sorted(found) == ["INFY.NS", "SBIN.NS", "TCS.NS"]
+    assert cache.get_many(["INFY.NS", "SBIN.NS"], fetch_many)["SBIN.NS"].snapshot_id == 3
+    assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    test_steady_state_reads_skip_database()
+    test_refresh_installs_new_snapshots_with_new_version()
+    test_stale_entries_reload_after_max_age()
+    test_invalidate_forces_reload()
+    test_load_racing_invalidation_is_not_cached()
+    test_single_symbol_load_does_not_skip_unpolled_rows()
+    test_updated_at_watermark_sees_in_place_updates()
+    test_unknown_symbol_and_async_loader()
+    test_get_many_loads_misses_in_one_query()
+    print("✅ Market cache behaves")
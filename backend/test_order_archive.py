@@ -0,0 +1,94 @@
+"""
+test_order_archive.py — Unit tests for order_data partition maintenance
+======================================================================
+A fake catalogue stands in for INFORMATION_SCHEMA.PARTITIONS and applies
+the REORGANIZE / DROP statements the archiver issues.
+
+Run:  python3 test_order_archive.py
+"""
+
+import re
+from contextlib import nullcontext
+from datetime import date
+
+from order_archive import HORIZON_SQL, PARTITIONS_SQL, SET_HORIZON_SQL, OrderArchiver, to_days
+
+
+class FakeCatalogue:
+    def __init__(self, bounds):
+        # [(name, "TO_DAYS value" | "MAXVALUE")]
+        self.parts = [(n, str(to_days(b)) if b else "MAXVALUE") for n, b in bounds]
+        self.horizon = None
+        self.log = []
+
+    def fetchall(self, sql, args):
+        if sql == PARTITIONS_SQL:
+            return [{"name": n, "bound": b} for n, b in self.parts]
+        if sql == HORIZON_SQL:
+            return [{"horizon": self.horizon}]
+        raise AssertionError(sql)
+
+    def execute(self, sql, args):
+        self.log.append(sql)
+        if sql == SET_HORIZON_SQL:
+            self.horizon = args[0]
+        elif "REORGANIZE PARTITION pmax" in sql:
+            new = re.findall(r"PARTITION (p\d+) VALUES LESS THAN \((\d+)\)", sql)
+            self.parts = self.parts[:-1] + new + [("pmax", "MAXVALUE")]
+        elif "DROP PARTITION" in sql:
+            name = sql.rsplit(" ", 1)[1]
+            self.parts = [p for p in self.parts if p[0] != name]
+
+
+TODAY = date(2026, 3, 10)
+
+
+def _archiver(db, **kw):
+    return OrderArchiver(db.fetchall, db.execute, today=lambda: TODAY, **kw)
+
+
+def test_ensure_partitions_splits_days_off_pmax():
+    db = FakeCatalogue([("p_history", date(2026, 3, 8)), ("pmax", None)])
+    archiver = _archiver(db, days_ahead=2)
+    assert archiver.ensure_partitions() == 5            # 8th .. 12th
+    assert [p.name for p in archiver.partitions()] == [
+        "p_history", "p20260308", "p20260309", "p20260310", "p20260311", "p20260312", "pmax"]
+    assert archiver.partitions()[-2].bound == date(2026, 3, 13)
+    assert archiver.ensure_partitions() == 0
+
+
+def test_archive_moves_old_partitions_and_advances_horizon():
+    db = FakeCatalogue([("p_history", date(2026, 3, 1)), ("p20260301", date(2026, 3, 2)),
+                        ("p20260302", date(2026, 3, 3)), ("pmax", None)])
+    archiver = _archiver(db, retention_days=8, days_ahead=0)
+    assert archiver.run() == 2                           # cutoff 2026-03-02
+    assert archiver.horizon == date(2026, 3, 2)
+    assert [p.name for p in archiver.partitions()][:2] == ["p20260302", "p20260303"]
+    # Each partition is copied, the horizon moved, then the partition dropped
+    moves = [s for s in db.log if "REORGANIZE" not in s]
+    assert "PARTITION (p_history)" in moves[0] and moves[1] == SET_HORIZON_SQL
+    assert moves[2].endswith("DROP PARTITION p_history")
+
+
+def test_retention_zero_keeps_everything():
+    db = FakeCatalogue([("p_history", date(2020, 1, 1)), ("pmax", None)])
+    archiver = _archiver(db, retention_days=0)
+    assert archiver.archive() == 0
+    assert archiver.load_horizon() is None
+
+
+def test_pass_is_skipped_while_another_process_holds_the_lock():
+    db = FakeCatalogue([("p_history", date(2026, 3, 1)), ("pmax", None)])
+    db.horizon = date(2026, 2, 1)
+    archiver = _archiver(db, retention_days=8, lock=lambda: nullcontext(False))
+    assert archiver.run() == 0
+    assert db.log == [] and archiver.passes_skipped == 1
+    assert archiver.horizon == date(2026, 2, 1)      # still refreshed
+
+
+if __name__ == "__main__":
+    test_ensure_partitions_splits_days_off_pmax()
+    test_archive_moves_old_partitions_and_advances_horizon()
+    test_retention_zero_keeps_everything()
+    test_pass_is_skipped_while_another_process_holds_the_lock()
+    print("✅ Order archive maintains partitions")
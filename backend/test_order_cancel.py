@@ -0,0 +1,123 @@
+"""
+test_order_cancel.py — Cancels reach archived and write-behind orders
+=====================================================================
+A fake pool stands in for MySQL with an order_data and an
+order_data_archive table, and records every statement it runs.
+
+Run:  python3 -m pytest test_order_cancel.py
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+import main
+
+
+class FakeDB:
+    def __init__(self, tables):
+        self.tables = tables
+        self.statements = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def _rows(self, sql, args):
+        table = "order_data_archive" if "order_data_archive" in sql else "order_data"
+        return [r for r in self.tables[table] if r["order_id"] == args[0]]
+
+    def execute(self, sql, args=None):
+        self.statements.append((sql, args))
+        if sql.startswith("SELECT"):
+            rows = self._rows(sql, args)
+            if "arrival_time >= %s" in sql:
+                rows = [r for r in rows if r["arrival_time"].date() >= args[1]]
+            elif "arrival_time < %s" in sql:
+                rows = [r for r in rows if r["arrival_time"].date() < args[1]]
+            self.row = rows[0] if rows else None
+            return len(rows)
+        changed = 0
+        for r in self._rows(sql, args):
+            if r["arrival_time"] == args[1] and r["submission_status"] == args[2]:
+                r["submission_status"] = "Cancelled"
+                changed += 1
+        return changed
+
+    def fetchone(self):
+        return self.row
+
+
+def _order(order_id, day):
+    return {"order_id": order_id, "cpty_id": "C1", "submission_status": "Submitted",
+            "arrival_time": datetime.combine(day, datetime.min.time())}
+
+
+HORIZON = date(2025, 1, 1)
+
+
+@contextmanager
+def _database(tables, horizon=HORIZON):
+    db = FakeDB(tables)
+    saved = main.db_pool, main.order_archiver.horizon, main.order_stats.on_status_change
+    moves = []
+    main.db_pool, main.order_archiver.horizon = db, horizon
+    main.order_stats.on_status_change = lambda *a: moves.append(a)
+    try:
+        yield db, moves
+    finally:
+        main.db_pool, main.order_archiver.horizon, main.order_stats.on_status_change = saved
+        main._archived_groups["horizon"] = None
+
+
+def test_cancel_updates_the_table_the_order_lives_in():
+    archived = _order(1, date(2024, 6, 3))
+    # Partition copied to the archive but not yet dropped: the archive is authoritative
+    tables = {"order_data": [_order(1, date(2024, 6, 3)), _order(2, date(2025, 3, 4))],
+              "order_data_archive": [archived]}
+    with _database(tables) as (db, moves):
+        main._archived_groups["horizon"] = HORIZON
+        assert main.cancel_order(1)["previous_status"] == "Submitted"
+        assert archived["submission_status"] == "Cancelled"
+        assert tables["order_data"][0]["submission_status"] == "Submitted"
+        assert main._archived_groups["horizon"] is None
+        main.cancel_order(2)
+        assert tables["order_data"][1]["submission_status"] == "Cancelled"
+    updates = [sql for sql, _ in db.statements if sql.startswith("UPDATE")]
+    assert updates[0].startswith("UPDATE order_data_archive ")
+    assert updates[1].startswith("UPDATE order_data ")
+    assert all("arrival_time = %s" in sql for sql in updates)
+    assert [m[0] for m in moves] == [date(2024, 6, 3), date(2025, 3, 4)]
+
+    with _database({"order_data": [], "order_data_archive": []}):
+        with pytest.raises(HTTPException) as e:
+            main.cancel_order(3)
+    assert e.value.status_code == 404
+
+
+def test_cancel_of_a_journaled_order_asks_for_a_retry():
+    saved = main.ORDER_WRITE_BEHIND, main.order_journal.holds
+    main.ORDER_WRITE_BEHIND, main.order_journal.holds = True, lambda order_id: order_id == 7
+    try:
+        with _database({"order_data": [], "order_data_archive": []}) as (db, moves):
+            with pytest.raises(HTTPException) as e:
+                main.cancel_order(7)
+    finally:
+        main.ORDER_WRITE_BEHIND, main.order_journal.holds = saved
+    assert e.value.status_code == 409 and "journal" in e.value.detail
+    assert db.statements == [] and moves == []
+
+
+if __name__ == "__main__":
+    test_cancel_updates_the_table_the_order_lives_in()
+    test_cancel_of_a_journaled_order_asks_for_a_retry()
+    print("✅ Cancels follow the archive split and the write-behind journal")
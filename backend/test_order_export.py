@@ -0,0 +1,98 @@
+"""
+test_order_export.py — Streaming order export releases its connection
+=====================================================================
+Uses a fake pool and a fake unbuffered cursor, so no MySQL server is needed.
+
+Run:  python3 -m pytest test_order_export.py
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import main
+
+
+class FakeCursor:
+    description = [("order_id",), ("cpty_id",), ("symbol",)]
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetches = 0
+        self.closed = False
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchmany(self, n):
+        self.fetches += 1
+        batch, self.rows = self.rows[:n], self.rows[n:]
+        return batch
+
+    def close(self):
+        # SSCursor.close() drains every unread row off the wire
+        while self.fetchmany(1000):
+            pass
+        self.closed = True
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.cur = FakeCursor(rows)
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        return self.cur
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = []
+
+    def acquire(self):
+        return self.conn
+
+    def release(self, conn, broken=False):
+        self.released.append(broken)
+
+
+@contextmanager
+def _export(rows):
+    conn = FakeConn(rows)
+    pool, main.db_pool = main.db_pool, FakePool(conn)
+    try:
+        yield conn, main.db_pool, main._export_chunks("SELECT", (), "ndjson", False)
+    finally:
+        main.db_pool = pool
+
+
+ROWS = [{"order_id": i, "cpty_id": "C", "symbol": "TCS.NS"} for i in range(10 * main.ORDER_EXPORT_CHUNK)]
+
+
+def test_finished_export_returns_the_connection():
+    with _export(list(ROWS)) as (conn, pool, chunks):
+        body = b"".join(chunks)
+    assert body.count(b"\n") == len(ROWS)
+    assert conn.cur.closed and not conn.closed and pool.released == [False]
+
+
+def test_abandoned_export_closes_without_draining():
+    with _export(list(ROWS)) as (conn, pool, chunks):
+        next(chunks)
+        next(chunks)
+        assert conn.cur.fetches == 1
+        chunks.close()  # client disconnected: GeneratorExit at the yield
+    assert conn.cur.fetches == 1 and not conn.cur.closed
+    assert conn.closed and pool.released == [True]
+
+
+if __name__ == "__main__":
+    test_finished_export_returns_the_connection()
+    test_abandoned_export_closes_without_draining()
+    print("✅ Order export drops abandoned streams without draining them")
@@ -0,0 +1,177 @@
+"""
+test_order_journal.py — Unit tests for the write-behind order journal
+=====================================================================
+Flushes go to an in-memory order_data keyed by order_id, where replays are
+no-ops (ON DUPLICATE KEY UPDATE).
+
+Run:  python3 test_order_journal.py
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from order_journal import IdAllocator, OrderJournal
+
+
+class DataError(Exception):
+    pass
+
+
+class FakeOrderTable:
+    def __init__(self):
+        self.rows = {}
+        self.batches = []
+        self.fail = 0          # fail this many flushes before succeeding
+
+    def flush(self, entries):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("MySQL server has gone away")
+        for e in entries:
+            if e.params[-1] is None:
+                # The whole multi-row INSERT fails
+                raise DataError("Column 'submitted_at' cannot be null")
+        self.batches.append(len(entries))
+        for e in entries:
+            self.rows.setdefault(e.order_id, list(e.params))
+
+
+def _path():
+    return os.path.join(tempfile.mkdtemp(), "journal.jsonl")
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_id_allocator_reserves_blocks():
+    reserved = []
+
+    def reserve(n):
+        first = 1 + 10 * len(reserved)
+        reserved.append(first)
+        return first
+
+    ids = IdAllocator(reserve, block_size=3)
+    assert [ids.next_id() for _ in range(7)] == [1, 2, 3, 11, 12, 13, 21]
+    assert ids.blocks == 3
+    # A basket straddling blocks still gets ascending ids
+    assert ids.next_ids(4) == [22, 23, 31, 32]
+
+
+def test_concurrent_submits_are_flushed_in_batches():
+    table = FakeOrderTable()
+    journal = OrderJournal(_path(), table.flush, flush_interval=0.01)
+    journal.start()
+    threads = [threading.Thread(target=journal.append, args=(i, ["TCS.NS", i])) for i in range(1, 101)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _wait_for(lambda: len(table.rows) == 100)
+    journal.stop()
+    assert table.rows[42] == ["TCS.NS", 42]
+    assert journal.fsyncs <= journal.appended
+    assert journal.stats()["pending"] == 0
+
+
+def test_basket_is_journaled_with_one_fsync():
+    table = FakeOrderTable()
+    journal = OrderJournal(_path(), table.flush, flush_interval=0.01)
+    journal.start()
+    journal.append_many([(i, ["TCS.NS", i]) for i in range(1, 51)])
+    assert journal.fsyncs == 1
+    _wait_for(lambda: len(table.rows) == 50)
+    journal.stop()
+    assert list(table.rows) == list(range(1, 51))
+
+
+def test_recover_replays_unflushed_entries():
+    path = _path()
+    table = FakeOrderTable()
+    table.fail = 10 ** 6           # database down: nothing gets flushed
+    journal = OrderJournal(path, table.flush, flush_interval=0.01)
+    journal.start()
+    journal.append(1, ["TCS.NS", "2025-01-06 10:00:00", b"\x01blob"])
+    journal.append(2, ["INFY.NS", "2025-01-06 10:00:01"])
+    journal.stop()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "order_id"')         # torn write from a crash
+
+    table.fail = 0
+    restarted = OrderJournal(path, table.flush, flush_interval=0.01)
+    assert restarted.recover() == 2
+    restarted.start()
+    _wait_for(lambda: len(table.rows) == 2)
+    restarted.stop()
+    assert table.rows[2] == ["INFY.NS", "2025-01-06 10:00:01"]
+    assert table.rows[1][2] == b"\x01blob"
+
+    # Everything is flushed now: a third start has nothing to replay
+    assert OrderJournal(path, table.flush).recover() == 0
+
+
+def test_failed_flush_is_retried_in_order():
+    table = FakeOrderTable()
+    table.fail = 2
+    journal = OrderJournal(_path(), table.flush, flush_interval=0.01)
+    journal.start()
+    for i in range(1, 4):
+        journal.append(i, [i])
+    _wait_for(lambda: len(table.rows) == 3)
+    journal.stop()
+    assert journal.flush_errors == 2
+    assert list(table.rows) == [1, 2, 3]
+
+
+def test_rejected_rows_are_dead_lettered_not_retried():
+    table = FakeOrderTable()
+    journal = OrderJournal(_path(), table.flush, flush_interval=0.01, reject=(DataError,))
+    journal.start()
+    journal.append_many([(i, ["TCS.NS", None if i == 3 else i]) for i in range(1, 6)])
+    _wait_for(lambda: len(table.rows) == 4)
+    table.fail = 1                 # an outage is still retried, not dead-lettered
+    journal.append(6, ["TCS.NS", None])
+    journal.append(7, ["TCS.NS", 7])
+    _wait_for(lambda: len(table.rows) == 5)
+    journal.stop()
+    assert sorted(table.rows) == [1, 2, 4, 5, 7]
+    with open(journal.rejected_path, encoding="utf-8") as f:
+        dead = [json.loads(line) for line in f]
+    assert [d["order_id"] for d in dead] == [3, 6]
+    assert dead[0]["params"] == ["TCS.NS", None] and "cannot be null" in dead[0]["error"]
+    stats = journal.stats()
+    assert stats["rejected"] == 2 and stats["flush_errors"] == 1 and stats["pending"] == 0
+    # Dead-lettered entries count as flushed: nothing to replay
+    assert OrderJournal(journal.path, table.flush).recover() == 0
+
+
+def test_holds_acknowledged_orders_until_they_are_flushed():
+    table = FakeOrderTable()
+    table.fail = 10 ** 6
+    journal = OrderJournal(_path(), table.flush, flush_interval=0.01)
+    journal.start()
+    journal.append(1, ["TCS.NS"])
+    _wait_for(lambda: journal.flush_errors > 0)
+    assert journal.holds(1) and not journal.holds(2)
+    table.fail = 0
+    _wait_for(lambda: 1 in table.rows)
+    journal.stop()
+    assert not journal.holds(1)
+
+
+if __name__ == "__main__":
+    test_id_allocator_reserves_blocks()
+    test_concurrent_submits_are_flushed_in_batches()
+    test_basket_is_journaled_with_one_fsync()
+    test_recover_replays_unflushed_entries()
+    test_failed_flush_is_retried_in_order()
+    test_rejected_rows_are_dead_lettered_not_retried()
+    test_holds_acknowledged_orders_until_they_are_flushed()
+    print("✅ Order journal is durable and drains in batches")
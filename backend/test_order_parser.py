@@ -0,0 +1,113 @@
+"""
+test_order_parser.py — Differential checks for the compiled intent parser
+=========================================================================
+order_parser.OrderIntentParser scans notes with one compiled matcher;
+enhanced_order_intent_parser keeps the original re.search-per-pattern
+implementation. Both must produce identical intents.
+
+Run:  python3 test_order_parser.py
+"""
+
+import random
+from dataclasses import asdict
+
+import order_parser
+import enhanced_order_intent_parser as reference
+
+
+# Demo notes from schema.sql plus hand-picked edge cases
+NOTES = [
+    "",
+    "   ",
+    "ok",
+    "EOD compliance required - must attain position by close",
+    "VWAP must complete by 2pm - patient execution preferred",
+    "Urgent buy - critical allocation for fund rebalancing",
+    "Patient accumulation - no rush, optimize price",
+    "Must liquidate by close - regulatory requirement",
+    "Immediate - market impact acceptable",
+    "TWAP over next 2 hours",
+    "VWAP benchmark - standard execution",
+    "Standard order, execute normally",
+    "minimize market impact, work the order until 14:30",
+    "ASAP but no rush on the remainder - immediate fill at close",
+    "closing auction participation, do not cross, limit only",
+    "no market orders; use discretion; participate by 12 am",
+    "eodcompliance atclose noRush",
+]
+
+# Phrases covering every pattern table, used to build random conflicting notes
+PHRASES = [
+    "asap", "immediate", "critical", "rush", "extreme urgency", "urgent",
+    "eod compliance", "must complete", "high priority", "time-sensitive",
+    "passive", "patient", "no rush", "no urgency", "relaxed", "work it",
+    "vwap", "volume-weighted", "benchmark vwap", "twap", "time weighted",
+    "pov", "participation", "percentage of volume", "iceberg", "hide size",
+    "dark pool", "avoid impact", "minimize market impact", "aggressive",
+    "cross spread", "take liquidity", "immediate fill", "cas",
+    "closing auction", "close auction", "at close", "opening auction",
+    "at open", "closing", "by close", "toward close", "ensure complete",
+    "guarantee fill", "get done", "complete by", "fill or kill",
+    "standard order", "regular", "do not cross", "limit only",
+    "no market order", "work the order", "participate", "use discretion",
+    "by 2pm", "by 3:15 pm", "until 9:05", "buy", "sell", "-", ",",
+]
+
+
+def _random_notes(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 12)))
+        for _ in range(count)
+    ]
+
+
+def _assert_same(notes):
+    expected = asdict(reference.OrderIntentParser.parse(notes))
+    actual = order_parser.OrderIntentParser.parse(notes).as_dict()
+    assert actual == expected, f"{notes!r}: {actual} != {expected}"
+
+
+def test_demo_notes_match_reference():
+    for notes in NOTES:
+        _assert_same(notes)
+
+
+def test_random_conflicting_notes_match_reference():
+    for notes in _random_notes(3000):
+        _assert_same(notes)
+
+
+def test_overlapping_hits_are_all_reported():
+    # "no rush" (LOW) overlaps "rush" (CRITICAL); both must count
+    intent = order_parser.OrderIntentParser.parse("no rush")
+    assert intent.urgency_level == order_parser.Urgency.CRITICAL
+    assert intent.confidence_score == 0.45
+
+
+def test_intent_round_trips_through_dict():
+    for notes in NOTES + _random_notes(200, seed=5):
+        intent = order_parser.OrderIntentParser.parse(notes)
+        assert order_parser.OrderIntent.from_dict(intent.as_dict()) == intent
+
+
+def test_empty_notes_share_default_intent():
+    parse = order_parser.OrderIntentParser.parse
+    assert parse("") is parse(None) is order_parser.DEFAULT_INTENT
+
+
+def test_parse_many_preserves_input_order():
+    notes = NOTES + _random_notes(500, seed=11)
+    expected = [order_parser.OrderIntentParser.parse(n) for n in notes]
+    assert list(order_parser.parse_many(notes, workers=1, chunksize=7)) == expected
+    assert list(order_parser.parse_many(iter(notes), workers=2, chunksize=7)) == expected
+
+
+if __name__ == "__main__":
+    test_demo_notes_match_reference()
+    test_random_conflicting_notes_match_reference()
+    test_overlapping_hits_are_all_reported()
+    test_parse_many_preserves_input_order()
+    test_intent_round_trips_through_dict()
+    test_empty_notes_share_default_intent()
+    print("✅ Compiled parser matches reference implementation")
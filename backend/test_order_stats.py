@@ -0,0 +1,152 @@
+"""
+test_order_stats.py — Unit tests for the in-memory blotter statistics
+=====================================================================
+Backs OrderStats with an in-memory order_data table whose GROUP BY mirrors
+AGGREGATE_SQL.
+
+Run:  python3 test_order_stats.py
+"""
+
+from collections import defaultdict
+from datetime import date
+
+import pytest
+
+from order_stats import OrderStats
+
+
+class FakeOrderData:
+    def __init__(self):
+        self.rows = []
+        self.group_queries = 0
+        self.before_group = None     # hook run between MAX(order_id) and GROUP BY
+
+    def insert(self, day, cpty_id, symbol, side, size, status="Submitted"):
+        order_id = len(self.rows) + 1
+        self.rows.append({"order_id": order_id, "day": day, "cpty_id": cpty_id, "symbol": symbol,
+                          "side": side, "size": size, "status": status})
+        return order_id
+
+    def max_order_id(self):
+        return self.rows[-1]["order_id"] if self.rows else None
+
+    def groups(self, max_order_id):
+        if self.before_group:
+            hook, self.before_group = self.before_group, None
+            hook()
+        self.group_queries += 1
+        acc = defaultdict(lambda: [0, 0])
+        for r in self.rows:
+            if max_order_id is None or r["order_id"] <= max_order_id:
+                key = (r["day"], r["cpty_id"], r["symbol"], r["side"], r["status"])
+                acc[key][0] += 1
+                acc[key][1] += r["size"]
+        return [{"day": k[0], "cpty_id": k[1], "symbol": k[2], "side": k[3], "status": k[4],
+                 "n": n, "volume": v} for k, (n, v) in acc.items()]
+
+
+D1, D2 = date(2025, 1, 6), date(2025, 1, 7)
+
+
+def _submit(db, stats, day, cpty_id, symbol, side, size):
+    order_id = db.insert(day, cpty_id, symbol, side, size)
+    stats.on_insert(order_id, day, cpty_id, symbol, side, size, "Submitted")
+    return order_id
+
+
+def _cancel(db, stats, order_id):
+    row = db.rows[order_id - 1]
+    old, row["status"] = row["status"], "Cancelled"
+    stats.on_status_change(row["day"], row["cpty_id"], old, "Cancelled")
+
+
+def _seeded():
+    db = FakeOrderData()
+    db.insert(D1, "GS_NY_001", "TCS.NS", "Buy", 100)
+    db.insert(D1, "JPM_LON_002", "INFY.NS", "Sell", 50, status="Cancelled")
+    stats = OrderStats(db.groups, db.max_order_id)
+    stats.reconcile()
+    return db, stats
+
+
+def test_incremental_updates_match_fresh_aggregate():
+    db, stats = _seeded()
+    _submit(db, stats, D1, "GS_NY_001", "RELIANCE.NS", "Sell", 30)
+    oid = _submit(db, stats, D2, "MS_HK_003", "TCS.NS", "Buy", 70)
+    _cancel(db, stats, oid)
+    queries = db.group_queries
+
+    snap = stats.snapshot()
+    assert db.group_queries == queries          # served from memory
+    assert snap == stats.fresh()
+    assert snap["total_orders"] == 4 and snap["cancelled"] == 2 and snap["submitted"] == 2
+    assert snap["buy_count"] == 2 and snap["sell_count"] == 2
+    assert snap["total_volume"] == 250
+    assert snap["unique_symbols"] == 3 and snap["unique_clients"] == 3
+
+
+def test_breakdowns_by_day_and_client():
+    db, stats = _seeded()
+    oid = _submit(db, stats, D2, "GS_NY_001", "TCS.NS", "Sell", 10)
+    _cancel(db, stats, oid)
+    by_day = stats.snapshot("day")["by_day"]
+    assert list(by_day) == ["2025-01-06", "2025-01-07"]
+    assert by_day["2025-01-07"] == {"orders": 1, "submitted": 0, "cancelled": 1,
+                                    "buy_count": 0, "sell_count": 1, "volume": 10}
+    by_client = stats.snapshot("client")["by_client"]
+    assert by_client["GS_NY_001"]["orders"] == 2
+    assert by_client == stats.fresh("client")["by_client"]
+
+
+def test_reconcile_replays_insert_landing_mid_query():
+    db, stats = _seeded()
+    # Submitted after MAX(order_id) was read but before the GROUP BY ran
+    db.before_group = lambda: _submit(db, stats, D2, "GS_NY_001", "TCS.NS", "Buy", 5)
+    assert stats.reconcile() is False
+    assert stats.snapshot()["total_orders"] == 3
+    assert stats.snapshot() == stats.fresh()
+
+
+def test_reconcile_corrects_drift():
+    db, stats = _seeded()
+    # A write that bypassed the hooks (e.g. another server process)
+    db.insert(D2, "MS_HK_003", "INFY.NS", "Buy", 40)
+    assert stats.snapshot()["total_orders"] == 2
+    assert stats.reconcile() is True
+    assert stats.snapshot()["total_orders"] == 3
+    assert stats.drift_corrections == 1
+    assert stats.last_drift["total_orders"] == 1 and stats.last_drift["total_volume"] == 40
+
+
+def test_hot_aggregate_stops_at_the_archive_horizon():
+    pytest.importorskip("fastapi")
+    import main
+
+    queries = []
+
+    def fetchall(sql, args=None):
+        queries.append((sql, args))
+        return [{"table": "archive" if "order_data_archive" in sql else "hot"}]
+
+    real, horizon = main._db_fetchall, main.order_archiver.horizon
+    main._db_fetchall, main.order_archiver.horizon = fetchall, date(2026, 3, 2)
+    main._archived_groups.update(horizon=None, groups=[])
+    try:
+        groups = main._order_stat_groups(41)
+    finally:
+        main._db_fetchall, main.order_archiver.horizon = real, horizon
+        main._archived_groups.update(horizon=None, groups=[])
+    # A copied but not yet dropped partition is read from the archive only
+    assert groups == [{"table": "hot"}, {"table": "archive"}]
+    (hot_sql, hot_args), (archive_sql, archive_args) = queries
+    assert "WHERE order_id <= %s AND arrival_time >= %s" in hot_sql
+    assert hot_args == (41, date(2026, 3, 2)) and archive_args == (date(2026, 3, 2),)
+
+
+if __name__ == "__main__":
+    test_incremental_updates_match_fresh_aggregate()
+    test_breakdowns_by_day_and_client()
+    test_reconcile_replays_insert_landing_mid_query()
+    test_reconcile_corrects_drift()
+    test_hot_aggregate_stops_at_the_archive_horizon()
+    print("✅ Order stats stay in step with order_data")
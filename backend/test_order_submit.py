@@ -0,0 +1,107 @@
+"""
+test_order_submit.py — Submit validation finds clients the registry has not loaded yet
+======================================================================================
+A fake pool stands in for MySQL: it answers client_profiles lookups and
+records order inserts.
+
+Run:  python3 -m pytest test_order_submit.py
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+import main
+
+
+class FakeDB:
+    def __init__(self, clients):
+        self.clients = clients
+        self.inserted = []
+        self.lookups = 0
+        self.next_id = 100
+
+    @contextmanager
+    def connection(self, timeout=None):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def execute(self, sql, args=None):
+        if sql in (main.CLIENT_SQL, main.CLIENT_IN_SQL):
+            self.lookups += 1
+            wanted = args[0] if isinstance(args[0], tuple) else args
+            self.rows = [{"cpty_id": c, "client_name": c, "urgency_factor": "0.5",
+                          "price_sensitivity": "STANDARD", "execution_model": "Agency"}
+                         for c in wanted if c in self.clients]
+        else:
+            self.inserted.append(args)
+            self.lastrowid = self.next_id
+            self.next_id += 1
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+@contextmanager
+def _database(clients):
+    db = FakeDB(clients)
+    pool, snapshot = main.db_pool, main.client_registry._snapshot
+    # Registry not loaded (or not refreshed since the clients were added)
+    main.db_pool, main.client_registry._snapshot = db, None
+    try:
+        yield db
+    finally:
+        main.db_pool, main.client_registry._snapshot = pool, snapshot
+
+
+def _order(cpty_id, **kw):
+    return main.SubmitRequest(symbol="TCS.NS", cpty_id=cpty_id, size=100, side="Buy", **kw)
+
+
+def test_single_submit_checks_the_database_on_a_registry_miss():
+    with _database({"NEW_CLIENT"}) as db:
+        assert main.submit_order(_order("NEW_CLIENT"))["order_id"] == 100
+        with pytest.raises(HTTPException) as e:
+            main.submit_order(_order("GHOST"))
+    assert e.value.status_code == 422 and "GHOST" in e.value.detail
+    assert len(db.inserted) == 1
+
+
+def test_basket_checks_the_database_on_registry_misses():
+    with _database({"NEW_A", "NEW_B"}) as db:
+        basket = main.BatchSubmitRequest(orders=[_order("NEW_A"), _order("NEW_B"), _order("NEW_A")])
+        result = main.submit_batch(basket)
+        assert [r["status"] for r in result["results"]] == ["submitted"] * 3
+        assert db.lookups == 1                       # one IN query for every miss
+
+        with pytest.raises(HTTPException) as e:
+            main.submit_batch(main.BatchSubmitRequest(orders=[_order("NEW_A"), _order("GHOST")]))
+        assert e.value.status_code == 422
+        assert e.value.detail["results"] == [
+            {"index": 1, "status": "rejected", "error": "Client GHOST not found in client_profiles"}]
+        assert len(db.inserted) == 1
+
+
+if __name__ == "__main__":
+    test_single_submit_checks_the_database_on_a_registry_miss()
+    test_basket_checks_the_database_on_registry_misses()
+    print("✅ Submits find clients added since the last registry refresh")
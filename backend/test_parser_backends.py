@@ -0,0 +1,69 @@
+"""
+test_parser_backends.py — Parser registry and shadow-mode comparison
+====================================================================
+Run:  python3 test_parser_backends.py
+"""
+
+from order_parser import OrderIntent, OrderIntentParser, Urgency
+from parser_backends import (
+    LatencyHistogram, ParserBackend, ShadowRunner, available_backends, get_backend,
+)
+from test_order_parser import NOTES
+
+
+def test_registry_backends_agree():
+    assert {"compiled", "legacy"} <= set(available_backends())
+    compiled, legacy = get_backend("compiled"), get_backend("legacy")
+    for notes in NOTES:
+        assert legacy.parse(notes) == compiled.parse(notes)
+
+
+def test_unknown_backend_is_rejected():
+    try:
+        get_backend("nope")
+    except ValueError as e:
+        assert "compiled" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_shadow_counts_field_disagreements():
+    def always_critical(notes):
+        return OrderIntentParser.parse(notes)._replace(urgency_level=Urgency.CRITICAL)
+
+    shadow = ShadowRunner(get_backend("compiled"), ParserBackend("candidate", always_critical),
+                          sample_rate=1.0)
+    for notes in ["VWAP benchmark - standard execution", "asap", "patient"]:
+        shadow.offer(notes)
+    shadow.drain()
+
+    stats = shadow.stats()
+    assert stats["compared"] == 3
+    assert stats["mismatched"] == 2
+    assert stats["field_disagreements"] == {"urgency_level": 2}
+    assert stats["latency"]["compiled"]["count"] == 3
+    assert stats["latency"]["candidate"]["count"] == 3
+
+
+def test_shadow_sampling_skips_when_rate_is_zero():
+    shadow = ShadowRunner(get_backend("compiled"), get_backend("legacy"), sample_rate=0.0)
+    shadow.offer("urgent")
+    assert shadow.stats()["offered"] == 1 and shadow.stats()["sampled"] == 0
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    hist = LatencyHistogram(bounds=(10, 100, 1000))
+    for us in (5, 50, 50, 500):
+        hist.record(us / 1e6)
+    assert hist.percentile(0.5) == 100
+    assert hist.percentile(0.99) == 1000
+    assert hist.snapshot()["count"] == 4
+
+
+if __name__ == "__main__":
+    test_registry_backends_agree()
+    test_unknown_backend_is_rejected()
+    test_shadow_counts_field_disagreements()
+    test_shadow_sampling_skips_when_rate_is_zero()
+    test_histogram_percentiles_use_bucket_bounds()
+    print("✅ Parser backends and shadow mode behave as expected")
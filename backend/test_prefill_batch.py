@@ -0,0 +1,149 @@
+"""
+test_prefill_batch.py — Basket, sweep and session prefills match run_prefill
+============================================================================
+Runs a mixed basket (every TTC boundary, both sides, no side, an odd side
+string, intent-heavy notes) through run_prefill_batch and run_prefill and
+compares the results field by field, timing metadata aside. What-if sweeps
+are checked point by point and prefill sessions TTC move by TTC move.
+
+Run:  python3 -m pytest test_prefill_batch.py
+"""
+
+import itertools
+import random
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("numpy")
+
+from blob_codec import apply_diff
+from main import (PrefillRequest, reprefill_ttc, run_prefill, run_prefill_batch, run_prefill_sweep,
+                  start_prefill_session)
+
+
+MARKETS = [
+    {"symbol": "TCS.NS", "ltp": 3890.5, "bid": 3890.2, "ask": 3891.0, "time_to_close": 45,
+     "volatility_pct": 1.2, "avg_trade_size": 1800},
+    {"symbol": "SBIN.NS", "ltp": 812.35, "bid": 812.25, "ask": 812.45, "time_to_close": 20,
+     "volatility_pct": 2.9, "avg_trade_size": 12000},
+    {"symbol": "NEW.NS", "ltp": 10.05, "bid": 10.0, "ask": 10.1, "time_to_close": 390,
+     "volatility_pct": 0.4, "avg_trade_size": 0},
+]
+CLIENTS = [{"urgency_factor": 0.25}, {"urgency_factor": 0.65}, {"urgency_factor": 0.95}]
+NOTES = [
+    "",
+    "VWAP benchmark - standard execution",
+    "Urgent buy - critical allocation, must complete by 3:15 pm",
+    "Patient accumulation - no rush, passive, optimize price",
+    "Must liquidate by close - sell into the closing auction",
+    "aggressive, cross the spread, immediate",
+    "minimize market impact, iceberg, work it in the dark pool",
+]
+
+
+def _basket(n=600, seed=7):
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(n):
+        market, client = rng.choice(MARKETS), rng.choice(CLIENTS)
+        req = PrefillRequest(
+            symbol=market["symbol"], cpty_id="C",
+            size=rng.choice([1, 500, 9000, 40000, 250000, 1234567]),
+            side=rng.choice([None, "Buy", "Sell", "buy"]),
+            order_notes=rng.choice(NOTES),
+            time_to_close=rng.choice([None, 0, 25, 26, 60, 61, 301]),
+        )
+        orders.append((req, market, client))
+    return orders
+
+
+def _comparable(result):
+    meta = dict(result["metadata"])
+    del meta["processing_time_ms"], meta["timestamp"]
+    return dict(result, metadata=meta)
+
+
+def test_batch_matches_run_prefill():
+    orders = _basket()
+    batch = run_prefill_batch(orders)
+    assert len(batch) == len(orders)
+    for (req, market, client), got in zip(orders, batch):
+        assert _comparable(got) == _comparable(run_prefill(req, market, client)), req
+
+
+def test_batch_covers_every_branch():
+    batch = run_prefill_batch(_basket())
+    states = {r["market_context"]["market_state"] for r in batch}
+    assert {"CAS", "CAS_Targeted", "Pre_Close", "Continuous"} <= states
+    classes = {r["urgency_classification"] for r in batch}
+    assert classes == {"LOW", "MEDIUM", "HIGH", "CRITICAL"}
+    limits = {r["prefilled_params"]["limit_price"]["rationale"].split(":")[0] for r in batch}
+    assert {"CAS", "High urgency", "Medium urgency", "Low urgency"} <= limits
+    flags = {(r["prefilled_params"]["min_cross_qty"]["value"] is None,
+              r["prefilled_params"]["iwould_qty"]["value"] is None) for r in batch}
+    assert flags == set(itertools.product([True, False], repeat=2))
+
+
+def test_empty_basket():
+    assert run_prefill_batch([]) == []
+
+
+SWEEP_FIELDS = {
+    "urgency_score": lambda r: r["urgency_score"],
+    "urgency_classification": lambda r: r["urgency_classification"],
+    "market_state": lambda r: r["market_context"]["market_state"],
+    "cas_active": lambda r: r["market_context"]["cas_active"],
+    "order_type": lambda r: r["prefilled_params"]["order_type"]["value"],
+    "limit_price": lambda r: r["prefilled_params"]["limit_price"]["value"],
+    "tif": lambda r: r["prefilled_params"]["tif"]["value"],
+    "executor": lambda r: r["prefilled_params"]["executor"]["value"],
+}
+
+
+def test_sweep_matches_run_prefill_at_every_point():
+    ttcs, sizes, factors = [0, 10, 25, 26, 45, 60, 61, 200, 390], [100, 9000, 40000, 250000], [0.2, 0.75]
+    for market in MARKETS:
+        for notes in NOTES:
+            for side in (None, "Buy", "Sell", "buy"):
+                req = PrefillRequest(symbol=market["symbol"], cpty_id="C", size=1000,
+                                     side=side, order_notes=notes)
+                sweep = run_prefill_sweep(req, market, {"urgency_factor": 0.5}, ttcs, sizes, factors)
+                assert sweep["points"] == len(ttcs) * len(sizes) * len(factors)
+                cols = sweep["columns"]
+                for i in range(sweep["points"]):
+                    point = req.model_copy(update={"time_to_close": cols["time_to_close"][i],
+                                                   "size": cols["size"][i]})
+                    expected = run_prefill(point, market, {"urgency_factor": cols["urgency_factor"][i]})
+                    for name, field in SWEEP_FIELDS.items():
+                        assert cols[name][i] == field(expected), (name, notes, side, i)
+
+
+def test_sweep_defaults_missing_axes_to_the_order():
+    req = PrefillRequest(symbol="TCS.NS", cpty_id="C", size=5000, order_notes="")
+    sweep = run_prefill_sweep(req, MARKETS[0], {"urgency_factor": 0.5}, ttcs=[30, 20])
+    assert sweep["axes"] == {"time_to_close": [30, 20], "size": [5000], "urgency_factor": [0.5]}
+    assert sweep["columns"]["market_state"] == ["Pre_Close", "CAS"]
+
+
+def test_session_ttc_moves_patch_to_run_prefill():
+    for req, market, client in _basket(n=60, seed=3):
+        session = start_prefill_session(req, market, client)
+        result = session.result
+        assert _comparable(result) == _comparable(run_prefill(req, market, client))
+        for ttc in (390, 61, 60, 26, 25, 0, 120):
+            diff = reprefill_ttc(session, ttc)
+            assert "instrument" not in diff.get("sub", {}).get("prefilled_params", {}).get("set", {})
+            result = apply_diff(result, diff)
+            moved = req.model_copy(update={"time_to_close": ttc})
+            assert _comparable(result) == _comparable(run_prefill(moved, market, client)), (req, ttc)
+
+
+if __name__ == "__main__":
+    test_batch_matches_run_prefill()
+    test_batch_covers_every_branch()
+    test_empty_basket()
+    test_sweep_matches_run_prefill_at_every_point()
+    test_sweep_defaults_missing_axes_to_the_order()
+    test_session_ttc_moves_patch_to_run_prefill()
+    print("✅ Basket, sweep and session prefills match run_prefill")
@@ -0,0 +1,66 @@
+"""
+test_prefill_cache.py — Unit tests for the prefill result cache
+===============================================================
+Run:  python3 test_prefill_cache.py
+"""
+
+from prefill_cache import PrefillCache
+
+
+FIELDS = {"symbol": "TCS.NS", "cpty_id": "HDFC_MF", "size": 25000, "side": None,
+          "order_notes": "VWAP benchmark", "time_to_close": None}
+
+
+class Engine:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"urgency_score": 62, "prefilled_params": {"tif": {"value": "GFD"}},
+                "metadata": {"processing_time_ms": 40, "timestamp": f"call-{self.calls}"}}
+
+
+def test_repeat_requests_hit_until_a_version_moves():
+    cache, engine = PrefillCache(maxsize=8), Engine()
+    key = PrefillCache.key(FIELDS, 7, 3, ("n", "t"))
+    first, hit = cache.lookup(key, engine)
+    assert not hit and engine.calls == 1
+    again, hit = cache.lookup(PrefillCache.key(dict(FIELDS), 7, 3, ("n", "t")), engine)
+    assert hit and engine.calls == 1
+    assert again["urgency_score"] == 62 and again["metadata"]["timestamp"] != "call-1"
+
+    # New market snapshot version, or any field changing, misses
+    assert not cache.lookup(PrefillCache.key(FIELDS, 8, 3, ("n", "t")), engine)[1]
+    assert not cache.lookup(PrefillCache.key(dict(FIELDS, size=25001), 7, 3, ("n", "t")), engine)[1]
+    assert engine.calls == 3
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["memory_bytes"] > 0
+
+
+def test_callers_cannot_modify_cached_metadata():
+    cache, engine = PrefillCache(maxsize=8, refresh_metadata=False), Engine()
+    key = PrefillCache.key(FIELDS, 1, 1)
+    result, _ = cache.lookup(key, engine)
+    result["metadata"]["market_snapshot"] = {"version": 1}
+    hit, _ = cache.lookup(key, engine)
+    assert "market_snapshot" not in hit["metadata"]
+    assert hit["metadata"] == {"processing_time_ms": 40, "timestamp": "call-1"}
+
+
+def test_no_key_and_eviction():
+    cache, engine = PrefillCache(maxsize=1), Engine()
+    cache.lookup(None, engine)
+    cache.lookup(None, engine)
+    assert engine.calls == 2 and cache.stats()["size"] == 0
+    cache.lookup(PrefillCache.key(FIELDS, 1, 1), engine)
+    cache.lookup(PrefillCache.key(FIELDS, 2, 1), engine)
+    assert not cache.lookup(PrefillCache.key(FIELDS, 1, 1), engine)[1]
+    assert cache.stats()["evictions"] == 2
+
+
+if __name__ == "__main__":
+    test_repeat_requests_hit_until_a_version_moves()
+    test_callers_cannot_modify_cached_metadata()
+    test_no_key_and_eviction()
+    print("✅ Prefill cache serves repeats and misses on new versions")
@@ -669,6 +669,8 @@ export default function AUOTerminal() {
         size: +qty,
         order_notes: notes,
         prefilled_params: result.prefilled_params,
+        urgency_score: result.urgency_score,
+        urgency_classification: result.urgency_classification,
         trader_overrides: driverOverrides,
         locked_fields: Array.from(lockedFields)
       };